@@ -0,0 +1,326 @@
+"""In-process stand-ins for the Gmail API and Gemini, for offline benchmarks.
+
+FakeGmailService answers the ``users()`` calls GmailClient and MailboxSync
+make (messages.list/get, threads.list/get, history.list, getProfile and
+batch requests) from a generated mailbox, sleeping for a configurable
+latency per HTTP round trip and failing a configurable share of ``get``
+calls with 429. FakeGenerativeModel answers ``generate_content`` for both
+single and numbered batch prompts after a configurable delay.
+
+Every call is counted in a CallStats object shared by a service and the
+per-thread services made by its ``factory``.
+"""
+
+import random
+import re
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+BASE_INTERNAL_DATE_MS = 1_704_067_200_000  # 2024-01-01T00:00:00Z
+
+
+class CallStats:
+    """Thread-safe counts of API methods and HTTP round trips."""
+
+    def __init__(self):
+        self.calls: Counter[str] = Counter()
+        self.round_trips = 0
+        self._lock = threading.Lock()
+
+    def record(self, method: str, round_trip: bool = True) -> None:
+        with self._lock:
+            self.calls[method] += 1
+            if round_trip:
+                self.round_trips += 1
+
+    def snapshot(self) -> tuple[int, Counter[str]]:
+        """Return the round trips and per-method counts so far."""
+        with self._lock:
+            return self.round_trips, Counter(self.calls)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+            self.round_trips = 0
+
+
+class FakeRequest:
+    """A prepared call; ``execute`` simulates one HTTP round trip."""
+
+    def __init__(self, service: "FakeGmailService", method: str, handler, fallible: bool = False):
+        self.service = service
+        self.method = method
+        self.methodId = f"gmail.users.{method}"
+        self.handler = handler
+        self.fallible = fallible
+
+    def execute(self) -> dict:
+        self.service.stats.record(self.method)
+        self.service.wait(self.service.latency)
+        self.service.maybe_fail(self)
+        return self.handler()
+
+
+class FakeBatch:
+    """Stand-in for BatchHttpRequest: one round trip for all added calls."""
+
+    def __init__(self, service: "FakeGmailService", callback):
+        self.service = service
+        self.callback = callback
+        self.requests: list[tuple[FakeRequest, str]] = []
+
+    def add(self, request: FakeRequest, request_id: str | None = None) -> None:
+        self.requests.append((request, request_id or str(len(self.requests))))
+
+    def execute(self) -> None:
+        service = self.service
+        service.stats.record("batch")
+        service.wait(service.latency + service.batch_item_latency * len(self.requests))
+        for request, request_id in self.requests:
+            service.stats.record(request.method, round_trip=False)
+            try:
+                service.maybe_fail(request)
+                response = request.handler()
+            except HttpError as error:
+                self.callback(request_id, None, error)
+            else:
+                self.callback(request_id, response, None)
+
+
+class FakeGmailService:
+    """A generated INBOX served through the ``service.users()`` call chain.
+
+    ``list`` ignores the query and lists the whole mailbox, newest first, so
+    a benchmark controls the result count with ``size`` and ``max_results``.
+    """
+
+    def __init__(
+        self,
+        size: int = 1000,
+        latency: float = 0.0,
+        batch_item_latency: float = 0.0,
+        headers_per_message: int = 12,
+        thread_size: int = 1,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        stats: CallStats | None = None,
+        _mailbox: dict | None = None,
+    ):
+        """Initialize the service.
+
+        Args:
+            size: Messages in the mailbox
+            latency: Seconds per HTTP round trip, batch or single call
+            batch_item_latency: Extra seconds per call inside a batch
+            headers_per_message: Headers stored on each message, including
+                Subject, From and Date; ``get`` only returns the requested ones
+            thread_size: Consecutive messages grouped into one thread
+            error_rate: Share of messages.get/threads.get calls failing with 429
+            seed: Seed for the error draws
+            stats: Call counter to share, e.g. with the services made by ``factory``
+        """
+        self.size = size
+        self.latency = latency
+        self.batch_item_latency = batch_item_latency
+        self.headers_per_message = headers_per_message
+        self.thread_size = max(1, thread_size)
+        self.error_rate = error_rate
+        self.seed = seed
+        self.stats = stats or CallStats()
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._mailbox = _mailbox if _mailbox is not None else self._generate_mailbox()
+
+    def _generate_mailbox(self) -> dict:
+        mailbox = {"messages": {}, "threads": {}, "history": [], "history_id": 1000}
+        for index in range(self.size):
+            self._store(mailbox, self._make_message(index))
+        return mailbox
+
+    @staticmethod
+    def _store(mailbox: dict, message: dict) -> None:
+        mailbox["messages"][message["id"]] = message
+        mailbox["threads"].setdefault(message["threadId"], []).append(message)
+
+    def _make_message(self, index: int) -> dict:
+        headers = [
+            {"name": "Subject", "value": f"Weekly report {index} for the platform team"},
+            {"name": "From", "value": f"Sender {index % 97} <sender{index % 97}@example.com>"},
+            {"name": "Date", "value": "Mon, 1 Jan 2024 10:00:00 +0000"},
+        ]
+        for extra in range(max(0, self.headers_per_message - len(headers))):
+            headers.append({"name": f"X-Header-{extra}", "value": f"value {extra} of {index}"})
+        return {
+            "id": f"m{index:07d}",
+            "threadId": f"t{index // self.thread_size:07d}",
+            "labelIds": ["INBOX"] if index % 3 else ["INBOX", "UNREAD"],
+            "internalDate": str(BASE_INTERNAL_DATE_MS + index * 60_000),
+            "payload": {"headers": headers},
+        }
+
+    def factory(self) -> "FakeGmailService":
+        """Return a new service over the same mailbox and counters, e.g. for one worker thread."""
+        with self._random_lock:
+            seed = self._random.randrange(1 << 30)
+        return FakeGmailService(
+            size=self.size,
+            latency=self.latency,
+            batch_item_latency=self.batch_item_latency,
+            headers_per_message=self.headers_per_message,
+            thread_size=self.thread_size,
+            error_rate=self.error_rate,
+            seed=seed,
+            stats=self.stats,
+            _mailbox=self._mailbox,
+        )
+
+    def deliver(self, count: int) -> list[str]:
+        """Add ``count`` new messages and record them in the history.
+
+        Returns:
+            The new message IDs
+        """
+        added = []
+        for _ in range(count):
+            message = self._make_message(len(self._mailbox["messages"]))
+            self._store(self._mailbox, message)
+            added.append(message["id"])
+            self._mailbox["history_id"] += 1
+            self._mailbox["history"].append({
+                "id": str(self._mailbox["history_id"]),
+                "messagesAdded": [{"message": {"id": message["id"], "labelIds": message["labelIds"]}}],
+            })
+        return added
+
+    def stored_messages(self) -> list[dict]:
+        """Return every message in the mailbox as a full ``messages.get`` response."""
+        return list(self._mailbox["messages"].values())
+
+    # Simulation helpers
+
+    @staticmethod
+    def wait(seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def maybe_fail(self, request: FakeRequest) -> None:
+        """Raise a 429 HttpError for a share of fallible calls."""
+        if not request.fallible or self.error_rate <= 0:
+            return
+        with self._random_lock:
+            failed = self._random.random() < self.error_rate
+        if failed:
+            raise HttpError(httplib2.Response({"status": 429}), b"Rate limit exceeded")
+
+    # The service.users() call chain
+
+    def users(self) -> "FakeGmailService":
+        return self
+
+    def messages(self) -> SimpleNamespace:
+        return SimpleNamespace(list=self._list_messages, get=self._get_message)
+
+    def threads(self) -> SimpleNamespace:
+        return SimpleNamespace(list=self._list_threads, get=self._get_thread)
+
+    def history(self) -> SimpleNamespace:
+        return SimpleNamespace(list=self._list_history)
+
+    def getProfile(self, userId: str) -> FakeRequest:
+        return FakeRequest(self, "getProfile", lambda: {
+            "emailAddress": "me@example.com",
+            "messagesTotal": len(self._mailbox["messages"]),
+            "historyId": str(self._mailbox["history_id"]),
+        })
+
+    def new_batch_http_request(self, callback) -> FakeBatch:
+        return FakeBatch(self, callback)
+
+    def _list_messages(self, userId, q="", labelIds=None, maxResults=100, pageToken=None, **kwargs):
+        def handler():
+            ids = list(reversed(self._mailbox["messages"]))
+            return self._page("messages", ids, pageToken, maxResults)
+
+        return FakeRequest(self, "messages.list", handler)
+
+    def _get_message(self, userId, id, format="metadata", metadataHeaders=None, **kwargs):
+        return FakeRequest(
+            self,
+            "messages.get",
+            lambda: self._metadata(self._mailbox["messages"][id], metadataHeaders),
+            fallible=True,
+        )
+
+    def _list_threads(self, userId, q="", labelIds=None, maxResults=100, pageToken=None, **kwargs):
+        def handler():
+            ids = list(reversed(self._mailbox["threads"]))
+            return self._page("threads", ids, pageToken, maxResults)
+
+        return FakeRequest(self, "threads.list", handler)
+
+    def _get_thread(self, userId, id, format="metadata", metadataHeaders=None, **kwargs):
+        def handler():
+            messages = self._mailbox["threads"][id]
+            return {"id": id, "messages": [self._metadata(msg, metadataHeaders) for msg in messages]}
+
+        return FakeRequest(self, "threads.get", handler, fallible=True)
+
+    def _list_history(self, userId, startHistoryId, historyTypes=None, pageToken=None, **kwargs):
+        def handler():
+            start = int(startHistoryId)
+            records = [record for record in self._mailbox["history"] if int(record["id"]) > start]
+            return {"history": records, "historyId": str(self._mailbox["history_id"])}
+
+        return FakeRequest(self, "history.list", handler)
+
+    @staticmethod
+    def _page(key: str, ids: list[str], page_token: str | None, limit: int) -> dict:
+        start = int(page_token or 0)
+        end = start + limit
+        page = {key: [{"id": item_id} for item_id in ids[start:end]]}
+        if end < len(ids):
+            page["nextPageToken"] = str(end)
+        return page
+
+    @staticmethod
+    def _metadata(message: dict, metadata_headers) -> dict:
+        if not metadata_headers:
+            return message
+        wanted = {name.lower() for name in metadata_headers}
+        headers = [h for h in message["payload"]["headers"] if h["name"].lower() in wanted]
+        return {**message, "payload": {"headers": headers}}
+
+
+# Inputs in a numbered batch prompt, as written by GmailQueryParser._generate_numbered.
+_NUMBERED_INPUT = re.compile(r"^(\d+): ", re.MULTILINE)
+
+
+class FakeGenerativeModel:
+    """Stand-in for ``google.generativeai.GenerativeModel``.
+
+    Every call sleeps for ``latency`` seconds and answers ``response`` for a
+    single prompt, or one numbered line per input for a batch prompt.
+    """
+
+    def __init__(self, latency: float = 0.0, response: str = "is:unread"):
+        self.latency = latency
+        self.response = response
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str) -> SimpleNamespace:
+        with self._lock:
+            self.calls += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        if "\nInputs:\n" in prompt:
+            inputs = prompt.split("\nInputs:\n", 1)[1]
+            numbers = _NUMBERED_INPUT.findall(inputs)
+            return SimpleNamespace(text="\n".join(f"{n}: {self.response}" for n in numbers))
+        return SimpleNamespace(text=self.response)
@@ -0,0 +1,253 @@
+"""Offline benchmarks for search, translation, formatting and the full agent.
+
+Everything runs against the in-process fakes in ``fakes.py``, so no network
+access, credentials or API key is needed and runs are repeatable. Each
+scenario reports p50/p95 wall time per query and the API calls it made:
+
+    python benchmarks/offline.py
+    python benchmarks/offline.py --only search --scales 50,500 --latency-ms 20
+    python benchmarks/offline.py --error-rate 0.05 --fetch-modes batch,concurrent
+
+Compare fetch strategies by changing one option at a time; the defaults keep
+a full run to well under a minute.
+"""
+
+import argparse
+import contextlib
+import io
+import math
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fakes import FakeGenerativeModel, FakeGmailService  # noqa: E402
+
+from gmail_agent import main as agent_main  # noqa: E402
+from gmail_agent.coalesce import FetchCoalescer  # noqa: E402
+from gmail_agent.display import format_messages  # noqa: E402
+from gmail_agent.gmail_client import FETCH_MODES, GmailClient  # noqa: E402
+from gmail_agent.nlp_parser import GmailQueryParser  # noqa: E402
+from gmail_agent.scheduler import RequestScheduler  # noqa: E402
+
+# Queries the rules cannot answer, so every parse reaches the model unless cached.
+MODEL_QUERIES = [
+    "emails about the quarterly budget review from finance",
+    "anything my manager sent about the offsite",
+    "threads where someone asked me for a contract signature",
+]
+
+# Queries the fast path answers without the model.
+RULE_QUERIES = ["unread emails", "starred messages from last week", "emails with attachments"]
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of ``samples``."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def run_scenario(runs: int, query: Callable[[], Counter]) -> tuple[list[float], Counter]:
+    """Time ``runs`` calls of ``query``, which returns the calls it made.
+
+    Returns:
+        Wall time of each run in milliseconds, and the calls summed over all runs
+    """
+    samples = []
+    calls: Counter = Counter()
+    for _ in range(runs):
+        start = time.perf_counter()
+        calls += query()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples, calls
+
+
+def report(name: str, scale: int, samples: list[float], calls: Counter) -> None:
+    runs = len(samples)
+    per_query = ", ".join(
+        f"{method}={count / runs:g}" for method, count in sorted(calls.items()) if count
+    )
+    print(f"{name:<28} {scale:>6} {percentile(samples, 0.5):>9.1f} "
+          f"{percentile(samples, 0.95):>9.1f}  {per_query}")
+
+
+def make_service(args: argparse.Namespace, size: int) -> FakeGmailService:
+    return FakeGmailService(
+        size=size,
+        latency=args.latency_ms / 1000,
+        batch_item_latency=args.batch_item_ms / 1000,
+        headers_per_message=args.headers,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+
+
+def make_scheduler(args: argparse.Namespace) -> RequestScheduler:
+    return RequestScheduler(units_per_second=args.units_per_second or None)
+
+
+def make_parser(model: FakeGenerativeModel, fast_path: bool) -> GmailQueryParser:
+    parser = GmailQueryParser(api_key="offline", fast_path=fast_path)
+    parser.model = model
+    return parser
+
+
+def api_calls(service: FakeGmailService, before: tuple[int, Counter]) -> Counter:
+    """Return the calls made since ``before``, plus a "round_trips" entry."""
+    round_trips, calls = service.stats.snapshot()
+    calls.subtract(before[1])
+    calls["round_trips"] = round_trips - before[0]
+    return calls
+
+
+def bench_search(args: argparse.Namespace) -> None:
+    for fetch_mode in args.fetch_modes:
+        for scale in args.scales:
+            service = make_service(args, scale)
+            client = GmailClient(
+                service,
+                fetch_mode=fetch_mode,
+                max_workers=args.max_workers,
+                service_factory=service.factory if fetch_mode == "concurrent" else None,
+                scheduler=make_scheduler(args),
+                # Every run searches the same messages; measure fetching them, not the memo.
+                coalescer=FetchCoalescer(ttl=0),
+            )
+
+            def query() -> Counter:
+                before = service.stats.snapshot()
+                results = client.search_messages("is:unread", max_results=scale)
+                return api_calls(service, before) + Counter(results=len(results))
+
+            try:
+                samples, calls = run_scenario(args.runs, query)
+            finally:
+                client.close()
+            report(f"search_messages[{fetch_mode}]", scale, samples, calls)
+
+
+def bench_parse(args: argparse.Namespace) -> None:
+    for fast_path, queries in ((False, MODEL_QUERIES), (True, RULE_QUERIES)):
+        model = FakeGenerativeModel(latency=args.model_latency_ms / 1000)
+        parser = make_parser(model, fast_path)
+
+        def query() -> Counter:
+            before = model.calls
+            for text in queries:
+                parser.parse(text)
+            return Counter(model_calls=(model.calls - before) / len(queries))
+
+        samples, calls = run_scenario(args.runs, query)
+        name = "parse[fast path]" if fast_path else "parse[model]"
+        report(name, 1, [sample / len(queries) for sample in samples], calls)
+
+
+def bench_format(args: argparse.Namespace) -> None:
+    for scale in args.scales:
+        service = make_service(args, scale)
+        client = GmailClient(service)
+        messages = [client.to_email_message(msg) for msg in service.stored_messages()]
+
+        def query() -> Counter:
+            format_messages(messages)
+            return Counter()
+
+        samples, calls = run_scenario(args.runs, query)
+        report("format_messages", scale, samples, calls)
+
+
+def bench_agent(args: argparse.Namespace) -> None:
+    for fetch_mode in args.fetch_modes:
+        for scale in args.scales:
+            service = make_service(args, scale)
+            model = FakeGenerativeModel(latency=args.model_latency_ms / 1000)
+
+            def query() -> Counter:
+                before = service.stats.snapshot()
+                model_calls = model.calls
+                with contextlib.redirect_stdout(io.StringIO()):
+                    agent_main.run_agent(
+                        MODEL_QUERIES[0],
+                        max_results=scale,
+                        fetch_mode=fetch_mode,
+                        max_workers=args.max_workers,
+                    )
+                return api_calls(service, before) + Counter(model_calls=model.calls - model_calls)
+
+            def offline_parser(cache=None, fast_path=True, metrics=None) -> GmailQueryParser:
+                return make_parser(model, fast_path)
+
+            class ScheduledClient(GmailClient):
+                """GmailClient paced by the benchmark's scheduler.
+
+                A subclass rather than a partial, since modules imported while
+                the patch is active may use the name in annotations.
+                """
+
+                scheduler_for_run = make_scheduler(args)
+
+                def __init__(self, *client_args, **kwargs):
+                    super().__init__(*client_args, scheduler=self.scheduler_for_run, **kwargs)
+
+            with patch("gmail_agent.auth.get_gmail_service", return_value=service), \
+                    patch("gmail_agent.gmail_client.gmail_service_factory", return_value=service.factory), \
+                    patch("gmail_agent.nlp_parser.GmailQueryParser", offline_parser), \
+                    patch("gmail_agent.gmail_client.GmailClient", ScheduledClient):
+                samples, calls = run_scenario(args.runs, query)
+            report(f"run_agent[{fetch_mode}]", scale, samples, calls)
+
+
+BENCHMARKS = {
+    "search": bench_search,
+    "parse": bench_parse,
+    "format": bench_format,
+    "agent": bench_agent,
+}
+
+
+def comma_list(convert: Callable) -> Callable[[str], list]:
+    return lambda value: [convert(item) for item in value.split(",") if item]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", choices=BENCHMARKS, action="append",
+                        help="run only this benchmark; may be repeated")
+    parser.add_argument("--scales", type=comma_list(int), default=[10, 50, 200],
+                        help="result counts (and mailbox sizes) to measure, comma-separated")
+    parser.add_argument("--fetch-modes", type=comma_list(str), default=list(FETCH_MODES),
+                        help="fetch modes for the search and agent benchmarks")
+    parser.add_argument("--runs", type=int, default=10, help="timed queries per scenario")
+    parser.add_argument("--latency-ms", type=float, default=2.0,
+                        help="simulated Gmail latency per HTTP round trip")
+    parser.add_argument("--batch-item-ms", type=float, default=0.2,
+                        help="extra simulated latency per call inside a batch")
+    parser.add_argument("--model-latency-ms", type=float, default=50.0,
+                        help="simulated Gemini latency per call")
+    parser.add_argument("--headers", type=int, default=12, help="headers stored per message")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="share of metadata calls failing with 429")
+    parser.add_argument("--units-per-second", type=float, default=0,
+                        help="Gmail quota units the client may spend per second "
+                             "(250 is the real per-user limit; 0 disables throttling)")
+    parser.add_argument("--max-workers", type=int, default=8,
+                        help="worker threads for the concurrent fetch mode")
+    parser.add_argument("--seed", type=int, default=0, help="seed for simulated errors")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.fetch_modes) - set(FETCH_MODES)
+    if unknown:
+        parser.error(f"unknown fetch modes: {', '.join(sorted(unknown))}")
+
+    print(f"{'scenario':<28} {'scale':>6} {'p50 ms':>9} {'p95 ms':>9}  per query")
+    for name in args.only or BENCHMARKS:
+        BENCHMARKS[name](args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
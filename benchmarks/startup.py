@@ -0,0 +1,95 @@
+"""Startup-time benchmark for the CLI entry point.
+
+Runs ``python -X importtime -c "import <module>"`` in fresh interpreters and
+reports the median cumulative import time of the module, plus the slowest
+packages it pulls in. Exits with status 1 if the median exceeds the budget,
+so it can guard against an eager heavy import creeping back in:
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --module gmail_agent.remote --budget-ms 80
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+DEFAULT_MODULE = "gmail_agent.main"
+
+# Median cumulative import time allowed for DEFAULT_MODULE. Importing
+# google.generativeai or googleapiclient.discovery eagerly costs several
+# hundred milliseconds, well over this.
+DEFAULT_BUDGET_MS = 100.0
+
+# Modules that must not be imported just to start the CLI.
+HEAVY_MODULES = (
+    "google.generativeai",
+    "googleapiclient.discovery",
+    "google.oauth2.credentials",
+    "google_auth_oauthlib.flow",
+    "cryptography.fernet",
+    "tabulate",
+)
+
+
+def measure(module: str) -> tuple[float, dict[str, float]]:
+    """Import a module in a fresh interpreter and parse ``-X importtime`` output.
+
+    Returns:
+        The module's cumulative import time in milliseconds, and the
+        cumulative time of every module imported along the way
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    timings: dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        timings[name.strip()] = int(cumulative) / 1000
+    return timings[module], timings
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="module to import")
+    parser.add_argument("--runs", type=int, default=7, help="fresh interpreters to time")
+    parser.add_argument(
+        "--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="allowed median import time"
+    )
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    args = parser.parse_args(argv)
+
+    samples = []
+    timings: dict[str, float] = {}
+    for _ in range(args.runs):
+        total, timings = measure(args.module)
+        samples.append(total)
+
+    median = statistics.median(samples)
+    print(f"{args.module}: median {median:.1f} ms over {args.runs} runs "
+          f"(min {min(samples):.1f}, max {max(samples):.1f}, budget {args.budget_ms:.0f})")
+
+    print("\nSlowest imports in the last run:")
+    slowest = sorted(timings.items(), key=lambda item: item[1], reverse=True)
+    for name, elapsed in slowest[:args.top]:
+        print(f"  {elapsed:8.1f} ms  {name}")
+
+    status = 0
+    eager = [name for name in HEAVY_MODULES if name in timings]
+    if eager:
+        print(f"\nFAIL: heavy modules imported at startup: {', '.join(eager)}")
+        status = 1
+    if median > args.budget_ms:
+        print(f"\nFAIL: median import time {median:.1f} ms exceeds {args.budget_ms:.0f} ms")
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
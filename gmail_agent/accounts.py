@@ -0,0 +1,190 @@
+"""Multiple Gmail accounts: a token registry, a client pool and fan-out search."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from gmail_agent.auth import get_credential_provider, get_gmail_service
+from gmail_agent.gmail_client import EmailMessage, GmailClient, create_client
+
+TOKEN_SUFFIX = ".enc"
+
+
+class AccountRegistry:
+    """Directory of encrypted OAuth tokens, one ``<name>.enc`` file per account.
+
+    Tokens are written and read with TokenManager, so every account is
+    encrypted with the same GMAIL_AGENT_KEY.
+    """
+
+    def __init__(self, directory: str = "accounts"):
+        self.directory = Path(directory)
+
+    def names(self) -> list[str]:
+        """Return the registered account names, sorted."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(path.stem for path in self.directory.glob(f"*{TOKEN_SUFFIX}"))
+
+    def token_file(self, name: str) -> str:
+        """Return the token file path for an account.
+
+        Raises:
+            ValueError: If the name could escape the registry directory
+        """
+        if not name or name in (".", "..") or "/" in name or "\\" in name:
+            raise ValueError(f"Invalid account name {name!r}")
+        return str(self.directory / f"{name}{TOKEN_SUFFIX}")
+
+    def add(self, name: str) -> None:
+        """Authorize an account, running the OAuth flow if it has no valid token yet."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        get_credential_provider(self.token_file(name)).get()
+
+    def remove(self, name: str) -> None:
+        """Delete an account's token."""
+        Path(self.token_file(name)).unlink(missing_ok=True)
+
+
+@dataclass
+class AccountMessage:
+    """A message found in one of several searched accounts."""
+
+    account: str
+    message: EmailMessage
+
+
+@dataclass
+class FanOutResult:
+    """Merged results of a multi-account search."""
+
+    messages: list[AccountMessage] = field(default_factory=list)
+    errors: dict[str, str] = field(default_factory=dict)
+
+
+def _newest_first(item: AccountMessage) -> tuple[bool, float]:
+    """Sort key putting the newest messages first and undated ones last."""
+    timestamp = item.message.timestamp
+    return (timestamp is None, -(timestamp or 0.0))
+
+
+def _unknown_account(name: str) -> str:
+    return f"Account {name!r} is not registered; add it with --add-account {name}"
+
+
+class AccountPool:
+    """Ready GmailClient instances for the accounts in a registry.
+
+    Each account gets its own service (services are not thread-safe) and,
+    if ``cache_dir`` is set, its own metadata cache, since message IDs are
+    only unique within a mailbox. Clients are created on first use and kept
+    for the life of the pool.
+    """
+
+    def __init__(
+        self,
+        registry: AccountRegistry,
+        fetch_mode: str = "batch",
+        max_workers: int = 8,
+        cache_dir: str | None = None,
+        cache_label_ttl: float | None = None,
+    ):
+        """Initialize the pool.
+
+        Args:
+            registry: Accounts to search
+            fetch_mode: Metadata fetch strategy for every client
+            max_workers: Worker threads per client in the concurrent fetch mode
+            cache_dir: Directory for per-account metadata caches, or None to disable them
+            cache_label_ttl: Seconds after which cached labels are refetched, or None
+                to keep cached entries until they are evicted
+        """
+        self.registry = registry
+        self.fetch_mode = fetch_mode
+        self.max_workers = max_workers
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.cache_label_ttl = cache_label_ttl
+        self._clients: dict[str, GmailClient] = {}
+        self._lock = threading.Lock()
+
+    def client(self, name: str) -> GmailClient:
+        """Return the client for an account, creating it on first use.
+
+        Raises:
+            ValueError: If the account is not registered; only
+                AccountRegistry.add runs the OAuth flow for a new account
+        """
+        with self._lock:
+            client = self._clients.get(name)
+        if client is not None:
+            return client
+        if name not in self.registry.names():
+            raise ValueError(_unknown_account(name))
+
+        token_file = self.registry.token_file(name)
+        cache_file = None
+        if self.cache_dir is not None:
+            cache_file = str(self.cache_dir / f"{name}.db")
+
+        client = create_client(
+            get_gmail_service(token_file=token_file),
+            token_file,
+            fetch_mode=self.fetch_mode,
+            max_workers=self.max_workers,
+            cache_file=cache_file,
+            cache_label_ttl=self.cache_label_ttl,
+        )
+        with self._lock:
+            return self._clients.setdefault(name, client)
+
+    def search_all(
+        self, gmail_query: str, max_results: int = 50, accounts: list[str] | None = None
+    ) -> FanOutResult:
+        """Run one Gmail query on several accounts concurrently and merge the results.
+
+        Args:
+            gmail_query: Already translated Gmail search query
+            max_results: Maximum results per account and in the merged list
+            accounts: Account names to search, defaulting to every registered account
+
+        Returns:
+            Messages from all accounts, newest first, and an error message
+            for each account that could not be searched, including requested
+            accounts that are not registered
+        """
+        registered = self.registry.names()
+        result = FanOutResult()
+        names = registered
+        if accounts is not None:
+            names = [name for name in dict.fromkeys(accounts) if name in registered]
+            for name in dict.fromkeys(accounts):
+                if name not in registered:
+                    result.errors[name] = _unknown_account(name)
+        if not names:
+            return result
+
+        def search(name: str) -> list[EmailMessage]:
+            return self.client(name).search_messages(gmail_query, max_results=max_results)
+
+        with ThreadPoolExecutor(max_workers=len(names)) as executor:
+            futures = {name: executor.submit(search, name) for name in names}
+
+        # IDs are only unique within a mailbox, so results are not deduplicated.
+        for name, future in futures.items():
+            try:
+                result.messages.extend(AccountMessage(name, msg) for msg in future.result())
+            except Exception as error:
+                result.errors[name] = str(error)
+
+        result.messages.sort(key=_newest_first)
+        del result.messages[max_results:]
+        return result
+
+    def close(self) -> None:
+        """Shut down every client's worker pool."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
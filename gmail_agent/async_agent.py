@@ -0,0 +1,143 @@
+"""Asyncio pipeline for the Gmail agent with overlapping stages."""
+
+import asyncio
+from functools import partial
+from typing import AsyncIterator
+
+from gmail_agent.auth import build_gmail_service, get_credential_provider
+from gmail_agent.cache import MessageCache
+from gmail_agent.display import ROW_WIDTHS, StreamingTableRenderer
+from gmail_agent.gmail_client import EmailMessage, GmailClient
+from gmail_agent.nlp_parser import GmailQueryParser, Translation
+from gmail_agent.translation_cache import TranslationCache
+
+
+class AsyncGmailQueryParser:
+    """Async wrapper around GmailQueryParser.
+
+    Rule and cache lookups run inline; Gemini calls run in a worker thread
+    so they overlap with other stages.
+    """
+
+    def __init__(self, parser: GmailQueryParser):
+        self.parser = parser
+
+    async def translate(self, natural_language_query: str) -> Translation:
+        """Translate a query without blocking the event loop."""
+        return await asyncio.to_thread(self.parser.translate, natural_language_query)
+
+    async def parse(self, natural_language_query: str) -> str:
+        """Convert a natural language query to a Gmail search query string."""
+        return (await self.translate(natural_language_query)).query
+
+
+class AsyncGmailClient:
+    """Async wrapper around a GmailClient that fetches metadata concurrently.
+
+    The wrapped client must have a ``service_factory``: each fetch runs in a
+    worker thread with that thread's own service, and at most
+    ``concurrency`` fetches are in flight at once.
+    """
+
+    def __init__(self, client: GmailClient, concurrency: int = 8):
+        if client.service_factory is None:
+            raise ValueError("AsyncGmailClient needs a GmailClient with a service_factory")
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.client = client
+        self.concurrency = concurrency
+
+    async def iter_messages(self, query: str, max_results: int = 50) -> AsyncIterator[EmailMessage]:
+        """Yield matching messages as their metadata arrives, in completion order."""
+        local_results = await asyncio.to_thread(self.client.search_locally, query, max_results)
+        if local_results is not None:
+            for msg in local_results:
+                yield self.client.to_email_message(msg)
+            return
+
+        message_ids = await asyncio.to_thread(self.client.list_message_ids, query, max_results)
+        for next_done in asyncio.as_completed(self._fetch_all(message_ids)):
+            msg = await next_done
+            if msg is not None:
+                yield self.client.to_email_message(msg)
+
+    async def search_messages(self, query: str, max_results: int = 50) -> list[EmailMessage]:
+        """Return matching messages in the order Gmail lists them."""
+        local_results = await asyncio.to_thread(self.client.search_locally, query, max_results)
+        if local_results is not None:
+            return [self.client.to_email_message(msg) for msg in local_results]
+
+        message_ids = await asyncio.to_thread(self.client.list_message_ids, query, max_results)
+        responses = await asyncio.gather(*self._fetch_all(message_ids))
+        return [self.client.to_email_message(msg) for msg in responses if msg is not None]
+
+    def _fetch_all(self, message_ids: list[str]) -> list:
+        """Create one fetch coroutine per message, limited by a shared semaphore."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(message_id: str) -> dict | None:
+            async with semaphore:
+                return await asyncio.to_thread(self.client.fetch_message, message_id)
+
+        return [fetch(message_id) for message_id in message_ids]
+
+
+async def run_agent_async(
+    user_query: str,
+    token_file: str = "token.enc",
+    max_results: int = 50,
+    concurrency: int = 8,
+    cache_file: str | None = None,
+    cache_label_ttl: float | None = None,
+    translation_cache_file: str | None = None,
+    fast_path: bool = True,
+) -> None:
+    """Run the Gmail agent with authentication, translation and fetches overlapped.
+
+    Credentials are loaded (and refreshed if needed) while Gemini translates
+    the query, message metadata is fetched concurrently, and table rows are
+    printed as each message arrives rather than after the slowest one.
+
+    Args:
+        user_query: Natural language search query from user
+        token_file: Path to encrypted token file
+        max_results: Maximum number of results to retrieve
+        concurrency: Maximum metadata fetches in flight at once
+        cache_file: Path to the on-disk message metadata cache, or None to disable it
+        cache_label_ttl: Seconds after which cached labels are refetched, or None
+            to keep cached entries until they are evicted
+        translation_cache_file: Path to the query translation cache, or None to disable it
+        fast_path: Translate simple queries with local rules instead of Gemini
+    """
+    translation_cache = TranslationCache(translation_cache_file) if translation_cache_file else None
+    parser = AsyncGmailQueryParser(
+        GmailQueryParser(cache=translation_cache, fast_path=fast_path)
+    )
+
+    creds, gmail_query = await asyncio.gather(
+        asyncio.to_thread(get_credential_provider(token_file).get),
+        parser.parse(user_query),
+    )
+    print(f"Gmail search query: {gmail_query}\n")
+
+    service_factory = partial(build_gmail_service, creds)
+    client = GmailClient(
+        await asyncio.to_thread(service_factory),
+        fetch_mode="concurrent",
+        max_workers=concurrency,
+        service_factory=service_factory,
+        cache=MessageCache(cache_file, label_ttl=cache_label_ttl) if cache_file else None,
+    )
+
+    # Widths are fixed rather than sampled so each row prints the moment it arrives.
+    renderer = StreamingTableRenderer(widths=ROW_WIDTHS, chunk_size=1)
+    async for msg in AsyncGmailClient(client, concurrency=concurrency).iter_messages(
+        gmail_query, max_results=max_results
+    ):
+        renderer.add(msg)
+    renderer.finish()
+
+
+def run_agent_concurrently(user_query: str, **kwargs) -> None:
+    """Synchronous entry point that runs run_agent_async on a fresh event loop."""
+    asyncio.run(run_agent_async(user_query, **kwargs))
@@ -1,17 +1,37 @@
 """Gmail authentication and token management."""
 
+import copy
 import json
 import os
+import tempfile
+import threading
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Callable
 
 from cryptography.fernet import Fernet
+from google.auth.credentials import AnonymousCredentials
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+from gmail_agent.metrics import NULL_METRICS, Metrics
 
 SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
 
+API_NAME = "gmail"
+API_VERSION = "v1"
+
+# Discovery documents are kept here as <api>.<version>.json, unless the
+# GMAIL_AGENT_DISCOVERY_CACHE environment variable names another directory.
+DISCOVERY_CACHE_DIR = Path.home() / ".cache" / "gmail_agent" / "discovery"
+
+_discovery_documents: dict[tuple[str, str], dict] = {}
+_services: dict[str, object] = {}
+_providers: dict[str, "CredentialProvider"] = {}
+_cache_lock = threading.Lock()
+
 
 class TokenManager:
     """Manages encrypted storage and retrieval of OAuth tokens."""
@@ -24,6 +44,7 @@ class TokenManager:
                 "GMAIL_AGENT_KEY environment variable must be set for token encryption"
             )
         self.encryption_key = self._derive_key(encryption_key)
+        self._fernet = Fernet(self.encryption_key)
 
     def _derive_key(self, key_string: str) -> bytes:
         """Derive a valid Fernet key from the encryption key string."""
@@ -35,22 +56,30 @@ class TokenManager:
 
     def _encrypt_token(self, token_data: dict) -> bytes:
         """Encrypt token data."""
-        fernet = Fernet(self.encryption_key)
         token_json = json.dumps(token_data)
-        return fernet.encrypt(token_json.encode())
+        return self._fernet.encrypt(token_json.encode())
 
     def _decrypt_token(self, encrypted_data: bytes) -> dict:
         """Decrypt token data."""
-        fernet = Fernet(self.encryption_key)
-        decrypted_bytes = fernet.decrypt(encrypted_data)
+        decrypted_bytes = self._fernet.decrypt(encrypted_data)
         return json.loads(decrypted_bytes.decode())
 
     def save_token(self, token_data: dict) -> None:
-        """Save encrypted token to file."""
+        """Save encrypted token to file.
+
+        The token is written to a temporary file that then replaces the old
+        one, so a reader never sees a partially written token.
+        """
         encrypted = self._encrypt_token(token_data)
         self.token_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.token_path, "wb") as f:
-            f.write(encrypted)
+        fd, temp_path = tempfile.mkstemp(dir=self.token_path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(encrypted)
+            os.replace(temp_path, self.token_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
 
     def load_token(self) -> dict | None:
         """Load and decrypt token from file. Returns None if file doesn't exist or decryption fails."""
@@ -65,8 +94,8 @@ class TokenManager:
             return None
 
 
-def get_gmail_service(token_file: str = "token.enc"):
-    """Create and return Gmail API service, handling OAuth authentication."""
+def load_credentials(token_file: str = "token.enc") -> Credentials:
+    """Load OAuth credentials, refreshing or re-authorizing them when needed."""
     token_manager = TokenManager(token_file)
     creds = None
 
@@ -97,9 +126,318 @@ def get_gmail_service(token_file: str = "token.enc"):
                 }
             }
 
+            # Only needed for first-time authorization, and slow to import.
+            from google_auth_oauthlib.flow import InstalledAppFlow
+
             flow = InstalledAppFlow.from_client_config(client_config, SCOPES)
             creds = flow.run_local_server(port=0)
 
         token_manager.save_token(json.loads(creds.to_json()))
 
-    return build("gmail", "v1", credentials=creds)
+    return creds
+
+
+def _utcnow() -> datetime:
+    """Current time as a naive UTC datetime, the form google-auth uses for expiry."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class CredentialProvider:
+    """Keeps decrypted OAuth credentials in memory and refreshes them before they expire.
+
+    The token file is read and decrypted once. When the access token comes
+    within ``refresh_margin`` seconds of expiring, get() starts a refresh in
+    a background thread and keeps returning the still-valid credentials; a
+    caller only waits for a refresh if the token has already expired.
+    start() additionally runs a thread that refreshes ahead of expiry
+    without waiting for a caller, for long-running processes.
+
+    A refresh runs on a copy of the credentials without holding the lock,
+    so get() never waits behind the network call unless the token has
+    expired. The new token is then copied into the live credentials, so
+    services built with them pick it up. Refreshed tokens are written back
+    to the token file, and only when they changed.
+    """
+
+    def __init__(
+        self,
+        token_file: str = "token.enc",
+        refresh_margin: float = 300.0,
+        retry_interval: float = 30.0,
+        now: Callable[[], datetime] = _utcnow,
+    ):
+        """Initialize the provider.
+
+        Args:
+            token_file: Path to encrypted token file
+            refresh_margin: Seconds before expiry at which to refresh; longer
+                than google-auth's own threshold so requests never trigger a refresh
+            retry_interval: Seconds to wait after a failed background refresh
+            now: Returns the current naive UTC time
+        """
+        self.token_file = token_file
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self.now = now
+        self._creds: Credentials | None = None
+        self._saved_json: str | None = None
+        self._token_manager: TokenManager | None = None
+        self._lock = threading.Lock()
+        self._refresh_done = threading.Condition(self._lock)
+        self._refreshing = False
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def get(self) -> Credentials:
+        """Return valid credentials, loading them on first use."""
+        with self._lock:
+            if self._creds is None:
+                self._creds = load_credentials(self.token_file)
+                self._saved_json = self._creds.to_json()
+            creds = self._creds
+
+        remaining = self.seconds_until_expiry()
+        if remaining is not None:
+            if remaining <= 0:
+                self._refresh_if_due()
+            elif remaining <= self.refresh_margin:
+                self._refresh_in_background()
+        return creds
+
+    def seconds_until_expiry(self) -> float | None:
+        """Seconds until the access token expires, or None if it has no known expiry."""
+        expiry = getattr(self._creds, "expiry", None)
+        if not isinstance(expiry, datetime):
+            return None
+        return (expiry - self.now()).total_seconds()
+
+    def start(self) -> None:
+        """Load the credentials and keep refreshing them ahead of expiry in a daemon thread."""
+        self.get()
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="token-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the refresh thread started by start()."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            remaining = self.seconds_until_expiry()
+            if remaining is None:
+                return
+            if self._stop.wait(max(remaining - self.refresh_margin, 0)):
+                return
+            try:
+                self._refresh_if_due()
+            except Exception:
+                self._stop.wait(self.retry_interval)
+
+    def _refresh_in_background(self) -> None:
+        """Start a one-off refresh thread unless a refresh is already running."""
+        fresh = self._claim_refresh(wait=False)
+        if fresh is None:
+            return
+
+        def refresh() -> None:
+            try:
+                self._complete_refresh(fresh)
+            except Exception:
+                pass  # The token is still valid; the next get() tries again.
+
+        threading.Thread(target=refresh, name="token-refresh-once", daemon=True).start()
+
+    def _refresh_if_due(self) -> None:
+        """Refresh the credentials unless another thread already has."""
+        fresh = self._claim_refresh(wait=True)
+        if fresh is not None:
+            self._complete_refresh(fresh)
+
+    def _claim_refresh(self, wait: bool) -> Credentials | None:
+        """Mark a refresh as running and return a copy of the credentials to refresh.
+
+        Args:
+            wait: If another thread is refreshing, wait for it to finish instead
+                of returning None at once
+
+        Returns:
+            A copy to refresh, or None if no refresh is due or another one is running
+        """
+        with self._lock:
+            while self._refreshing:
+                if not wait:
+                    return None
+                self._refresh_done.wait()
+            remaining = self.seconds_until_expiry()
+            if remaining is not None and remaining > self.refresh_margin:
+                return None
+            self._refreshing = True
+            return copy.copy(self._creds)
+
+    def _complete_refresh(self, fresh: Credentials) -> None:
+        """Refresh ``fresh`` without holding the lock, then adopt and save its token."""
+        try:
+            fresh.refresh(Request())
+            with self._lock:
+                vars(self._creds).update(vars(fresh))
+                self._write_back()
+        finally:
+            with self._lock:
+                self._refreshing = False
+                self._refresh_done.notify_all()
+
+    def _write_back(self) -> None:
+        """Save the credentials to the token file if the token changed."""
+        token_json = self._creds.to_json()
+        if token_json == self._saved_json:
+            return
+        if self._token_manager is None:
+            self._token_manager = TokenManager(self.token_file)
+        self._token_manager.save_token(json.loads(token_json))
+        self._saved_json = token_json
+
+
+def get_credential_provider(token_file: str = "token.enc") -> CredentialProvider:
+    """Return the process-wide credential provider for a token file."""
+    key = str(Path(token_file).resolve())
+    with _cache_lock:
+        provider = _providers.get(key)
+        if provider is None:
+            provider = _providers[key] = CredentialProvider(token_file)
+    return provider
+
+
+def load_discovery_document(
+    api: str = API_NAME, version: str = API_VERSION, cache_dir: Path | None = None
+) -> dict | None:
+    """Return the parsed discovery document for an API version.
+
+    Documents are parsed once per process. On first use the document is read
+    from the on-disk cache, or else from the copy bundled with
+    google-api-python-client, which is then written to the cache.
+
+    Args:
+        api: API name, e.g. "gmail"
+        version: API version, e.g. "v1"
+        cache_dir: Directory of cached documents, defaulting to
+            $GMAIL_AGENT_DISCOVERY_CACHE or DISCOVERY_CACHE_DIR
+
+    Returns:
+        The discovery document, or None if no local copy is available
+    """
+    key = (api, version)
+    with _cache_lock:
+        document = _discovery_documents.get(key)
+        if document is not None:
+            return document
+
+        cache_dir = cache_dir or os.getenv("GMAIL_AGENT_DISCOVERY_CACHE") or DISCOVERY_CACHE_DIR
+        path = Path(cache_dir) / f"{api}.{version}.json"
+        try:
+            document = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            content = get_static_doc(api, version)
+            if content is None:
+                return None
+            document = json.loads(content)
+            _save_discovery_document(path, content)
+
+        _expand_resources(build_from_document(document, credentials=AnonymousCredentials()), document)
+        _discovery_documents[key] = document
+        return document
+
+
+def _save_discovery_document(path: Path, content: str) -> None:
+    """Write a discovery document to the cache atomically; failures are ignored."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+
+
+def _expand_resources(resource, description: dict) -> None:
+    """Instantiate every nested resource once.
+
+    Building a resource fills in default parameters on the method
+    descriptions it uses. Doing that for the whole tree up front, under the
+    cache lock, means later builds from the shared document (including
+    concurrent ones in worker threads) only read it.
+    """
+    for name, child in description.get("resources", {}).items():
+        _expand_resources(getattr(resource, name)(), child)
+
+
+def build_gmail_service(creds: Credentials):
+    """Build a Gmail API service object with its own HTTP connection.
+
+    Uses the cached discovery document when one is available, so the
+    resource tree is built from an already-parsed dict. Otherwise falls back
+    to discovering the API over the network.
+    """
+    document = load_discovery_document()
+    if document is None:
+        return build(API_NAME, API_VERSION, credentials=creds, static_discovery=False)
+    return build_from_document(document, credentials=creds)
+
+
+def get_gmail_service(token_file: str = "token.enc", metrics: Metrics | None = None):
+    """Create and return Gmail API service, handling OAuth authentication.
+
+    The service is built once per token file and reused for the rest of the
+    process. Service objects are not thread-safe; worker threads should use
+    gmail_service_factory instead.
+
+    Args:
+        token_file: Path to the encrypted token file
+        metrics: Records the "auth.credentials" and "auth.build" stages, or
+            an "auth.service_reused" count when the cached service is returned
+    """
+    metrics = metrics if metrics is not None else NULL_METRICS
+    key = str(Path(token_file).resolve())
+    service = _services.get(key)
+    if service is not None:
+        metrics.increment("auth.service_reused")
+        return service
+
+    with metrics.stage("auth.credentials"):
+        creds = get_credential_provider(token_file).get()
+    with metrics.stage("auth.build"):
+        service = build_gmail_service(creds)
+    _services[key] = service
+    return service
+
+
+def clear_service_cache() -> None:
+    """Forget services, credentials and discovery documents cached in this process."""
+    with _cache_lock:
+        providers = list(_providers.values())
+        _providers.clear()
+        _services.clear()
+        _discovery_documents.clear()
+    for provider in providers:
+        provider.stop()
+
+
+def gmail_service_factory(token_file: str = "token.enc") -> Callable[[], object]:
+    """Return a callable that builds a fresh Gmail service on every call.
+
+    Service objects are not thread-safe, so concurrent callers should give
+    each worker thread its own. Credentials come from the shared provider
+    when a service is first built, so a factory that is never used costs nothing.
+    """
+    provider = get_credential_provider(token_file)
+
+    def build_service():
+        return build_gmail_service(provider.get())
+
+    return build_service
@@ -0,0 +1,142 @@
+"""Batch mode: many saved searches answered in one process.
+
+``python -m gmail_agent.main --batch < searches.txt`` reads one query per
+line, either as plain text or as a JSON object:
+
+    unread emails from amazon
+    {"id": "invoices", "query": "invoices from last month", "max_results": 200}
+
+Blank lines and lines starting with "#" are skipped. A plain-text query is
+identified by its line number. The service, parser and client are built
+once; queries are translated together, each distinct Gmail query is listed
+once, and the metadata of a message found by several queries is fetched once.
+"""
+
+import json
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Iterable
+
+if TYPE_CHECKING:
+    from gmail_agent.gmail_client import EmailMessage, GmailClient
+
+
+@dataclass
+class BatchQuery:
+    """One natural language query read in batch mode."""
+
+    query_id: str
+    text: str
+    max_results: int | None = None
+
+
+@dataclass
+class BatchResult:
+    """The Gmail query and messages found for a BatchQuery, or why it failed."""
+
+    query: BatchQuery
+    gmail_query: str
+    messages: list["EmailMessage"] = field(default_factory=list)
+    error: str | None = None
+
+
+def read_batch_queries(lines: Iterable[str]) -> list[BatchQuery]:
+    """Parse batch input, one plain-text or JSON query per line.
+
+    Args:
+        lines: Input lines, e.g. ``sys.stdin``
+
+    Returns:
+        The queries in input order
+
+    Raises:
+        ValueError: If a JSON line is malformed or has no "query" string
+    """
+    queries = []
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if not line.startswith("{"):
+            queries.append(BatchQuery(str(number), line))
+            continue
+
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as error:
+            raise ValueError(f"Line {number}: invalid JSON ({error.msg})") from error
+        text = item.get("query") if isinstance(item, dict) else None
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError(f"Line {number}: expected a non-empty \"query\" string")
+        max_results = item.get("max_results")
+        if max_results is not None and (
+            isinstance(max_results, bool) or not isinstance(max_results, int) or max_results < 0
+        ):
+            raise ValueError(f"Line {number}: \"max_results\" must be a non-negative integer")
+        queries.append(BatchQuery(str(item.get("id", number)), text.strip(), max_results))
+    return queries
+
+
+def search_batch(client: "GmailClient", results: list[BatchResult], max_results: int = 50) -> None:
+    """Fill in the messages of translated batch queries, sharing work between them.
+
+    Queries that translate to the same Gmail query are listed once, with
+    the largest limit any of them asks for. The IDs listed for every query
+    are then fetched in one pass, so a message found by several queries is
+    fetched (or looked up in the cache) once, and batch requests are filled
+    across query boundaries. A query whose listing fails gets an error and
+    does not stop the others; if the shared fetch fails, every query that
+    needed a message from it gets the error instead.
+
+    Args:
+        client: Client used for every query
+        results: Results with ``gmail_query`` set; updated in place
+        max_results: Limit for queries that do not set their own
+    """
+    metrics = client.metrics
+
+    def limit(result: BatchResult) -> int:
+        return max_results if result.query.max_results is None else result.query.max_results
+
+    limits: dict[str, int] = {}
+    for result in results:
+        limits[result.gmail_query] = max(limit(result), limits.get(result.gmail_query, 0))
+
+    listed: dict[str, list[str]] = {}
+    errors: dict[str, str] = {}
+    responses: dict[str, dict] = {}
+    for gmail_query, query_limit in limits.items():
+        local_results = client.search_locally(gmail_query, query_limit)
+        if local_results is not None:
+            metrics.increment("local_searches")
+            listed[gmail_query] = [msg["id"] for msg in local_results]
+            responses.update((msg["id"], msg) for msg in local_results)
+            continue
+        try:
+            with metrics.stage("list"):
+                listed[gmail_query] = client.list_message_ids(gmail_query, query_limit)
+        except Exception as error:
+            errors[gmail_query] = str(error)
+
+    listed_ids = [message_id for message_ids in listed.values() for message_id in message_ids]
+    missing = [message_id for message_id in dict.fromkeys(listed_ids) if message_id not in responses]
+    metrics.increment("batch.queries", len(results))
+    metrics.increment("batch.distinct_queries", len(limits))
+    metrics.increment("batch.shared_messages", len(listed_ids) - len(set(listed_ids)))
+    if missing:
+        try:
+            with metrics.stage("fetch"):
+                responses.update((msg["id"], msg) for msg in client.fetch_metadata(missing))
+        except Exception as error:
+            # Only queries that needed a fetched message fail; mirror answers stand.
+            missing_ids = set(missing)
+            for gmail_query, message_ids in listed.items():
+                if not missing_ids.isdisjoint(message_ids):
+                    errors[gmail_query] = str(error)
+
+    messages = {message_id: client.to_email_message(msg) for message_id, msg in responses.items()}
+    for result in results:
+        if result.gmail_query in errors:
+            result.error = errors[result.gmail_query]
+            continue
+        message_ids = listed[result.gmail_query][:limit(result)]
+        result.messages = [messages[message_id] for message_id in message_ids if message_id in messages]
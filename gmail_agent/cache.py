@@ -0,0 +1,154 @@
+"""Persistent on-disk cache of Gmail message metadata."""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable
+
+
+def connect_private(path: str) -> sqlite3.Connection:
+    """Open a SQLite database, creating it readable by its owner only.
+
+    The metadata cache and the mailbox mirror hold subjects and senders in
+    plaintext, so a new file is created with mode 0600, which SQLite also
+    gives its journal.
+    """
+    if path != ":memory:":
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+    return sqlite3.connect(path, check_same_thread=False)
+
+
+class MessageCache:
+    """SQLite-backed cache of ``messages.get`` metadata responses keyed by message ID.
+
+    Headers of a Gmail message never change, so cached entries stay valid
+    indefinitely. Labels do change (read, starred, archived), so when
+    ``label_ttl`` is set, entries older than that many seconds are treated as
+    misses and fetched again. The least recently used entries are evicted once
+    the cache holds more than ``max_entries`` messages.
+    """
+
+    def __init__(
+        self,
+        path: str = "message_cache.db",
+        max_entries: int = 50_000,
+        label_ttl: float | None = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.label_ttl = label_ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+
+        self._conn = connect_private(str(path))
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS messages (
+                id TEXT PRIMARY KEY,
+                header_set TEXT NOT NULL,
+                response TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS messages_accessed_at ON messages (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get_many(self, message_ids: list[str], header_set: str = "") -> dict[str, dict]:
+        """Return cached responses for the given IDs.
+
+        Args:
+            message_ids: Message IDs to look up
+            header_set: Identifies the headers the caller requested; entries
+                stored for a different header set are treated as misses
+
+        Returns:
+            Mapping of message ID to cached response, for hits only
+        """
+        if not message_ids:
+            return {}
+
+        now = self.clock()
+        hits: dict[str, dict] = {}
+        with self._lock:
+            for start in range(0, len(message_ids), 500):
+                chunk = message_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT id, header_set, response, fetched_at FROM messages "
+                    f"WHERE id IN ({placeholders})",
+                    chunk,
+                )
+                for message_id, stored_header_set, response, fetched_at in rows:
+                    if stored_header_set != header_set or self._is_stale(fetched_at, now):
+                        continue
+                    hits[message_id] = json.loads(response)
+
+            if hits:
+                self._conn.executemany(
+                    "UPDATE messages SET accessed_at = ? WHERE id = ?",
+                    [(now, message_id) for message_id in hits],
+                )
+                self._conn.commit()
+
+        return hits
+
+    def put_many(self, responses: Iterable[dict], header_set: str = "") -> None:
+        """Store ``messages.get`` responses, evicting old entries if over capacity."""
+        now = self.clock()
+        rows = [
+            (response["id"], header_set, json.dumps(response), now, now)
+            for response in responses
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO messages "
+                "(id, header_set, response, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def clear(self) -> None:
+        """Remove every cached entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM messages")
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def _is_stale(self, fetched_at: float, now: float) -> bool:
+        """Return True if an entry's labels are older than the label TTL."""
+        return self.label_ttl is not None and now - fetched_at > self.label_ttl
+
+    def _evict(self) -> None:
+        """Delete the least recently used entries beyond ``max_entries``."""
+        count = self._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM messages WHERE id IN "
+                "(SELECT id FROM messages ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
@@ -0,0 +1,148 @@
+"""Request coalescing for message metadata fetches shared by concurrent searches."""
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Iterable
+
+from gmail_agent.metrics import NULL_METRICS, Metrics
+
+# Seconds a fetched response is reused. Headers never change; labels may,
+# so the window is kept short.
+DEFAULT_TTL = 30.0
+
+DEFAULT_MAX_ENTRIES = 10_000
+
+
+class FetchCoalescer:
+    """Shares message fetches between callers so each ID is loaded once per window.
+
+    A caller asking for IDs that another caller is already loading waits
+    for that load instead of issuing its own ``messages.get``; responses
+    are then remembered for ``ttl`` seconds. Entries are keyed by a
+    namespace as well as the ID, so clients requesting different headers
+    never see each other's responses. Message IDs are only unique within
+    a mailbox: share a coalescer between clients of the same account only.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the coalescer.
+
+        Args:
+            ttl: Seconds a response is reused; 0 only shares in-flight loads
+            max_entries: Responses remembered at most, oldest dropped first
+            clock: Monotonic clock, replaceable in tests
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._memo: dict[tuple[str, str], tuple[dict, float]] = {}
+        self._in_flight: dict[tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+
+    def fetch_many(
+        self,
+        message_ids: Iterable[str],
+        load: Callable[[list[str]], list[dict]],
+        namespace: str = "",
+        metrics: Metrics | None = None,
+    ) -> dict[str, dict]:
+        """Return responses for the given IDs, loading only those nobody else has.
+
+        Remembered responses are returned at once. IDs another thread is
+        loading are waited for. The rest are passed to ``load`` in one call,
+        and other callers asking for them meanwhile wait for its result.
+
+        Args:
+            message_ids: IDs to return
+            load: Loads responses (dicts with an "id") for a list of IDs,
+                leaving out the ones it could not load
+            namespace: Separates responses that are not interchangeable,
+                e.g. ones fetched with different headers
+            metrics: Counts "coalesce.memo_hits" and "coalesce.joined" IDs
+
+        Returns:
+            Mapping of ID to response, without IDs that could not be loaded
+
+        Raises:
+            Exception: Whatever ``load`` raised; callers waiting on the failed
+                load leave those IDs out instead
+        """
+        metrics = metrics if metrics is not None else NULL_METRICS
+        found: dict[str, dict] = {}
+        waiting: dict[str, Future] = {}
+        owned: dict[str, Future] = {}
+
+        with self._lock:
+            now = self._clock()
+            for message_id in dict.fromkeys(message_ids):
+                key = (namespace, message_id)
+                entry = self._memo.get(key)
+                if entry is not None:
+                    if entry[1] > now:
+                        found[message_id] = entry[0]
+                        continue
+                    del self._memo[key]
+                future = self._in_flight.get(key)
+                if future is not None:
+                    waiting[message_id] = future
+                else:
+                    owned[message_id] = self._in_flight[key] = Future()
+
+        metrics.increment("coalesce.memo_hits", len(found))
+        metrics.increment("coalesce.joined", len(waiting))
+
+        # Load our own IDs before waiting on anyone else's, so two callers
+        # waiting on each other's loads cannot deadlock.
+        if owned:
+            found.update(self._load_owned(owned, load, namespace))
+
+        for message_id, future in waiting.items():
+            if future.exception() is None and future.result() is not None:
+                found[message_id] = future.result()
+        return found
+
+    def clear(self) -> None:
+        """Forget every remembered response, e.g. after labels changed."""
+        with self._lock:
+            self._memo.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._memo)
+
+    def _load_owned(
+        self, owned: dict[str, Future], load: Callable[[list[str]], list[dict]], namespace: str
+    ) -> dict[str, dict]:
+        """Load the IDs this caller registered and resolve their futures."""
+        try:
+            loaded = {response["id"]: response for response in load(list(owned))}
+        except BaseException as error:
+            with self._lock:
+                for message_id in owned:
+                    self._in_flight.pop((namespace, message_id), None)
+            for future in owned.values():
+                future.set_exception(error)
+            raise
+
+        expires = self._clock() + self.ttl
+        with self._lock:
+            for message_id in owned:
+                key = (namespace, message_id)
+                self._in_flight.pop(key, None)
+                if self.ttl > 0 and message_id in loaded:
+                    self._memo.pop(key, None)
+                    self._memo[key] = (loaded[message_id], expires)
+            while len(self._memo) > self.max_entries:
+                del self._memo[next(iter(self._memo))]
+
+        for message_id, future in owned.items():
+            future.set_result(loaded.get(message_id))
+        return {message_id: loaded[message_id] for message_id in owned if message_id in loaded}
@@ -1,36 +1,226 @@
 """Display formatter for email messages."""
 
-from tabulate import tabulate
+import sys
+from collections.abc import Sequence
+from email.utils import parseaddr
+from typing import TYPE_CHECKING, Callable, Iterable, TextIO
 
-from gmail_agent.gmail_client import EmailMessage
+if TYPE_CHECKING:
+    from gmail_agent.accounts import AccountMessage
+    from gmail_agent.gmail_client import EmailMessage, EmailThread
 
+HEADERS = ["Subject", "Sender", "Date"]
+THREAD_HEADERS = ["Subject", "Participants", "Latest", "Messages"]
 
-def format_messages(messages: list[EmailMessage]) -> str:
+# Column widths used when rows are printed one at a time, before the full
+# result set is known. They are also the widest a sampled column may grow.
+ROW_WIDTHS = (50, 40, 31)
+THREAD_ROW_WIDTHS = (50, 40, 31, 8)
+
+
+def message_cells(message: "EmailMessage") -> list[str]:
+    """Return the table cells for a message."""
+    return [message.subject, message.sender, message.date]
+
+
+def thread_cells(thread: "EmailThread") -> list[str]:
+    """Return the table cells for a thread, naming participants without their addresses."""
+    names = []
+    for participant in thread.participants:
+        name, address = parseaddr(participant)
+        names.append(name or address or participant)
+    return [thread.subject, ", ".join(names), thread.date, str(thread.message_count)]
+
+
+def format_messages(messages: Iterable["EmailMessage"]) -> str:
     """Format email messages as a table string.
 
     Args:
-        messages: List of EmailMessage objects to format
+        messages: EmailMessage objects to format; any iterable, including the
+            stream returned by GmailClient.iter_messages
+
+    Returns:
+        Formatted table string, or "No results found." if there are no messages
+    """
+    return format_table(message_cells(msg) for msg in messages)
+
+
+def format_threads(threads: Iterable["EmailThread"]) -> str:
+    """Format conversations as a table string, one row per thread."""
+    return format_table((thread_cells(thread) for thread in threads), headers=THREAD_HEADERS)
+
+
+def format_account_messages(items: Iterable["AccountMessage"]) -> str:
+    """Format messages from several accounts as a table with an Account column."""
+    return format_table(
+        ([item.account, item.message.subject, item.message.sender, item.message.date]
+         for item in items),
+        headers=["Account", *HEADERS],
+    )
+
+
+def format_table(rows: Iterable[Sequence[str]], headers: Sequence[str] = HEADERS) -> str:
+    """Format message rows as a table string.
+
+    Args:
+        rows: One row per message, by default [subject, sender, date]
+        headers: Column headers matching the rows
 
     Returns:
-        Formatted table string, or "No results found." if list is empty
+        Formatted table string, or "No results found." if there are no rows
     """
-    if not messages:
+    table_data = [list(row) for row in rows]
+    if not table_data:
         return "No results found."
 
-    table_data = [
-        [msg.subject, msg.sender, msg.date]
-        for msg in messages
-    ]
+    from tabulate import tabulate
+
+    return tabulate(table_data, headers=list(headers), tablefmt="grid")
+
+
+def _fit(value: str, width: int) -> str:
+    """Pad or truncate a cell value to exactly ``width`` characters."""
+    value = " ".join(value.split())
+    if len(value) > width:
+        return value[:width - 1] + "…"
+    return value.ljust(width)
 
-    headers = ["Subject", "Sender", "Date"]
 
-    return tabulate(table_data, headers=headers, tablefmt="grid")
+def format_row(cells: list[str], widths: tuple[int, ...] = ROW_WIDTHS) -> str:
+    """Format one table row with fixed column widths, truncating long values."""
+    return "| " + " | ".join(_fit(cell, width) for cell, width in zip(cells, widths)) + " |"
 
 
-def display_results(messages: list[EmailMessage]) -> None:
+def format_rule(widths: tuple[int, ...] = ROW_WIDTHS) -> str:
+    """Format a horizontal grid line matching format_row."""
+    return "+" + "+".join("-" * (width + 2) for width in widths) + "+"
+
+
+class StreamingTableRenderer:
+    """Prints a message table row by row instead of buffering the whole result set.
+
+    Column widths are either fixed up front or sampled from the first
+    ``sample_size`` rows (capped at ``max_widths``); later values that do
+    not fit are truncated. Only the sample is ever held in memory. Output is
+    flushed every ``chunk_size`` rows, so rows appear as they arrive.
+    """
+
+    def __init__(
+        self,
+        out: TextIO | None = None,
+        widths: Sequence[int] | None = None,
+        sample_size: int = 20,
+        max_widths: Sequence[int] = ROW_WIDTHS,
+        chunk_size: int = 10,
+        headers: Sequence[str] = HEADERS,
+        cells: Callable[[object], list[str]] = message_cells,
+    ):
+        """Initialize the renderer.
+
+        Args:
+            out: Stream to write to, defaulting to sys.stdout at write time
+            widths: Fixed column widths; if None they are sampled
+            sample_size: Rows buffered to choose column widths
+            max_widths: Upper bound on each sampled column width
+            chunk_size: Rows written between flushes
+            headers: Column headers
+            cells: Turns one result into its row, e.g. thread_cells
+        """
+        if sample_size < 1 or chunk_size < 1:
+            raise ValueError("sample_size and chunk_size must be at least 1")
+
+        self.out = out
+        self.widths = tuple(widths) if widths is not None else None
+        self.sample_size = sample_size
+        self.max_widths = tuple(max_widths)
+        self.chunk_size = chunk_size
+        self.headers = list(headers)
+        self.cells = cells
+        self.rows_written = 0
+        self._sample: list[list[str]] = []
+        self._unflushed = 0
+
+    def render(self, messages: Iterable["EmailMessage"]) -> int:
+        """Print every message and close the table.
+
+        Returns:
+            Number of rows printed
+        """
+        for message in messages:
+            self.add(message)
+        self.finish()
+        return self.rows_written
+
+    def add(self, message: "EmailMessage") -> None:
+        """Print one message, or hold it until the width sample is complete."""
+        cells = self.cells(message)
+        if self.widths is None:
+            self._sample.append(cells)
+            if len(self._sample) >= self.sample_size:
+                self._flush_sample()
+            return
+        self._write_row(cells)
+
+    def finish(self) -> None:
+        """Print any sampled rows, then flush; prints "No results found." if there were none."""
+        if self.widths is None and self._sample:
+            self._flush_sample()
+        if self.rows_written == 0:
+            self._write("No results found.")
+        self._stream().flush()
+
+    def _flush_sample(self) -> None:
+        """Choose column widths from the sample and print the rows held for it."""
+        self.widths = tuple(
+            min(max([len(header)] + [len(" ".join(row[i].split())) for row in self._sample]), limit)
+            for i, (header, limit) in enumerate(zip(self.headers, self.max_widths))
+        )
+        sample, self._sample = self._sample, []
+        for cells in sample:
+            self._write_row(cells)
+
+    def _write_row(self, cells: list[str]) -> None:
+        if self.rows_written == 0:
+            self._write(format_rule(self.widths))
+            self._write(format_row(self.headers, self.widths))
+            self._write(format_rule(self.widths).replace("-", "="))
+        self._write(format_row(cells, self.widths))
+        self._write(format_rule(self.widths))
+        self.rows_written += 1
+        self._unflushed += 1
+        if self._unflushed >= self.chunk_size:
+            self._stream().flush()
+            self._unflushed = 0
+
+    def _write(self, line: str) -> None:
+        self._stream().write(line + "\n")
+
+    def _stream(self) -> TextIO:
+        return self.out if self.out is not None else sys.stdout
+
+
+def display_results(messages: Iterable["EmailMessage"]) -> None:
     """Print formatted email messages to stdout.
 
+    A list is laid out with column widths fitted to every row. Any other
+    iterable, such as the stream from GmailClient.iter_messages, is printed
+    as it is consumed with StreamingTableRenderer, so the first rows appear
+    before the last are fetched.
+
     Args:
-        messages: List of EmailMessage objects to display
+        messages: EmailMessage objects to display, as a list or a stream
     """
-    print(format_messages(messages))
+    if isinstance(messages, Sequence):
+        print(format_messages(messages))
+    else:
+        StreamingTableRenderer().render(messages)
+
+
+def display_threads(threads: Iterable["EmailThread"]) -> None:
+    """Print conversations to stdout, one row each; streams like display_results."""
+    if isinstance(threads, Sequence):
+        print(format_threads(threads))
+    else:
+        StreamingTableRenderer(
+            max_widths=THREAD_ROW_WIDTHS, headers=THREAD_HEADERS, cells=thread_cells
+        ).render(threads)
@@ -1,26 +1,197 @@
 """Gmail API client for searching and retrieving messages."""
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Iterator, Sequence
 
+from googleapiclient.errors import HttpError
 
-@dataclass
+from gmail_agent.auth import gmail_service_factory
+from gmail_agent.cache import MessageCache
+from gmail_agent.coalesce import FetchCoalescer
+from gmail_agent.local_query import LocalQueryEngine, UnsupportedQuery
+from gmail_agent.metrics import NULL_METRICS, Metrics
+from gmail_agent.scheduler import RequestScheduler, is_retryable
+
+if TYPE_CHECKING:
+    from gmail_agent.sync import MailboxMirror
+
+FETCH_MODES = ("serial", "batch", "concurrent")
+
+# Gmail accepts up to 100 calls per batch request but starts rate limiting
+# well before that, so Google recommends staying at or below 50.
+BATCH_SIZE = 50
+
+# Largest page Gmail returns from messages.list.
+MAX_PAGE_SIZE = 500
+
+# Headers every EmailMessage is built from.
+DISPLAY_HEADERS = ("Subject", "From", "Date")
+
+# Partial-response masks: only the parts of each response the client reads.
+LIST_FIELDS = "messages/id,nextPageToken"
+MESSAGE_FIELDS = "id,threadId,labelIds,internalDate,payload/headers"
+THREAD_LIST_FIELDS = "threads/id,nextPageToken"
+THREAD_FIELDS = f"id,messages({MESSAGE_FIELDS})"
+
+
+def parse_date_header(value: str) -> float | None:
+    """Parse an RFC 2822 Date header to a UTC epoch timestamp, or None if it is invalid.
+
+    Dates without a zone are taken to be UTC.
+    """
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+@dataclass(slots=True)
 class EmailMessage:
-    """Represents an email message with basic metadata."""
+    """Represents an email message with basic metadata.
+
+    Slotted, so large result sets carry no per-instance ``__dict__``.
+    ``timestamp`` is the UTC epoch time in seconds: Gmail's ``internalDate``
+    when the message came from the API, otherwise parsed once from ``date``
+    at construction, so sorting never re-parses the header.
+    ``extra_headers`` is None unless the client was asked for extra headers.
+    """
+
+    subject: str
+    sender: str
+    date: str
+    extra_headers: dict[str, str] | None = None
+    message_id: str = ""
+    thread_id: str = ""
+    label_ids: tuple[str, ...] = ()
+    timestamp: float | None = None
+
+    def __post_init__(self) -> None:
+        if self.timestamp is None and self.date:
+            self.timestamp = parse_date_header(self.date)
 
+
+@dataclass(slots=True)
+class EmailThread:
+    """One conversation, collapsed to a single result row.
+
+    ``subject`` is the subject of the first message; ``sender``, ``date`` and
+    ``timestamp`` describe the latest one. ``participants`` lists each
+    distinct From value once, in order of first appearance.
+    """
+
+    thread_id: str
     subject: str
     sender: str
     date: str
+    participants: tuple[str, ...] = ()
+    message_count: int = 0
+    label_ids: tuple[str, ...] = ()
+    timestamp: float | None = None
 
 
 class GmailClient:
     """Client for interacting with Gmail API to search and retrieve messages."""
 
-    def __init__(self, service):
+    def __init__(
+        self,
+        service,
+        fetch_mode: str = "serial",
+        batch_size: int = BATCH_SIZE,
+        max_workers: int = 8,
+        service_factory: Callable[[], object] | None = None,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        extra_headers: Sequence[str] = (),
+        cache: MessageCache | None = None,
+        mirror: "MailboxMirror | None" = None,
+        mirror_max_age: float = 300.0,
+        metrics: Metrics | None = None,
+        scheduler: RequestScheduler | None = None,
+        coalescer: FetchCoalescer | None = None,
+    ):
+        """Initialize the client.
+
+        Args:
+            service: Gmail API service used for list and serial/batch fetches
+            fetch_mode: How message metadata is fetched: "serial", "batch" or "concurrent"
+            batch_size: Calls per batch request in "batch" mode (at most 100)
+            max_workers: Worker threads in "concurrent" mode
+            service_factory: Builds a new service for each worker thread; required
+                in "concurrent" mode because service objects are not thread-safe
+            max_retries: Retries for a call that fails with 429 or 5xx, when no
+                scheduler is given
+            backoff_base: Upper bound of the first jittered backoff delay in
+                seconds, doubled on each retry, when no scheduler is given
+            extra_headers: Headers to fetch in addition to Subject/From/Date,
+                exposed on EmailMessage.extra_headers
+            cache: Local metadata cache consulted before calling ``messages.get``
+            mirror: Synced mailbox mirror. While it is fresh, queries the local
+                engine can evaluate are answered entirely from it; otherwise it
+                still answers metadata lookups, so searches only call ``list``
+            mirror_max_age: Seconds since the last sync for which the mirror is
+                trusted to answer queries locally
+            metrics: Collects "list" and "fetch" stage times, API responses and
+                their size, retries and mirror/cache hits
+            scheduler: Rate limiter and retry policy for every API call. Defaults
+                to one that keeps this client within Gmail's per-user quota;
+                pass the same scheduler to clients acting for the same user
+            coalescer: Shares metadata loads between concurrent searches and
+                reuses responses for a short window. Defaults to one for this
+                client; clients of the same account may share one
+        """
+        if fetch_mode not in FETCH_MODES:
+            raise ValueError(
+                f"fetch_mode must be one of {', '.join(FETCH_MODES)}, got {fetch_mode!r}"
+            )
+        if not 1 <= batch_size <= 100:
+            raise ValueError("batch_size must be between 1 and 100")
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if fetch_mode == "concurrent" and service_factory is None:
+            raise ValueError("service_factory is required for concurrent fetch mode")
+
         self.service = service
+        self.fetch_mode = fetch_mode
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.service_factory = service_factory
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.extra_headers = tuple(extra_headers)
+        self.metadata_headers = list(dict.fromkeys(DISPLAY_HEADERS + self.extra_headers))
+        self.cache = cache
+        self.mirror = mirror
+        self.local_engine = LocalQueryEngine(mirror, max_age=mirror_max_age) if mirror else None
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        self.scheduler = scheduler or RequestScheduler(
+            max_retries=max_retries, backoff_base=backoff_base, metrics=self.metrics
+        )
+        self.coalescer = coalescer if coalescer is not None else FetchCoalescer()
+        self._executor: ThreadPoolExecutor | None = None
+        self._thread_local = threading.local()
+        self._list_service = None
+
+    def close(self) -> None:
+        """Shut down the worker pool used by the concurrent fetch mode."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
 
     def search_messages(self, query: str, max_results: int = 50) -> list[EmailMessage]:
         """Search for messages in INBOX matching the given query.
 
+        Result sets larger than one ``list`` page are followed across pages.
+        If a call fails for good part way through, the messages fetched
+        before it are still returned.
+
         Args:
             query: Gmail search query string
             max_results: Maximum number of results to return
@@ -28,42 +199,560 @@ class GmailClient:
         Returns:
             List of EmailMessage objects
         """
+        page_size = min(max(max_results, 1), MAX_PAGE_SIZE)
+        return self._collect(self.iter_messages(query, max_results=max_results, page_size=page_size))
+
+    @staticmethod
+    def _collect(results: Iterator) -> list:
+        """Drain a result stream, keeping what arrived before any error."""
+        collected = []
         try:
-            results = (
-                self.service.users()
-                .messages()
-                .list(userId="me", q=query, labelIds=["INBOX"], maxResults=max_results)
-                .execute()
-            )
+            for result in results:
+                collected.append(result)
+        except Exception:
+            pass
+        return collected
+
+    def iter_messages(
+        self, query: str, max_results: int | None = None, page_size: int = 100
+    ) -> Iterator[EmailMessage]:
+        """Stream messages in INBOX matching the query, following ``nextPageToken``.
+
+        While one page's metadata is being fetched, the next page is listed in
+        the background, so paging costs no extra wall time. Messages are yielded
+        page by page and nothing beyond the current page is held in memory.
+
+        When a fresh mirror is configured and the query only uses operators
+        the local engine understands, results come from the mirror with no
+        API calls at all.
+
+        Args:
+            query: Gmail search query string
+            max_results: Maximum number of results to yield, or None for all matches
+            page_size: Message IDs requested per ``list`` call (at most 500)
+
+        Yields:
+            EmailMessage objects in the order Gmail lists them
+        """
+        if not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"page_size must be between 1 and {MAX_PAGE_SIZE}")
+
+        if max_results == 0:
+            return
+
+        local_results = self.search_locally(query, max_results)
+        if local_results is not None:
+            self.metrics.increment("local_searches")
+            for msg in local_results:
+                yield self.to_email_message(msg)
+            return
+
+        pages = self._iter_listed(self._list_page, "messages", query, max_results, page_size)
+        for message_ids in pages:
+            with self.metrics.stage("fetch"):
+                responses = self.fetch_metadata(message_ids)
+            for msg in responses:
+                yield self.to_email_message(msg)
+
+    def search_threads(self, query: str, max_results: int = 50) -> list[EmailThread]:
+        """Search for conversations in INBOX matching the given query.
+
+        Args:
+            query: Gmail search query string
+            max_results: Maximum number of threads to return
+
+        Returns:
+            One EmailThread per matching conversation
+        """
+        page_size = min(max(max_results, 1), MAX_PAGE_SIZE)
+        return self._collect(self.iter_threads(query, max_results=max_results, page_size=page_size))
+
+    def iter_threads(
+        self, query: str, max_results: int | None = None, page_size: int = 100
+    ) -> Iterator[EmailThread]:
+        """Stream conversations in INBOX matching the query, one row per thread.
+
+        Uses ``threads.list`` and one ``threads.get`` (metadata format) per
+        thread instead of a ``messages.get`` per message, so long
+        conversations and mailing lists cost one call and one row each.
+        Threads are always fetched from the API: the mirror and cache hold
+        single messages, and a thread changes whenever someone replies.
+
+        Args:
+            query: Gmail search query string
+            max_results: Maximum number of threads to yield, or None for all matches
+            page_size: Thread IDs requested per ``list`` call (at most 500)
+
+        Yields:
+            EmailThread objects in the order Gmail lists them
+        """
+        if not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"page_size must be between 1 and {MAX_PAGE_SIZE}")
+
+        if max_results == 0:
+            return
 
-            messages = results.get("messages", [])
+        pages = self._iter_listed(self._list_thread_page, "threads", query, max_results, page_size)
+        for thread_ids in pages:
+            with self.metrics.stage("fetch"):
+                threads = self._fetch_from_api(thread_ids, self._thread_request)
+            self.metrics.record_responses("threads.get", threads)
+            for thread in threads:
+                yield self.to_email_thread(thread)
 
-            email_messages = []
-            for msg_ref in messages[:max_results]:
-                msg = (
-                    self.service.users()
-                    .messages()
-                    .get(userId="me", id=msg_ref["id"], format="metadata")
-                    .execute()
-                )
+    def _iter_listed(
+        self, list_page: Callable, key: str, query: str, max_results: int | None, page_size: int
+    ) -> Iterator[list[str]]:
+        """Yield the IDs on each ``list`` page, capped at ``max_results`` in total.
 
-                headers = msg["payload"]["headers"]
-                email_messages.append(
-                    EmailMessage(
-                        subject=self._get_header_value(headers, "Subject"),
-                        sender=self._get_header_value(headers, "From"),
-                        date=self._get_header_value(headers, "Date"),
-                    )
-                )
+        While the caller works on one page, the next is listed in the
+        background when a spare service is available.
+
+        Args:
+            list_page: ``_list_page`` or ``_list_thread_page``
+            key: Response field holding the listed items: "messages" or "threads"
+            query: Gmail search query string
+            max_results: Maximum number of IDs to yield, or None for all matches
+            page_size: IDs requested per ``list`` call
+        """
+        def list_counted(service, page_token: str | None, limit: int) -> dict:
+            with self.metrics.stage("list"):
+                page = list_page(service, query, page_token, limit)
+            self.metrics.record_responses(f"{key}.list", [page])
+            return page
 
-            return email_messages
+        list_service = self._prefetch_service()
+        prefetcher = ThreadPoolExecutor(max_workers=1) if list_service else None
+        remaining = max_results
+
+        try:
+            page = list_counted(self.service, None, self._page_limit(page_size, remaining))
+            while True:
+                item_ids = [item["id"] for item in page.get(key, [])]
+                if remaining is not None:
+                    item_ids = item_ids[:remaining]
+                    remaining -= len(item_ids)
+
+                page_token = page.get("nextPageToken")
+                has_more = bool(page_token) and remaining != 0
+                limit = self._page_limit(page_size, remaining)
+
+                next_page = None
+                if has_more and prefetcher:
+                    next_page = prefetcher.submit(list_counted, list_service, page_token, limit)
+
+                yield item_ids
+
+                if not has_more:
+                    return
+                if next_page is not None:
+                    page = next_page.result()
+                else:
+                    page = list_counted(self.service, page_token, limit)
+        finally:
+            if prefetcher:
+                prefetcher.shutdown(wait=True)
+
+    def search_locally(self, query: str, max_results: int | None) -> list[dict] | None:
+        """Answer a query from a fresh mirror, or return None if the API must be used."""
+        if self.local_engine is None or not self._mirror_has_headers():
+            return None
+        if not self.local_engine.is_fresh():
+            return None
+        try:
+            return self.local_engine.search(query, max_results=max_results)
+        except UnsupportedQuery:
+            return None
 
+    def _prefetch_service(self):
+        """Return a service the page prefetcher may use from another thread, if any.
+
+        In concurrent mode the workers have their own services and ``self.service``
+        is idle during metadata fetches; otherwise a dedicated service is needed.
+        """
+        if self.fetch_mode == "concurrent":
+            return self.service
+        if self.service_factory is None:
+            return None
+        if self._list_service is None:
+            self._list_service = self.service_factory()
+        return self._list_service
+
+    @staticmethod
+    def _page_limit(page_size: int, remaining: int | None) -> int:
+        """Return the ``maxResults`` value for the next ``list`` call."""
+        return page_size if remaining is None else min(page_size, remaining)
+
+    def list_message_ids(self, query: str, max_results: int) -> list[str]:
+        """List up to ``max_results`` INBOX message IDs matching the query."""
+        message_ids: list[str] = []
+        page_token = None
+        while len(message_ids) < max_results:
+            limit = min(MAX_PAGE_SIZE, max_results - len(message_ids))
+            page = self._list_page(self.service, query, page_token, limit)
+            message_ids.extend(msg_ref["id"] for msg_ref in page.get("messages", []))
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                break
+        return message_ids[:max_results]
+
+    def iter_message_ids(
+        self, query: str = "", label: str = "INBOX", page_size: int = MAX_PAGE_SIZE
+    ) -> Iterator[str]:
+        """Yield the ID of every message under ``label`` matching the query.
+
+        Args:
+            query: Gmail search query string; empty matches everything
+            label: Label ID to list messages from
+            page_size: Message IDs requested per ``list`` call (at most 500)
+
+        Yields:
+            Message IDs in the order Gmail lists them
+        """
+        page_token = None
+        while True:
+            page = self._list_page(self.service, query, page_token, page_size, label)
+            for msg_ref in page.get("messages", []):
+                yield msg_ref["id"]
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                return
+
+    def _list_page(
+        self, service, query: str, page_token: str | None, limit: int, label: str = "INBOX"
+    ) -> dict:
+        """List one page of message IDs under ``label`` matching the query."""
+        kwargs = {"pageToken": page_token} if page_token else {}
+        request = service.users().messages().list(
+            userId="me",
+            q=query,
+            labelIds=[label],
+            maxResults=limit,
+            fields=LIST_FIELDS,
+            **kwargs,
+        )
+        return self.scheduler.execute(request)
+
+    def _list_thread_page(
+        self, service, query: str, page_token: str | None, limit: int, label: str = "INBOX"
+    ) -> dict:
+        """List one page of thread IDs under ``label`` matching the query."""
+        kwargs = {"pageToken": page_token} if page_token else {}
+        request = service.users().threads().list(
+            userId="me",
+            q=query,
+            labelIds=[label],
+            maxResults=limit,
+            fields=THREAD_LIST_FIELDS,
+            **kwargs,
+        )
+        return self.scheduler.execute(request)
+
+    def fetch_metadata(self, message_ids: list[str]) -> list[dict]:
+        """Fetch ``messages.get`` metadata for the given IDs, preserving their order.
+
+        Each distinct message is loaded once per coalescing window, however
+        many searches ask for it: IDs already loaded or being loaded by another
+        search are shared. The rest are served from the mailbox mirror and then
+        the cache when configured; only IDs found in neither are requested from
+        Gmail. Messages that could not be fetched are left out.
+        """
+        responses = self.coalescer.fetch_many(
+            message_ids, self._load_metadata, ",".join(self.metadata_headers), self.metrics
+        )
+        return [responses[message_id] for message_id in message_ids if message_id in responses]
+
+    def fetch_message(self, message_id: str) -> dict | None:
+        """Fetch one message's metadata; safe to call from many threads at once.
+
+        The mirror and cache are consulted first. API calls use the calling
+        thread's own service from ``service_factory``, with backoff on 429/5xx.
+
+        Returns:
+            The ``messages.get`` response, or None if it could not be fetched
+        """
+        if self.service_factory is None:
+            raise ValueError("service_factory is required to fetch from multiple threads")
+
+        load = partial(self._load_metadata, in_worker=True)
+        responses = self.coalescer.fetch_many(
+            [message_id], load, ",".join(self.metadata_headers), self.metrics
+        )
+        return responses.get(message_id)
+
+    def _load_metadata(self, message_ids: list[str], in_worker: bool = False) -> list[dict]:
+        """Load metadata from the mirror, the cache and then Gmail, skipping the coalescer.
+
+        Args:
+            message_ids: Distinct IDs to load
+            in_worker: Fetch one by one with the calling thread's own service
+                instead of with the configured fetch mode
+        """
+        if self.mirror is None and self.cache is None:
+            responses = {}
+            missing = message_ids
+        else:
+            responses = self._lookup_local(message_ids)
+            missing = [message_id for message_id in message_ids if message_id not in responses]
+
+        if missing:
+            if in_worker:
+                fetched = [
+                    response
+                    for response in map(self._fetch_one_in_worker, missing)
+                    if response is not None
+                ]
+            else:
+                fetched = self._fetch_from_api(missing)
+            self.metrics.record_responses("messages.get", fetched)
+            if self.cache is not None:
+                self.cache.put_many(fetched, ",".join(self.metadata_headers))
+            responses.update((response["id"], response) for response in fetched)
+
+        return list(responses.values())
+
+    def _lookup_local(self, message_ids: list[str]) -> dict[str, dict]:
+        """Return responses the mirror or cache already hold for the given IDs."""
+        responses: dict[str, dict] = {}
+        if self.mirror is not None and self._mirror_has_headers():
+            responses.update(self.mirror.get_many(message_ids))
+            self.metrics.increment("mirror.hits", len(responses))
+
+        missing = [message_id for message_id in message_ids if message_id not in responses]
+        if missing and self.cache is not None:
+            cached = self.cache.get_many(missing, ",".join(self.metadata_headers))
+            self.metrics.increment("cache.hits", len(cached))
+            self.metrics.increment("cache.misses", len(missing) - len(cached))
+            responses.update(cached)
+        return responses
+
+    def _mirror_has_headers(self) -> bool:
+        """Return True if the mirror stores every header this client requests."""
+        return set(self.metadata_headers) <= set(self.mirror.header_set)
+
+    def _fetch_from_api(self, message_ids: list[str], build_request=None) -> list[dict]:
+        """Fetch metadata from Gmail using the configured fetch mode.
+
+        Args:
+            message_ids: IDs to fetch
+            build_request: Builds the ``get`` request for an ID and optional
+                service; defaults to ``_metadata_request``
+        """
+        build_request = build_request or self._metadata_request
+        if self.fetch_mode == "batch":
+            return self._fetch_metadata_batched(message_ids, build_request)
+        if self.fetch_mode == "concurrent":
+            return self._fetch_metadata_concurrently(message_ids, build_request)
+
+        responses = []
+        for message_id in message_ids:
+            try:
+                responses.append(self.scheduler.execute(build_request(message_id)))
+            except Exception:
+                continue
+        return responses
+
+    def _fetch_metadata_concurrently(self, message_ids: list[str], build_request=None) -> list[dict]:
+        """Fetch metadata on the worker pool, one service object per worker thread.
+
+        Messages whose call still fails after retries are left out of the result.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="gmail-fetch"
+            )
+
+        fetch = partial(self._fetch_one_in_worker, build_request=build_request)
+        responses = self._executor.map(fetch, message_ids)
+        return [response for response in responses if response is not None]
+
+    def _fetch_one_in_worker(self, message_id: str, build_request=None) -> dict | None:
+        """Fetch one message's metadata using the calling thread's own service."""
+        service = getattr(self._thread_local, "service", None)
+        if service is None:
+            service = self.service_factory()
+            self._thread_local.service = service
+
+        build_request = build_request or self._metadata_request
+        try:
+            return self.scheduler.execute(build_request(message_id, service))
         except Exception:
-            return []
+            return None
+
+    def _fetch_metadata_batched(self, message_ids: list[str], build_request=None) -> list[dict]:
+        """Fetch metadata using Gmail batch requests of at most ``batch_size`` calls.
+
+        Items that fail with a retryable error are collected and sent again in
+        follow-up batches after the scheduler's backoff, up to its retry limit;
+        items that still fail are left out of the result.
+        """
+        responses: dict[str, dict] = {}
+        pending = list(dict.fromkeys(message_ids))
+
+        for attempt in range(self.scheduler.max_retries + 1):
+            failed: list[tuple[str, Exception]] = []
+            for start in range(0, len(pending), self.batch_size):
+                chunk = pending[start:start + self.batch_size]
+                failed.extend(self._execute_batch(chunk, responses, build_request))
+            if not failed or attempt == self.scheduler.max_retries:
+                break
+            for _, error in failed:
+                self.scheduler.record_failure(error)
+            self.scheduler.backoff(attempt)
+            pending = [message_id for message_id, _ in failed]
+
+        return [responses[message_id] for message_id in message_ids if message_id in responses]
+
+    def _execute_batch(
+        self, message_ids: list[str], responses: dict[str, dict], build_request=None
+    ) -> list[tuple[str, Exception]]:
+        """Run one batch request within the quota, storing successes in ``responses``.
+
+        Returns:
+            The ID and error of every call worth retrying: rate limits, 5xx
+            responses and failures that are not HTTP errors. Calls rejected
+            for good (e.g. 404 for a deleted message) are dropped. If the
+            batch request itself fails with a retryable error, every call in
+            it is returned.
+        """
+        failed: list[tuple[str, Exception]] = []
 
-    def _get_header_value(self, headers: list[dict], name: str) -> str:
-        """Extract header value by name from headers list."""
+        def callback(request_id, response, exception):
+            if exception is None:
+                responses[request_id] = response
+            elif not isinstance(exception, HttpError) or is_retryable(exception):
+                failed.append((request_id, exception))
+
+        build_request = build_request or self._metadata_request
+        batch = self.service.new_batch_http_request(callback=callback)
+        requests = [build_request(message_id) for message_id in message_ids]
+        for message_id, request in zip(message_ids, requests):
+            batch.add(request, request_id=message_id)
+
+        self.scheduler.acquire(requests)
+        try:
+            batch.execute()
+        except Exception as error:
+            if not is_retryable(error):
+                raise
+            return [(message_id, error) for message_id in message_ids]
+        finally:
+            self.metrics.increment("api.batch")
+
+        if len(failed) < len(message_ids):
+            self.scheduler.record_success()
+        return failed
+
+    def _metadata_request(self, message_id: str, service=None):
+        """Build the ``messages.get`` request for a message's metadata."""
+        service = service or self.service
+        return (
+            service.users()
+            .messages()
+            .get(
+                userId="me",
+                id=message_id,
+                format="metadata",
+                metadataHeaders=self.metadata_headers,
+                fields=MESSAGE_FIELDS,
+            )
+        )
+
+    def _thread_request(self, thread_id: str, service=None):
+        """Build the ``threads.get`` request for a thread's message metadata."""
+        service = service or self.service
+        return (
+            service.users()
+            .threads()
+            .get(
+                userId="me",
+                id=thread_id,
+                format="metadata",
+                metadataHeaders=self.metadata_headers,
+                fields=THREAD_FIELDS,
+            )
+        )
+
+    def to_email_thread(self, thread: dict) -> EmailThread:
+        """Collapse a ``threads.get`` metadata response to one EmailThread."""
+        messages = [self.to_email_message(msg) for msg in thread.get("messages", [])]
+        if not messages:
+            return EmailThread(thread_id=thread["id"], subject="", sender="", date="")
+
+        # Gmail lists thread messages oldest first, so the later one wins a tie.
+        latest = max(
+            reversed(messages),
+            key=lambda msg: -1.0 if msg.timestamp is None else msg.timestamp,
+        )
+        return EmailThread(
+            thread_id=thread["id"],
+            subject=messages[0].subject,
+            sender=latest.sender,
+            date=latest.date,
+            participants=tuple(dict.fromkeys(msg.sender for msg in messages if msg.sender)),
+            message_count=len(messages),
+            label_ids=tuple(dict.fromkeys(label for msg in messages for label in msg.label_ids)),
+            timestamp=latest.timestamp,
+        )
+
+    def to_email_message(self, msg: dict) -> EmailMessage:
+        """Convert a ``messages.get`` metadata response to an EmailMessage."""
+        headers = self._headers_to_dict(msg["payload"].get("headers", []))
+        internal_date = msg.get("internalDate")
+        return EmailMessage(
+            subject=headers.get("subject", ""),
+            sender=headers.get("from", ""),
+            date=headers.get("date", ""),
+            extra_headers={
+                name: headers.get(name.lower(), "") for name in self.extra_headers
+            } if self.extra_headers else None,
+            message_id=msg.get("id", ""),
+            thread_id=msg.get("threadId", ""),
+            label_ids=tuple(msg.get("labelIds", ())),
+            timestamp=int(internal_date) / 1000 if internal_date else None,
+        )
+
+    @staticmethod
+    def _headers_to_dict(headers: list[dict]) -> dict[str, str]:
+        """Index headers by lower-cased name in one pass; the first occurrence wins."""
+        values: dict[str, str] = {}
         for header in headers:
-            if header["name"] == name:
-                return header["value"]
-        return ""
+            values.setdefault(header["name"].lower(), header["value"])
+        return values
+
+
+def create_client(
+    service,
+    token_file: str,
+    fetch_mode: str = "batch",
+    max_workers: int = 8,
+    cache_file: str | None = None,
+    cache_label_ttl: float | None = None,
+    mirror: "MailboxMirror | None" = None,
+    metrics: Metrics | None = None,
+) -> GmailClient:
+    """Build the GmailClient the command line, the server and the account pool use.
+
+    The client always gets a service factory: besides the concurrent fetch
+    workers, the next-page prefetch in every fetch mode lists on its own service.
+
+    Args:
+        service: Gmail API service for the account
+        token_file: Encrypted token file the per-thread services are built from
+        fetch_mode: Metadata fetch strategy: "serial", "batch" or "concurrent"
+        max_workers: Worker threads used by the concurrent fetch mode
+        cache_file: Path to the on-disk message metadata cache, or None to disable it
+        cache_label_ttl: Seconds after which cached labels are refetched, or None
+            to keep cached entries until they are evicted
+        mirror: Synced mailbox mirror to search through, or None
+        metrics: Metrics collecting per-stage timings and API counters, or None
+    """
+    return GmailClient(
+        service,
+        fetch_mode=fetch_mode,
+        max_workers=max_workers,
+        service_factory=gmail_service_factory(token_file=token_file),
+        cache=MessageCache(cache_file, label_ttl=cache_label_ttl) if cache_file else None,
+        mirror=mirror,
+        metrics=metrics,
+    )
@@ -0,0 +1,340 @@
+"""Local evaluation of Gmail search queries against mirrored message metadata."""
+
+import bisect
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import getaddresses
+from typing import TYPE_CHECKING, Callable, Iterable, Union
+
+if TYPE_CHECKING:
+    from gmail_agent.sync import MailboxMirror
+
+DAY_MS = 86_400_000
+
+# Gmail's relative-date units, in days.
+RELATIVE_UNITS = {"d": 1, "m": 30, "y": 365}
+
+STATUS_LABELS = {"unread": "UNREAD", "starred": "STARRED", "important": "IMPORTANT"}
+
+_TOKEN_PATTERN = re.compile(r'\(|\)|-?[\w.+@-]+:"[^"]*"|"[^"]*"|[^\s()]+')
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+class UnsupportedQuery(ValueError):
+    """Raised when a query uses syntax the local engine cannot evaluate exactly."""
+
+
+@dataclass(frozen=True)
+class Term:
+    """A single ``operator:value`` condition."""
+
+    operator: str
+    value: str
+
+
+@dataclass(frozen=True)
+class Not:
+    """Negation of a node (``-term``)."""
+
+    node: "Node"
+
+
+@dataclass(frozen=True)
+class And:
+    """All child nodes must match."""
+
+    nodes: tuple["Node", ...]
+
+
+@dataclass(frozen=True)
+class Or:
+    """Any child node may match."""
+
+    nodes: tuple["Node", ...]
+
+
+Node = Union[Term, Not, And, Or]
+
+
+def parse_query(query: str) -> Node:
+    """Parse a Gmail query into a tree of Term/Not/And/Or nodes.
+
+    Supports the operators the NLP parser emits (from, to, subject, is,
+    has, newer_than, older_than, after, before), implicit AND, ``OR``,
+    ``-`` negation, parentheses and quoted values.
+
+    Raises:
+        UnsupportedQuery: If the query contains free text or unknown syntax
+    """
+    tokens = _TOKEN_PATTERN.findall(query)
+    node, position = _parse_or(tokens, 0)
+    if position != len(tokens):
+        raise UnsupportedQuery(f"Unexpected {tokens[position]!r} in query")
+    return node
+
+
+def _parse_or(tokens: list[str], position: int) -> tuple[Node, int]:
+    nodes = []
+    node, position = _parse_and(tokens, position)
+    nodes.append(node)
+    while position < len(tokens) and tokens[position] == "OR":
+        node, position = _parse_and(tokens, position + 1)
+        nodes.append(node)
+    return (nodes[0] if len(nodes) == 1 else Or(tuple(nodes))), position
+
+
+def _parse_and(tokens: list[str], position: int) -> tuple[Node, int]:
+    nodes = []
+    while position < len(tokens) and tokens[position] not in ("OR", ")"):
+        token = tokens[position]
+        if token == "(":
+            node, position = _parse_or(tokens, position + 1)
+            if position >= len(tokens) or tokens[position] != ")":
+                raise UnsupportedQuery("Unbalanced parentheses in query")
+            position += 1
+        elif token == "-":
+            raise UnsupportedQuery("Negated groups are not supported locally")
+        else:
+            node = _parse_term(token)
+            position += 1
+        nodes.append(node)
+
+    if not nodes:
+        raise UnsupportedQuery("Empty query clause")
+    return (nodes[0] if len(nodes) == 1 else And(tuple(nodes))), position
+
+
+def _parse_term(token: str) -> Node:
+    negated = token.startswith("-")
+    if negated:
+        token = token[1:]
+
+    operator, separator, value = token.partition(":")
+    if not separator or not value:
+        raise UnsupportedQuery(f"Free-text search term {token!r} needs the full message")
+
+    term = Term(operator.lower(), value.strip('"').lower())
+    if term.operator not in LocalIndex.OPERATORS:
+        raise UnsupportedQuery(f"Operator {operator!r} is not supported locally")
+    return Not(term) if negated else term
+
+
+def _words(text: str) -> list[str]:
+    return _WORD_PATTERN.findall(text.lower())
+
+
+def _address_tokens(header_value: str) -> set[str]:
+    """Index terms for an address header: addresses, domains, parent domains and words."""
+    tokens: set[str] = set()
+    for name, address in getaddresses([header_value]):
+        address = address.lower()
+        tokens.update(_words(name))
+        if not address:
+            continue
+        tokens.add(address)
+        local_part, _, domain = address.partition("@")
+        tokens.update(_words(local_part))
+        labels = domain.split(".")
+        for start in range(len(labels) - 1):
+            tokens.add(".".join(labels[start:]))
+        tokens.update(labels)
+    return tokens
+
+
+class LocalIndex:
+    """In-memory indexes over mirrored ``messages.get`` responses.
+
+    Senders and recipients are indexed by address, domain (and parent
+    domains) and name words; subjects by word; labels by ID; and dates in a
+    sorted list so date ranges are answered by binary search.
+    """
+
+    OPERATORS = frozenset(
+        {"from", "to", "subject", "is", "has", "newer_than", "older_than", "after", "before"}
+    )
+
+    def __init__(self, responses: Iterable[dict], headers: Iterable[str] = ("Subject", "From", "Date")):
+        self.headers = {name.lower() for name in headers}
+        self.responses: dict[str, dict] = {}
+        self.dates: dict[str, int] = {}
+        self.sender_index: dict[str, set[str]] = {}
+        self.recipient_index: dict[str, set[str]] = {}
+        self.subject_index: dict[str, set[str]] = {}
+        self.label_index: dict[str, set[str]] = {}
+        self._date_keys: list[int] = []
+        self._date_ids: list[str] = []
+
+        for response in responses:
+            self._add(response)
+
+        order = sorted(self.dates.items(), key=lambda item: item[1])
+        self._date_ids = [message_id for message_id, _ in order]
+        self._date_keys = [date for _, date in order]
+
+    def __len__(self) -> int:
+        return len(self.responses)
+
+    def _add(self, response: dict) -> None:
+        message_id = response["id"]
+        self.responses[message_id] = response
+        self.dates[message_id] = int(response.get("internalDate", 0))
+
+        for label in response.get("labelIds", []):
+            self.label_index.setdefault(label, set()).add(message_id)
+
+        headers: dict[str, str] = {}
+        for header in response.get("payload", {}).get("headers", []):
+            headers.setdefault(header["name"].lower(), header["value"])
+
+        for token in _address_tokens(headers.get("from", "")):
+            self.sender_index.setdefault(token, set()).add(message_id)
+        for token in _address_tokens(headers.get("to", "")):
+            self.recipient_index.setdefault(token, set()).add(message_id)
+        for token in _words(headers.get("subject", "")):
+            self.subject_index.setdefault(token, set()).add(message_id)
+
+    def evaluate(self, node: Node, now_ms: int) -> set[str]:
+        """Return the IDs of messages matching a parsed query."""
+        if isinstance(node, And):
+            result = self.evaluate(node.nodes[0], now_ms)
+            for child in node.nodes[1:]:
+                result = result & self.evaluate(child, now_ms)
+            return result
+        if isinstance(node, Or):
+            return set().union(*(self.evaluate(child, now_ms) for child in node.nodes))
+        if isinstance(node, Not):
+            return set(self.responses) - self.evaluate(node.node, now_ms)
+        return self._evaluate_term(node, now_ms)
+
+    def check(self, node: Node) -> None:
+        """Raise UnsupportedQuery if any term cannot be answered from this index."""
+        if isinstance(node, (And, Or)):
+            for child in node.nodes:
+                self.check(child)
+        elif isinstance(node, Not):
+            self.check(node.node)
+        elif node.operator == "to" and "to" not in self.headers:
+            raise UnsupportedQuery("The index does not store the To header")
+        elif node.operator == "has":
+            raise UnsupportedQuery("Attachments are not visible in message metadata")
+        elif node.operator == "is" and node.value not in STATUS_LABELS and node.value != "read":
+            raise UnsupportedQuery(f"is:{node.value} is not supported locally")
+
+    def _evaluate_term(self, term: Term, now_ms: int) -> set[str]:
+        operator, value = term.operator, term.value
+        if operator == "from":
+            return self._lookup_address(self.sender_index, value)
+        if operator == "to":
+            return self._lookup_address(self.recipient_index, value)
+        if operator == "subject":
+            return self._lookup_words(self.subject_index, _words(value))
+        if operator == "is":
+            if value == "read":
+                return set(self.responses) - self.label_index.get("UNREAD", set())
+            return set(self.label_index.get(STATUS_LABELS[value], set()))
+        if operator in ("newer_than", "older_than"):
+            cutoff = now_ms - self._relative_days(value) * DAY_MS
+            if operator == "newer_than":
+                return self._date_range(start=cutoff)
+            return self._date_range(end=cutoff)
+        if operator == "after":
+            return self._date_range(start=self._absolute_date(value))
+        if operator == "before":
+            return self._date_range(end=self._absolute_date(value))
+        raise UnsupportedQuery(f"Operator {operator!r} is not supported locally")
+
+    def _lookup_address(self, index: dict[str, set[str]], value: str) -> set[str]:
+        if "@" in value or "." in value:
+            return set(index.get(value, set()))
+        return self._lookup_words(index, _words(value))
+
+    @staticmethod
+    def _lookup_words(index: dict[str, set[str]], words: list[str]) -> set[str]:
+        if not words:
+            return set()
+        result = set(index.get(words[0], set()))
+        for word in words[1:]:
+            result &= index.get(word, set())
+        return result
+
+    def _date_range(self, start: int | None = None, end: int | None = None) -> set[str]:
+        """IDs with ``start <= internalDate < end``."""
+        low = 0 if start is None else bisect.bisect_left(self._date_keys, start)
+        high = len(self._date_keys) if end is None else bisect.bisect_left(self._date_keys, end)
+        return set(self._date_ids[low:high])
+
+    @staticmethod
+    def _relative_days(value: str) -> int:
+        match = re.fullmatch(r"(\d+)([dmy])", value)
+        if not match:
+            raise UnsupportedQuery(f"Invalid relative date {value!r}")
+        return int(match.group(1)) * RELATIVE_UNITS[match.group(2)]
+
+    @staticmethod
+    def _absolute_date(value: str) -> int:
+        """Milliseconds since the epoch for a Gmail date (YYYY/MM/DD or epoch seconds)."""
+        if value.isdigit():
+            return int(value) * 1000
+        for date_format in ("%Y/%m/%d", "%Y-%m-%d"):
+            try:
+                parsed = datetime.strptime(value, date_format).replace(tzinfo=timezone.utc)
+                return int(parsed.timestamp() * 1000)
+            except ValueError:
+                continue
+        raise UnsupportedQuery(f"Invalid date {value!r}")
+
+
+class LocalQueryEngine:
+    """Answers Gmail queries from a MailboxMirror without calling the API.
+
+    The index is rebuilt lazily whenever the mirror's history ID changes.
+    A mirror counts as up to date if it was synced within ``max_age`` seconds.
+    """
+
+    def __init__(self, mirror: "MailboxMirror", max_age: float = 300.0,
+                 clock: Callable[[], float] = time.time):
+        self.mirror = mirror
+        self.max_age = max_age
+        self.clock = clock
+        self._index: LocalIndex | None = None
+        self._indexed_history_id: str | None = None
+
+    def is_fresh(self) -> bool:
+        """Return True if the mirror was synced recently enough to answer queries.
+
+        A mirror with messages still pending is missing results, so it is never fresh.
+        """
+        synced_at = self.mirror.synced_at
+        if synced_at is None or self.mirror.pending_ids:
+            return False
+        return self.clock() - synced_at <= self.max_age
+
+    @property
+    def index(self) -> LocalIndex:
+        """The index for the mirror's current contents."""
+        history_id = self.mirror.history_id
+        if self._index is None or history_id != self._indexed_history_id:
+            self._index = LocalIndex(self.mirror.iter_responses(), self.mirror.header_set)
+            self._indexed_history_id = history_id
+        return self._index
+
+    def search(self, query: str, max_results: int | None = None) -> list[dict]:
+        """Return mirrored responses matching the query, newest first.
+
+        Raises:
+            UnsupportedQuery: If the query cannot be answered exactly from the index
+        """
+        node = parse_query(query) if query.strip() else None
+        index = self.index
+        if node is None:
+            matches = set(index.responses)
+        else:
+            index.check(node)
+            matches = index.evaluate(node, int(self.clock() * 1000))
+
+        ordered = sorted(matches, key=lambda message_id: index.dates[message_id], reverse=True)
+        if max_results is not None:
+            ordered = ordered[:max_results]
+        return [index.responses[message_id] for message_id in ordered]
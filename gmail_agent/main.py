@@ -1,16 +1,25 @@
 """Main orchestration for the Gmail AI agent."""
 
+import argparse
+import json
 import sys
+from pathlib import Path
 
 from dotenv import load_dotenv
 
-from gmail_agent.auth import get_gmail_service
-from gmail_agent.display import display_results
-from gmail_agent.gmail_client import GmailClient
-from gmail_agent.nlp_parser import GmailQueryParser
+from gmail_agent.output import OUTPUT_FORMATS, write_messages
+from gmail_agent.remote import DEFAULT_SOCKET_PATH
 
 load_dotenv()
 
+DEFAULT_CACHE_FILE = "message_cache.db"
+DEFAULT_TRANSLATION_CACHE_FILE = "translation_cache.json"
+
+# Kept in step with gmail_client.FETCH_MODES. Modules that load the Google
+# client libraries are imported inside the functions that need them, so that
+# --help, an empty query and argument errors return without loading them.
+FETCH_MODES = ("serial", "batch", "concurrent")
+
 
 def get_user_query() -> str:
     """Get user query from stdin or interactive input.
@@ -28,6 +37,18 @@ def run_agent(
     user_query: str,
     token_file: str = "token.enc",
     max_results: int = 50,
+    fetch_mode: str = "batch",
+    max_workers: int = 8,
+    stream: bool = False,
+    cache_file: str | None = None,
+    cache_label_ttl: float | None = None,
+    mirror_file: str | None = None,
+    translation_cache_file: str | None = None,
+    fast_path: bool = True,
+    output_format: str = "table",
+    output_file: str | None = None,
+    threads: bool = False,
+    metrics=None,
 ) -> None:
     """Run the Gmail agent with the given query.
 
@@ -35,29 +56,537 @@ def run_agent(
         user_query: Natural language search query from user
         token_file: Path to encrypted token file
         max_results: Maximum number of results to retrieve
+        fetch_mode: Metadata fetch strategy: "serial", "batch" or "concurrent"
+        max_workers: Worker threads used by the concurrent fetch mode
+        stream: Stream results page by page to the display instead of collecting them first
+        cache_file: Path to the on-disk message metadata cache, or None to disable it
+        cache_label_ttl: Seconds after which cached labels are refetched, or None
+            to keep cached entries until they are evicted
+        mirror_file: Path to a local INBOX mirror that is synced through the History
+            API and then answers metadata lookups, or None to disable it
+        translation_cache_file: Path to the query translation cache, or None to disable it
+        fast_path: Translate simple queries with local rules instead of Gemini
+        output_format: "table" for a human-readable grid, or "jsonl", "csv" or
+            "parquet" to stream machine-readable rows
+        output_file: File for machine-readable output, or None for stdout
+        threads: Show one row per conversation instead of one per message
+            (table output only)
+        metrics: Metrics collecting per-stage timings and API counters, or None.
+            In stream mode fetching happens while rows are printed, so it is
+            timed as part of "display"
+    """
+    from gmail_agent.auth import get_gmail_service
+    from gmail_agent.display import display_results, display_threads
+    from gmail_agent.metrics import NULL_METRICS
+    from gmail_agent.nlp_parser import GmailQueryParser
+    from gmail_agent.translation_cache import TranslationCache
+
+    metrics = metrics if metrics is not None else NULL_METRICS
+    with metrics.stage("auth"):
+        service = get_gmail_service(token_file=token_file, metrics=metrics)
+
+    translation_cache = None
+    if translation_cache_file:
+        translation_cache = TranslationCache(translation_cache_file)
+
+    parser = GmailQueryParser(cache=translation_cache, fast_path=fast_path, metrics=metrics)
+
+    with metrics.stage("translate"):
+        gmail_query = parser.parse(user_query)
+    # Keep stdout clean for machine-readable output.
+    banner_stream = sys.stdout if output_format == "table" else sys.stderr
+    print(f"Gmail search query: {gmail_query}\n", file=banner_stream)
+
+    client = _build_client(
+        service, token_file, fetch_mode, max_workers, cache_file, cache_label_ttl, mirror_file,
+        metrics,
+    )
+    if output_format != "table":
+        with metrics.stage("output"):
+            write_messages(
+                client.iter_messages(gmail_query, max_results=max_results),
+                output_format,
+                output_file,
+            )
+        return
+
+    if threads:
+        if stream:
+            results = client.iter_threads(gmail_query, max_results=max_results)
+        else:
+            with metrics.stage("search"):
+                results = client.search_threads(gmail_query, max_results=max_results)
+        with metrics.stage("display"):
+            display_threads(results)
+        return
+
+    if stream:
+        messages = client.iter_messages(gmail_query, max_results=max_results)
+    else:
+        with metrics.stage("search"):
+            messages = client.search_messages(gmail_query, max_results=max_results)
+
+    with metrics.stage("display"):
+        display_results(messages)
+
+
+def _build_client(
+    service,
+    token_file: str,
+    fetch_mode: str,
+    max_workers: int,
+    cache_file: str | None,
+    cache_label_ttl: float | None,
+    mirror_file: str | None,
+    metrics,
+):
+    """Create the GmailClient for a run, syncing the mirror first if one is configured."""
+    from gmail_agent.gmail_client import create_client
+    from gmail_agent.sync import MailboxMirror, MailboxSync
+
+    mirror = None
+    if mirror_file:
+        mirror = MailboxMirror(mirror_file)
+        with metrics.stage("sync"):
+            MailboxSync(service, mirror).sync()
+
+    return create_client(
+        service,
+        token_file,
+        fetch_mode=fetch_mode,
+        max_workers=max_workers,
+        cache_file=cache_file,
+        cache_label_ttl=cache_label_ttl,
+        mirror=mirror,
+        metrics=metrics,
+    )
+
+
+def run_batch_agent(
+    queries: list,
+    token_file: str = "token.enc",
+    max_results: int = 50,
+    fetch_mode: str = "batch",
+    max_workers: int = 8,
+    cache_file: str | None = None,
+    cache_label_ttl: float | None = None,
+    mirror_file: str | None = None,
+    translation_cache_file: str | None = None,
+    fast_path: bool = True,
+    output_format: str = "table",
+    output_file: str | None = None,
+    metrics=None,
+) -> int:
+    """Run many queries in one process, sharing the service, translations and fetches.
+
+    Tables are printed one per query under a header naming it. Machine-readable
+    formats write every row to one output with a leading "query_id" column, and
+    report each query's Gmail query on stderr.
+
+    Args:
+        queries: BatchQuery objects, e.g. from read_batch_queries
+        token_file: Path to encrypted token file
+        max_results: Maximum results for queries that do not set their own
+        fetch_mode: Metadata fetch strategy: "serial", "batch" or "concurrent"
+        max_workers: Worker threads used by the concurrent fetch mode
+        cache_file: Path to the on-disk message metadata cache, or None to disable it
+        cache_label_ttl: Seconds after which cached labels are refetched, or None
+            to keep cached entries until they are evicted
+        mirror_file: Path to a local INBOX mirror, or None to disable it
+        translation_cache_file: Path to the query translation cache, or None to disable it
+        fast_path: Translate simple queries with local rules instead of Gemini
+        output_format: "table", "jsonl", "csv" or "parquet"
+        output_file: File for machine-readable output, or None for stdout
+        metrics: Metrics collecting per-stage timings and API counters, or None
+
+    Returns:
+        Number of queries that could not be searched
     """
-    service = get_gmail_service(token_file=token_file)
+    from gmail_agent.auth import get_gmail_service
+    from gmail_agent.batch import BatchResult, search_batch
+    from gmail_agent.display import display_results
+    from gmail_agent.metrics import NULL_METRICS
+    from gmail_agent.nlp_parser import GmailQueryParser
+    from gmail_agent.translation_cache import TranslationCache
 
-    parser = GmailQueryParser()
+    metrics = metrics if metrics is not None else NULL_METRICS
+    with metrics.stage("auth"):
+        service = get_gmail_service(token_file=token_file, metrics=metrics)
+
+    translation_cache = None
+    if translation_cache_file:
+        translation_cache = TranslationCache(translation_cache_file)
+    parser = GmailQueryParser(cache=translation_cache, fast_path=fast_path, metrics=metrics)
+
+    with metrics.stage("translate"):
+        translations = parser.translate_many([query.text for query in queries])
+    results = [
+        BatchResult(query, translation.query) for query, translation in zip(queries, translations)
+    ]
+
+    client = _build_client(
+        service, token_file, fetch_mode, max_workers, cache_file, cache_label_ttl, mirror_file,
+        metrics,
+    )
+    try:
+        with metrics.stage("search"):
+            search_batch(client, results, max_results=max_results)
+    finally:
+        client.close()
+
+    if output_format == "table":
+        with metrics.stage("display"):
+            for result in results:
+                print(f"=== [{result.query.query_id}] {result.query.text} ===")
+                if result.error is not None:
+                    print(f"Error: {result.error}\n")
+                    continue
+                print(f"Gmail search query: {result.gmail_query}\n")
+                display_results(result.messages)
+                print()
+    else:
+        for result in results:
+            outcome = f"Error: {result.error}" if result.error is not None else (
+                f"Gmail search query: {result.gmail_query} ({len(result.messages)} found)"
+            )
+            print(f"[{result.query.query_id}] {outcome}", file=sys.stderr)
+        rows = ((result.query.query_id, msg) for result in results for msg in result.messages)
+        with metrics.stage("output"):
+            write_messages(rows, output_format, output_file, tagged=True)
+
+    return sum(result.error is not None for result in results)
+
+
+def run_multi_account_agent(
+    user_query: str,
+    accounts_dir: str = "accounts",
+    accounts: list[str] | None = None,
+    max_results: int = 50,
+    fetch_mode: str = "batch",
+    max_workers: int = 8,
+    cache_dir: str | None = None,
+    cache_label_ttl: float | None = None,
+    translation_cache_file: str | None = None,
+    fast_path: bool = True,
+) -> None:
+    """Run one query across several accounts and show the merged results.
+
+    The query is translated once and then searched in every account concurrently.
+
+    Args:
+        user_query: Natural language search query from user
+        accounts_dir: Directory holding one encrypted token per account
+        accounts: Account names to search, defaulting to all registered accounts
+        max_results: Maximum number of results per account and in total
+        fetch_mode: Metadata fetch strategy: "serial", "batch" or "concurrent"
+        max_workers: Worker threads used by the concurrent fetch mode
+        cache_dir: Directory for per-account metadata caches, or None to disable them
+        cache_label_ttl: Seconds after which cached labels are refetched, or None
+            to keep cached entries until they are evicted
+        translation_cache_file: Path to the query translation cache, or None to disable it
+        fast_path: Translate simple queries with local rules instead of Gemini
+    """
+    from gmail_agent.accounts import AccountPool, AccountRegistry
+    from gmail_agent.display import format_account_messages
+    from gmail_agent.nlp_parser import GmailQueryParser
+    from gmail_agent.translation_cache import TranslationCache
+
+    registry = AccountRegistry(accounts_dir)
+    if not (accounts or registry.names()):
+        print(f"No accounts registered in {accounts_dir}; add one with --add-account NAME.")
+        return
+
+    translation_cache = None
+    if translation_cache_file:
+        translation_cache = TranslationCache(translation_cache_file)
+    parser = GmailQueryParser(cache=translation_cache, fast_path=fast_path)
 
     gmail_query = parser.parse(user_query)
     print(f"Gmail search query: {gmail_query}\n")
 
-    client = GmailClient(service)
-    messages = client.search_messages(gmail_query, max_results=max_results)
+    pool = AccountPool(
+        registry,
+        fetch_mode=fetch_mode,
+        max_workers=max_workers,
+        cache_dir=cache_dir,
+        cache_label_ttl=cache_label_ttl,
+    )
+    try:
+        result = pool.search_all(gmail_query, max_results=max_results, accounts=accounts)
+    finally:
+        pool.close()
+
+    for name, error in result.errors.items():
+        print(f"Error searching {name}: {error}")
+    print(format_account_messages(result.messages))
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line options.
 
-    display_results(messages)
+    Args:
+        argv: Arguments to parse, defaulting to sys.argv
+
+    Returns:
+        Parsed options
+    """
+    parser = argparse.ArgumentParser(
+        prog="gmail_agent",
+        description="Search your Gmail inbox with natural language. "
+        "The query is read from stdin, or prompted for interactively.",
+    )
+    parser.add_argument("--token-file", default="token.enc", help="encrypted OAuth token file")
+    parser.add_argument("--max-results", type=int, default=50, help="maximum results to show")
+    parser.add_argument(
+        "--fetch-mode", choices=FETCH_MODES, default="batch", help="metadata fetch strategy"
+    )
+    parser.add_argument(
+        "--max-workers", type=int, default=8, help="worker threads for --fetch-mode concurrent"
+    )
+    parser.add_argument(
+        "--stream", action="store_true", help="page through results and print as they arrive"
+    )
+    parser.add_argument(
+        "--threads",
+        action="store_true",
+        help="show one row per conversation with its latest date, participants and size",
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=OUTPUT_FORMATS,
+        default="table",
+        help="table for people; jsonl, csv or parquet (needs pyarrow) for other programs",
+    )
+    parser.add_argument(
+        "--output", dest="output_file", metavar="PATH", help="write results to a file instead of stdout"
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="read one query per line (plain text or JSON) from stdin and run them all",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="overlap authentication with translation and print rows as each fetch completes",
+    )
+    parser.add_argument(
+        "--cache-file", help=f"message metadata cache file (default: {DEFAULT_CACHE_FILE})"
+    )
+    parser.add_argument(
+        "--cache-label-ttl",
+        type=float,
+        metavar="SECONDS",
+        help="refetch cached messages after this long so their labels are current "
+        "(default: keep them until evicted)",
+    )
+    parser.add_argument(
+        "--translation-cache-file",
+        default=DEFAULT_TRANSLATION_CACHE_FILE,
+        help="natural language to Gmail query translation cache file",
+    )
+    parser.add_argument(
+        "--no-fast-path",
+        action="store_true",
+        help="always translate queries with Gemini, even simple ones",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="do not use the metadata or translation caches"
+    )
+    parser.add_argument(
+        "--mirror-file", help="sync a local INBOX mirror to this file and search through it"
+    )
+    parser.add_argument(
+        "--accounts-dir",
+        help="search every account with a token in this directory (one <name>.enc each)",
+    )
+    parser.add_argument(
+        "--account",
+        dest="accounts",
+        action="append",
+        metavar="NAME",
+        help="with --accounts-dir, search only this account; may be repeated",
+    )
+    parser.add_argument(
+        "--add-account",
+        metavar="NAME",
+        help="authorize a new account into --accounts-dir and exit",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="stay resident and answer queries from gmail_agent.remote on --socket",
+    )
+    parser.add_argument(
+        "--socket", default=DEFAULT_SOCKET_PATH, help="Unix socket path for --serve"
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="text",
+        choices=("text", "json"),
+        help="print per-stage timings and API counters to stderr, as a table or JSON",
+    )
+    parser.add_argument(
+        "--metrics-hook",
+        metavar="MODULE:FUNCTION",
+        help="call this function with the run's metrics (a dict) when the search finishes",
+    )
+    args = parser.parse_args(argv)
+    if (args.profile or args.metrics_hook) and (args.serve or args.use_async or args.accounts_dir):
+        parser.error("--profile and --metrics-hook cannot be used with --serve, --async "
+                     "or --accounts-dir")
+    if args.output_format != "table" and (args.use_async or args.accounts_dir):
+        parser.error("--output-format must be table with --async or --accounts-dir")
+    if args.threads and (args.output_format != "table" or args.use_async or args.accounts_dir):
+        parser.error("--threads only works with table output, without --async or --accounts-dir")
+    if args.batch and (args.serve or args.use_async or args.accounts_dir or args.stream
+                       or args.threads):
+        parser.error("--batch cannot be used with --serve, --async, --accounts-dir, "
+                     "--stream or --threads")
+    if args.output_file and args.output_format == "table":
+        parser.error("--output needs --output-format jsonl, csv or parquet")
+    if args.mirror_file and (args.use_async or args.accounts_dir):
+        parser.error("--mirror-file cannot be used with --async or --accounts-dir")
+    if args.cache_file and args.accounts_dir:
+        parser.error("--cache-file cannot be used with --accounts-dir, which keeps one cache "
+                     "per account under <accounts-dir>/cache")
+    if args.cache_file is None:
+        args.cache_file = DEFAULT_CACHE_FILE
+    return args
 
 
-def main() -> None:
+def main(argv: list[str] | None = None) -> None:
     """Main entry point for the Gmail agent."""
-    user_query = get_user_query()
+    args = parse_args(argv)
 
-    if not user_query:
+    if args.serve:
+        from gmail_agent.server import AgentSession, serve
+
+        session = AgentSession(
+            token_file=args.token_file,
+            fetch_mode=args.fetch_mode,
+            max_workers=args.max_workers,
+            cache_file=None if args.no_cache else args.cache_file,
+            cache_label_ttl=args.cache_label_ttl,
+            mirror_file=args.mirror_file,
+            translation_cache_file=None if args.no_cache else args.translation_cache_file,
+            fast_path=not args.no_fast_path,
+        )
+        serve(session, socket_path=args.socket)
+        return
+
+    if args.add_account:
+        from gmail_agent.accounts import AccountRegistry
+
+        AccountRegistry(args.accounts_dir or "accounts").add(args.add_account)
+        print(f"Account {args.add_account} authorized.")
+        return
+
+    queries, user_query = [], ""
+    if args.batch:
+        from gmail_agent.batch import read_batch_queries
+
+        try:
+            queries = read_batch_queries(sys.stdin)
+        except ValueError as error:
+            print(f"Error: {error}")
+            sys.exit(1)
+    else:
+        user_query = get_user_query()
+
+    if not (queries or user_query):
         print("Error: No query provided.")
         sys.exit(1)
 
-    run_agent(user_query)
+    if args.accounts_dir:
+        run_multi_account_agent(
+            user_query,
+            accounts_dir=args.accounts_dir,
+            accounts=args.accounts,
+            max_results=args.max_results,
+            fetch_mode=args.fetch_mode,
+            max_workers=args.max_workers,
+            cache_dir=None if args.no_cache else str(Path(args.accounts_dir) / "cache"),
+            cache_label_ttl=args.cache_label_ttl,
+            translation_cache_file=None if args.no_cache else args.translation_cache_file,
+            fast_path=not args.no_fast_path,
+        )
+        return
+
+    if args.use_async:
+        from gmail_agent.async_agent import run_agent_concurrently
+
+        run_agent_concurrently(
+            user_query,
+            token_file=args.token_file,
+            max_results=args.max_results,
+            concurrency=args.max_workers,
+            cache_file=None if args.no_cache else args.cache_file,
+            cache_label_ttl=args.cache_label_ttl,
+            translation_cache_file=None if args.no_cache else args.translation_cache_file,
+            fast_path=not args.no_fast_path,
+        )
+        return
+
+    metrics = None
+    if args.profile or args.metrics_hook:
+        from gmail_agent.metrics import Metrics, load_exporter
+
+        metrics = Metrics()
+        if args.metrics_hook:
+            try:
+                metrics.add_exporter(load_exporter(args.metrics_hook))
+            except (ImportError, ValueError) as error:
+                print(f"Error: {error}")
+                sys.exit(1)
+
+    failures = 0
+    if args.batch:
+        failures = run_batch_agent(
+            queries,
+            token_file=args.token_file,
+            max_results=args.max_results,
+            fetch_mode=args.fetch_mode,
+            max_workers=args.max_workers,
+            cache_file=None if args.no_cache else args.cache_file,
+            cache_label_ttl=args.cache_label_ttl,
+            mirror_file=args.mirror_file,
+            translation_cache_file=None if args.no_cache else args.translation_cache_file,
+            fast_path=not args.no_fast_path,
+            output_format=args.output_format,
+            output_file=args.output_file,
+            metrics=metrics,
+        )
+    else:
+        run_agent(
+            user_query,
+            token_file=args.token_file,
+            max_results=args.max_results,
+            fetch_mode=args.fetch_mode,
+            max_workers=args.max_workers,
+            stream=args.stream,
+            cache_file=None if args.no_cache else args.cache_file,
+            cache_label_ttl=args.cache_label_ttl,
+            mirror_file=args.mirror_file,
+            translation_cache_file=None if args.no_cache else args.translation_cache_file,
+            fast_path=not args.no_fast_path,
+            output_format=args.output_format,
+            output_file=args.output_file,
+            threads=args.threads,
+            metrics=metrics,
+        )
+
+    if metrics is not None:
+        if args.profile == "json":
+            print(json.dumps(metrics.as_dict(), indent=2), file=sys.stderr)
+        elif args.profile == "text":
+            print(metrics.format_report(), file=sys.stderr)
+        metrics.export()
+
+    if failures:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
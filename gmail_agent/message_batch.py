@@ -0,0 +1,137 @@
+"""Columnar container for large sets of EmailMessage values."""
+
+import math
+from array import array
+from typing import Iterable, Iterator, Sequence
+
+from gmail_agent.gmail_client import EmailMessage
+
+_COLUMNS = (
+    "subject", "sender", "date", "extra_headers", "message_id", "thread_id", "label_ids",
+)
+
+
+class MessageBatch:
+    """Messages stored column by column, for cheap bulk sorting, merging and deduplication.
+
+    Timestamps live in a packed ``array('d')`` (NaN for unknown), so sorting
+    by date compares floats and builds a single index permutation instead of
+    touching message objects. Batches are immutable; operations return new
+    batches that share the underlying values.
+    """
+
+    __slots__ = ("subject", "sender", "date", "extra_headers", "message_id", "thread_id",
+                 "label_ids", "timestamp")
+
+    def __init__(self):
+        self.subject: list[str] = []
+        self.sender: list[str] = []
+        self.date: list[str] = []
+        self.extra_headers: list[dict[str, str] | None] = []
+        self.message_id: list[str] = []
+        self.thread_id: list[str] = []
+        self.label_ids: list[tuple[str, ...]] = []
+        self.timestamp = array("d")
+
+    @classmethod
+    def from_messages(cls, messages: Iterable[EmailMessage]) -> "MessageBatch":
+        """Build a batch from messages, consuming any iterable once."""
+        batch = cls()
+        for msg in messages:
+            batch.subject.append(msg.subject)
+            batch.sender.append(msg.sender)
+            batch.date.append(msg.date)
+            batch.extra_headers.append(msg.extra_headers)
+            batch.message_id.append(msg.message_id)
+            batch.thread_id.append(msg.thread_id)
+            batch.label_ids.append(msg.label_ids)
+            batch.timestamp.append(math.nan if msg.timestamp is None else msg.timestamp)
+        return batch
+
+    @classmethod
+    def concat(cls, batches: Iterable["MessageBatch"]) -> "MessageBatch":
+        """Join batches end to end."""
+        result = cls()
+        for batch in batches:
+            for name in _COLUMNS:
+                getattr(result, name).extend(getattr(batch, name))
+            result.timestamp.extend(batch.timestamp)
+        return result
+
+    def __len__(self) -> int:
+        return len(self.message_id)
+
+    def __getitem__(self, index: int) -> EmailMessage:
+        timestamp = self.timestamp[index]
+        return EmailMessage(
+            subject=self.subject[index],
+            sender=self.sender[index],
+            date=self.date[index],
+            extra_headers=self.extra_headers[index],
+            message_id=self.message_id[index],
+            thread_id=self.thread_id[index],
+            label_ids=self.label_ids[index],
+            timestamp=None if math.isnan(timestamp) else timestamp,
+        )
+
+    def __iter__(self) -> Iterator[EmailMessage]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def take(self, indices: Sequence[int]) -> "MessageBatch":
+        """Return a batch of the rows at ``indices``, in that order."""
+        result = MessageBatch()
+        for name in _COLUMNS:
+            column = getattr(self, name)
+            setattr(result, name, [column[i] for i in indices])
+        result.timestamp = array("d", (self.timestamp[i] for i in indices))
+        return result
+
+    def head(self, count: int) -> "MessageBatch":
+        """Return the first ``count`` rows."""
+        return self.take(range(min(count, len(self))))
+
+    def time_order(self, newest_first: bool = True) -> list[int]:
+        """Return the row indices ordered by timestamp; rows without one go last."""
+        timestamps = self.timestamp
+        sign = -1.0 if newest_first else 1.0
+
+        def key(index: int) -> tuple[bool, float]:
+            value = timestamps[index]
+            missing = math.isnan(value)
+            return (missing, 0.0 if missing else sign * value)
+
+        return sorted(range(len(self)), key=key)
+
+    def sorted_by_time(self, newest_first: bool = True) -> "MessageBatch":
+        """Return the rows ordered by timestamp; rows without one go last."""
+        return self.take(self.time_order(newest_first))
+
+    def deduplicated(self) -> "MessageBatch":
+        """Return the rows with repeated message IDs removed, keeping the first of each.
+
+        Rows without an ID are always kept.
+        """
+        seen: set[str] = set()
+        keep = []
+        for index, message_id in enumerate(self.message_id):
+            if message_id:
+                if message_id in seen:
+                    continue
+                seen.add(message_id)
+            keep.append(index)
+        return self.take(keep)
+
+    @classmethod
+    def merge(cls, batches: Iterable["MessageBatch"], limit: int | None = None) -> "MessageBatch":
+        """Combine batches into one deduplicated batch, newest first.
+
+        Args:
+            batches: Batches to merge
+            limit: Keep at most this many rows
+
+        Returns:
+            The merged batch
+        """
+        merged = cls.concat(batches).deduplicated().sorted_by_time()
+        return merged if limit is None else merged.head(limit)
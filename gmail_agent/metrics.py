@@ -0,0 +1,142 @@
+"""Stage timings and API counters for one agent run."""
+
+import importlib
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Iterable, Iterator
+
+Exporter = Callable[[dict], None]
+
+
+class Metrics:
+    """Durations and counters collected during a run; safe to share between threads.
+
+    ``stage()`` times a named span. A stage entered several times, or from
+    several worker threads, accumulates its total time and entry count, so
+    overlapping stages (a prefetched ``list`` during a fetch) can add up to
+    more than the wall time. Counters hold API calls, approximate response
+    bytes, retries and cache hits. ``export()`` hands ``as_dict()`` to every
+    registered exporter, e.g. a function pushing to a metrics backend.
+    """
+
+    enabled = True
+
+    def __init__(self, exporters: Iterable[Exporter] = ()):
+        self.durations: dict[str, float] = {}
+        self.stage_counts: Counter[str] = Counter()
+        self.counters: Counter[str] = Counter()
+        self.exporters = list(exporters)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block and add it to stage ``name``."""
+        with self._lock:
+            self.durations.setdefault(name, 0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.durations[name] += elapsed
+                self.stage_counts[name] += 1
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """Add ``amount`` to counter ``name``."""
+        if amount:
+            with self._lock:
+                self.counters[name] += amount
+
+    def record_responses(self, method: str, responses: Iterable[dict]) -> None:
+        """Count API responses of ``method`` and their approximate size.
+
+        The size is that of the compact JSON encoding of each parsed
+        response, which is close to what Gmail sends for partial responses.
+        """
+        count = 0
+        size = 0
+        for response in responses:
+            count += 1
+            size += len(json.dumps(response, separators=(",", ":")))
+        with self._lock:
+            self.counters[f"api.{method}"] += count
+            self.counters["bytes_received"] += size
+
+    def add_exporter(self, exporter: Exporter) -> None:
+        """Register a callable that receives ``as_dict()`` on ``export()``."""
+        self.exporters.append(exporter)
+
+    def export(self) -> None:
+        """Send the collected metrics to every exporter."""
+        snapshot = self.as_dict()
+        for exporter in self.exporters:
+            exporter(snapshot)
+
+    def as_dict(self) -> dict:
+        """Return the metrics as JSON-serializable data.
+
+        Returns:
+            ``{"stages": {name: {"seconds": float, "count": int}}, "counters": {name: int}}``,
+            with stages in the order they were first entered
+        """
+        with self._lock:
+            return {
+                "stages": {
+                    name: {"seconds": seconds, "count": self.stage_counts[name]}
+                    for name, seconds in self.durations.items()
+                },
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def format_report(self) -> str:
+        """Format a per-stage breakdown followed by the counters."""
+        data = self.as_dict()
+        width = max([len(name) for name in (*data["stages"], *data["counters"])] + [5])
+        lines = [f"{'Stage':<{width}}  {'Time (ms)':>10}  {'Count':>6}"]
+        for name, stage in data["stages"].items():
+            lines.append(f"{name:<{width}}  {stage['seconds'] * 1000:>10.1f}  {stage['count']:>6}")
+        if data["counters"]:
+            lines.append("")
+            lines.append(f"{'Counter':<{width}}  {'Value':>10}")
+            for name, value in data["counters"].items():
+                lines.append(f"{name:<{width}}  {value:>10}")
+        return "\n".join(lines)
+
+
+class NullMetrics(Metrics):
+    """Metrics that record nothing, used when instrumentation is off."""
+
+    enabled = False
+
+    def stage(self, name: str):
+        return _NO_STAGE
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        pass
+
+    def record_responses(self, method: str, responses: Iterable[dict]) -> None:
+        pass
+
+
+_NO_STAGE = nullcontext()
+
+NULL_METRICS = NullMetrics()
+
+
+def load_exporter(spec: str) -> Exporter:
+    """Import an exporter given as "package.module:function".
+
+    Raises:
+        ValueError: If ``spec`` is not of that form or does not name a callable
+    """
+    module_name, _, attribute = spec.partition(":")
+    if not module_name or not attribute:
+        raise ValueError(f"Metrics hook must look like 'package.module:function', got {spec!r}")
+    exporter = getattr(importlib.import_module(module_name), attribute, None)
+    if not callable(exporter):
+        raise ValueError(f"Metrics hook {spec!r} is not a callable")
+    return exporter
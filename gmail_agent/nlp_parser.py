@@ -1,8 +1,25 @@
 """Natural language to Gmail query parser using Google Gemini."""
 
 import os
+import re
+from dataclasses import dataclass
 
-import google.generativeai as genai
+from gmail_agent import query_rules
+from gmail_agent.metrics import NULL_METRICS, Metrics
+from gmail_agent.translation_cache import TranslationCache
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+# A "<number>: <query>" line in a batched translation reply.
+NUMBERED_LINE = re.compile(r"^\s*(\d+)\s*[:.)]\s*(.*)$")
+
+
+@dataclass
+class Translation:
+    """A translated query and the path that produced it: "rules", "cache" or "model"."""
+
+    query: str
+    source: str
 
 
 class GmailQueryParser:
@@ -38,7 +55,16 @@ Output: subject:invoice newer_than:30d
 
 Only output the Gmail search query, nothing else. Do not include explanations or extra text."""
 
-    def __init__(self, api_key: str | None = None):
+    BATCH_INSTRUCTIONS = """Translate every numbered input below. Reply with exactly one line per input, in the form "<number>: <Gmail search query>", using the same number as the input. Do not skip, merge or reorder inputs."""
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        cache: TranslationCache | None = None,
+        model_name: str = DEFAULT_MODEL,
+        fast_path: bool = False,
+        metrics: Metrics | None = None,
+    ):
         if api_key is None:
             api_key = os.getenv("GOOGLE_API_KEY")
 
@@ -47,12 +73,189 @@ Only output the Gmail search query, nothing else. Do not include explanations or
                 "GOOGLE_API_KEY must be provided or set as environment variable"
             )
 
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-2.5-flash")
+        self.api_key = api_key
+        self.model_name = model_name
+        self.cache = cache
+        self.fast_path = fast_path
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        self._model = None
+
+    @property
+    def model(self):
+        """The Gemini model, configured on first use.
+
+        Queries answered by the rules or the cache never touch it, so they
+        never import google.generativeai, which takes about a second.
+        """
+        if self._model is None:
+            import google.generativeai as genai
+
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    @model.setter
+    def model(self, model) -> None:
+        self._model = model
 
     def parse(self, natural_language_query: str) -> str:
         """Convert natural language query to Gmail search query string."""
+        return self.translate(natural_language_query).query
+
+    def translate(self, natural_language_query: str) -> Translation:
+        """Convert a query, reporting whether rules, the cache or Gemini answered it.
+
+        With the fast path enabled, queries fully covered by the local rules
+        never reach the model. With a translation cache configured, repeated
+        queries are answered from it instead of calling Gemini.
+        """
+        translation = self._translate_locally(natural_language_query)
+        if translation is None:
+            gmail_query = self._generate(natural_language_query)
+            self._remember(natural_language_query, gmail_query)
+            if self.cache is not None:
+                self.cache.flush()
+            translation = Translation(gmail_query, "model")
+
+        self.metrics.increment(f"translations.{translation.source}")
+        return translation
+
+    def parse_many(self, natural_language_queries: list[str], chunk_size: int = 20) -> list[str]:
+        """Convert many queries, packing the ones Gemini must answer into few calls.
+
+        Args:
+            natural_language_queries: Queries to translate
+            chunk_size: Maximum number of queries per model call
+
+        Returns:
+            Gmail query strings, in the same order as the inputs
+        """
+        return [t.query for t in self.translate_many(natural_language_queries, chunk_size)]
+
+    def translate_many(
+        self, natural_language_queries: list[str], chunk_size: int = 20, max_rounds: int = 2
+    ) -> list[Translation]:
+        """Translate many queries with as few Gemini calls as possible.
+
+        Queries answered by the rules or the cache skip the model, and
+        duplicate inputs are translated once. The rest are sent as numbered
+        lists of at most ``chunk_size`` inputs. Each reply line must carry the
+        number of its input; inputs whose line is missing, duplicated or empty
+        are retried in a later round, and after ``max_rounds`` rounds they are
+        translated one at a time. New translations are written to the cache
+        file once, at the end, even if a model call fails part way.
+
+        Returns:
+            One Translation per input, in input order
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+
+        translations: dict[str, Translation] = {}
+        pending: list[str] = []
+        for query in dict.fromkeys(natural_language_queries):
+            translation = self._translate_locally(query)
+            if translation is None:
+                pending.append(query)
+            else:
+                translations[query] = translation
+
+        try:
+            self._translate_pending(pending, translations, chunk_size, max_rounds)
+        finally:
+            if self.cache is not None:
+                self.cache.flush()
+
+        return [translations[query] for query in natural_language_queries]
+
+    def _translate_pending(
+        self,
+        pending: list[str],
+        translations: dict[str, Translation],
+        chunk_size: int,
+        max_rounds: int,
+    ) -> None:
+        """Translate ``pending`` with the model, adding the results to ``translations``."""
+        for _ in range(max_rounds):
+            if not pending:
+                break
+            failed: list[str] = []
+            for start in range(0, len(pending), chunk_size):
+                chunk = pending[start:start + chunk_size]
+                answers = self._generate_numbered(chunk)
+                for number, query in enumerate(chunk, start=1):
+                    if answers.get(number):
+                        translations[query] = Translation(answers[number], "model")
+                        self._remember(query, answers[number])
+                    else:
+                        failed.append(query)
+            pending = failed
+
+        for query in pending:
+            gmail_query = self._generate(query)
+            self._remember(query, gmail_query)
+            translations[query] = Translation(gmail_query, "model")
+
+    def _translate_locally(self, natural_language_query: str) -> Translation | None:
+        """Answer a query from the rules or the cache, without calling Gemini."""
+        if self.fast_path:
+            gmail_query = query_rules.translate(natural_language_query)
+            if gmail_query is not None:
+                return Translation(gmail_query, "rules")
+
+        if self.cache is not None:
+            gmail_query = self.cache.get(self._cache_key(natural_language_query))
+            if gmail_query is not None:
+                return Translation(gmail_query, "cache")
+
+        return None
+
+    def _remember(self, natural_language_query: str, gmail_query: str) -> None:
+        """Store a model translation in the cache, if one is configured."""
+        if self.cache is not None and gmail_query:
+            key = self._cache_key(natural_language_query)
+            self.cache.put(key, gmail_query, natural_language_query)
+
+    def _cache_key(self, natural_language_query: str) -> str:
+        return self.cache.make_key(natural_language_query, self.SYSTEM_PROMPT, self.model_name)
+
+    def _generate(self, natural_language_query: str) -> str:
+        """Ask Gemini to translate one query."""
         prompt = f"{self.SYSTEM_PROMPT}\n\nInput: {natural_language_query}\nOutput:"
 
-        response = self.model.generate_content(prompt)
+        with self.metrics.stage("model"):
+            response = self.model.generate_content(prompt)
+        self.metrics.increment("api.model")
         return response.text.strip()
+
+    def _generate_numbered(self, natural_language_queries: list[str]) -> dict[int, str]:
+        """Ask Gemini to translate a numbered list of queries in one call.
+
+        Returns:
+            Mapping of input number (starting at 1) to Gmail query, containing
+            only numbers that appeared exactly once with a non-empty answer
+        """
+        inputs = "\n".join(
+            f"{number}: {' '.join(query.split())}"
+            for number, query in enumerate(natural_language_queries, start=1)
+        )
+        prompt = f"{self.SYSTEM_PROMPT}\n\n{self.BATCH_INSTRUCTIONS}\n\nInputs:\n{inputs}\nOutputs:"
+
+        with self.metrics.stage("model"):
+            response = self.model.generate_content(prompt)
+        self.metrics.increment("api.model")
+
+        answers: dict[int, str] = {}
+        seen: set[int] = set()
+        for line in response.text.splitlines():
+            match = NUMBERED_LINE.match(line)
+            if not match:
+                continue
+            number = int(match.group(1))
+            if number in seen:
+                answers.pop(number, None)
+                continue
+            seen.add(number)
+            if 1 <= number <= len(natural_language_queries):
+                answers[number] = match.group(2).strip().strip("`")
+        return answers
@@ -0,0 +1,191 @@
+"""Machine-readable result writers: JSON Lines, CSV and Parquet.
+
+Every writer consumes messages as they arrive and writes them straight out,
+so exports of any size run in constant memory (Parquet holds one row group
+at a time) and can be piped into other tools.
+"""
+
+import csv
+import sys
+from json.encoder import encode_basestring
+from typing import TYPE_CHECKING, BinaryIO, Iterable, Iterator, TextIO, Union
+
+if TYPE_CHECKING:
+    from gmail_agent.gmail_client import EmailMessage
+
+OUTPUT_FORMATS = ("table", "jsonl", "csv", "parquet")
+
+# Columns written for every message, in order. "timestamp" is UTC epoch
+# seconds; "labels" is a list (";"-separated in CSV).
+FIELDS = ("subject", "sender", "date", "id", "thread_id", "labels", "timestamp")
+
+# Leading column added to tagged output, naming the batch query a row answers.
+TAG_FIELD = "query_id"
+
+# Rows buffered per Parquet row group.
+PARQUET_ROW_GROUP_SIZE = 10_000
+
+# A message, or a (query ID, message) pair when writing tagged output.
+Row = Union["EmailMessage", tuple[str, "EmailMessage"]]
+
+
+def _untag(rows: Iterable[Row], tagged: bool) -> Iterator[tuple[str | None, "EmailMessage"]]:
+    """Yield (tag, message) pairs, with a None tag for untagged rows."""
+    if tagged:
+        return iter(rows)
+    return ((None, msg) for msg in rows)
+
+
+def write_jsonl(messages: Iterable[Row], out: TextIO, tagged: bool = False) -> int:
+    """Write one JSON object per line.
+
+    Lines are assembled from C-encoded string values rather than by
+    building and serializing a dict per message.
+
+    Args:
+        messages: Messages, or (query ID, message) pairs if ``tagged``
+        out: Text stream to write to
+        tagged: Start each object with a "query_id" key
+
+    Returns:
+        Number of messages written
+    """
+    count = 0
+    for tag, msg in _untag(messages, tagged):
+        labels = ",".join(map(encode_basestring, msg.label_ids))
+        timestamp = "null" if msg.timestamp is None else repr(msg.timestamp)
+        prefix = "" if tag is None else f'"{TAG_FIELD}":{encode_basestring(tag)},'
+        out.write(
+            f'{{{prefix}"subject":{encode_basestring(msg.subject)},'
+            f'"sender":{encode_basestring(msg.sender)},'
+            f'"date":{encode_basestring(msg.date)},'
+            f'"id":{encode_basestring(msg.message_id)},'
+            f'"thread_id":{encode_basestring(msg.thread_id)},'
+            f'"labels":[{labels}],'
+            f'"timestamp":{timestamp}}}\n'
+        )
+        count += 1
+    return count
+
+
+def write_csv(messages: Iterable[Row], out: TextIO, tagged: bool = False) -> int:
+    """Write a header row and one CSV row per message.
+
+    Args:
+        messages: Messages, or (query ID, message) pairs if ``tagged``
+        out: Text stream to write to
+        tagged: Add a leading "query_id" column
+
+    Returns:
+        Number of messages written
+    """
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow((TAG_FIELD, *FIELDS) if tagged else FIELDS)
+    count = 0
+    for tag, msg in _untag(messages, tagged):
+        writer.writerow((
+            *((tag,) if tagged else ()),
+            msg.subject, msg.sender, msg.date, msg.message_id, msg.thread_id,
+            ";".join(msg.label_ids), "" if msg.timestamp is None else msg.timestamp,
+        ))
+        count += 1
+    return count
+
+
+def write_parquet(
+    messages: Iterable[Row],
+    out: str | BinaryIO,
+    row_group_size: int = PARQUET_ROW_GROUP_SIZE,
+    tagged: bool = False,
+) -> int:
+    """Write messages to a Parquet file, one row group per ``row_group_size`` messages.
+
+    Requires the optional ``pyarrow`` dependency (``pip install .[arrow]``).
+
+    Args:
+        messages: Messages, or (query ID, message) pairs if ``tagged``
+        out: File path or writable binary stream
+        row_group_size: Messages buffered per row group
+        tagged: Add a leading "query_id" column
+
+    Returns:
+        Number of messages written
+
+    Raises:
+        ImportError: If pyarrow is not installed
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as error:
+        raise ImportError(
+            "Parquet output needs pyarrow; install it with: pip install 'gmail-ai-agent[arrow]'"
+        ) from error
+
+    schema = pa.schema([
+        *([(TAG_FIELD, pa.string())] if tagged else []),
+        ("subject", pa.string()),
+        ("sender", pa.string()),
+        ("date", pa.string()),
+        ("id", pa.string()),
+        ("thread_id", pa.string()),
+        ("labels", pa.list_(pa.string())),
+        ("timestamp", pa.float64()),
+    ])
+    columns: tuple[list, ...] = tuple([] for _ in schema)
+    count = 0
+
+    def write_row_group() -> None:
+        writer.write_table(pa.Table.from_arrays(list(columns), schema=schema))
+        for column in columns:
+            column.clear()
+
+    with pq.ParquetWriter(out, schema) as writer:
+        for tag, msg in _untag(messages, tagged):
+            for column, value in zip(columns, (
+                *((tag,) if tagged else ()),
+                msg.subject, msg.sender, msg.date, msg.message_id, msg.thread_id,
+                list(msg.label_ids), msg.timestamp,
+            )):
+                column.append(value)
+            count += 1
+            if len(columns[0]) >= row_group_size:
+                write_row_group()
+        if columns[0] or count == 0:
+            write_row_group()
+
+    return count
+
+
+def write_messages(
+    messages: Iterable[Row], output_format: str, path: str | None = None, tagged: bool = False
+) -> int:
+    """Write messages in a machine-readable format to a file or stdout.
+
+    Args:
+        messages: Messages to write, as a list or a stream; (query ID, message)
+            pairs if ``tagged``
+        output_format: "jsonl", "csv" or "parquet"
+        path: Output file, or None for stdout
+        tagged: Add a leading "query_id" column naming each row's batch query
+
+    Returns:
+        Number of messages written
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if output_format == "parquet":
+        return write_parquet(messages, path if path else sys.stdout.buffer, tagged=tagged)
+
+    writers = {"jsonl": write_jsonl, "csv": write_csv}
+    if output_format not in writers:
+        raise ValueError(f"Unknown output format {output_format!r}")
+
+    if path is None:
+        count = writers[output_format](messages, sys.stdout, tagged=tagged)
+        sys.stdout.flush()
+        return count
+
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        return writers[output_format](messages, f, tagged=tagged)
@@ -0,0 +1,140 @@
+"""Deterministic translation of simple natural-language queries to Gmail syntax.
+
+Covers the common request shapes from GmailQueryParser.SYSTEM_PROMPT in
+English and Hebrew: read state, stars, attachments, a sender given as an
+address, a domain or a well-known brand name, a subject word, a recipient address and
+relative date ranges. Anything the rules cannot account for word by word is
+left to the language model.
+"""
+
+import re
+from typing import Callable
+
+# Order in which clauses are emitted, matching the examples in SYSTEM_PROMPT.
+CLAUSE_ORDER = ("from", "to", "subject", "unread", "starred", "has", "date")
+
+DAYS_PER_UNIT = {"day": 1, "week": 7, "month": 30, "year": 365}
+
+# Words that carry no search meaning in a request.
+STOPWORDS = frozenset(
+    """
+    show me my all the emails email messages message mails mail find get list search
+    for any that are is which please i have in inbox of some give a an and with
+    display see want look lookup fetch
+    הראה תראה הצג תציג לי את כל מיילים מייל הודעות הודעה אימיילים דואר שלי
+    """.split()
+)
+
+_DATE_WORDS = r"(?:last|past|previous|this|today|yesterday)"
+_ADDRESS = r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"
+_DOMAIN = r"[a-z0-9-]+(?:\.[a-z0-9-]+)+"
+_LATIN_WORD = r"[a-z][a-z0-9-]*"
+
+# Single-word senders the rules resolve to a domain. Any other single word
+# ("from John", "from mom") is most likely a person, which only the model
+# can turn into a useful query.
+KNOWN_SENDERS = {
+    name: f"{name}.com"
+    for name in """
+    google amazon github gitlab facebook instagram linkedin twitter youtube apple
+    microsoft netflix spotify paypal ebay uber airbnb dropbox slack zoom atlassian
+    booking expedia stripe shopify
+    """.split()
+}
+
+
+def _sender(value: str) -> str | None:
+    """Gmail ``from:`` value for a sender, or None if a bare word is not a known brand."""
+    if "@" in value or "." in value:
+        return value
+    return KNOWN_SENDERS.get(value)
+
+
+def _from_clause(value: str) -> str | None:
+    sender = _sender(value)
+    return None if sender is None else f"from:{sender}"
+
+
+def _subject(value: str) -> str:
+    return f'"{value}"' if " " in value else value
+
+
+def _days(count: str, unit: str) -> str:
+    return str(int(count) * DAYS_PER_UNIT[unit.rstrip("s")])
+
+
+# A rule's builder returns None when the match cannot be translated safely.
+Rule = tuple[re.Pattern, str, Callable[[re.Match], str | None]]
+
+RULES: list[Rule] = [
+    # Dates come first so "from last week" is not read as a sender.
+    (re.compile(rf"\b(?:from |in |during |over |within )?(?:the )?(?:last|past) (\d+) "
+                r"(day|week|month|year)s?\b"),
+     "date", lambda m: f"newer_than:{_days(m.group(1), m.group(2))}d"),
+    (re.compile(r"\bolder than (\d+) (day|week|month|year)s?\b"),
+     "date", lambda m: f"older_than:{_days(m.group(1), m.group(2))}d"),
+    (re.compile(r"\b(?:from |in |during |over )?(?:the )?(?:last|past|this) week\b"),
+     "date", lambda m: "newer_than:7d"),
+    (re.compile(r"\b(?:from |in |during |over )?(?:the )?(?:last|past|this) month\b"),
+     "date", lambda m: "newer_than:30d"),
+    (re.compile(r"\b(?:from |in |during |over )?(?:the )?(?:last|past|this) year\b"),
+     "date", lambda m: "newer_than:365d"),
+    (re.compile(r"\b(?:from )?today\b"), "date", lambda m: "newer_than:1d"),
+    (re.compile(r"(?:^| )(?:מ|ב)?(?:ה)?שבוע(?: ה)?(?:אחרון)?(?= |$)"),
+     "date", lambda m: "newer_than:7d"),
+    (re.compile(r"(?:^| )(?:מ|ב)?(?:ה)?חודש(?: ה)?(?:אחרון)?(?= |$)"),
+     "date", lambda m: "newer_than:30d"),
+    (re.compile(r"(?:^| )(?:מ)?היום(?= |$)"), "date", lambda m: "newer_than:1d"),
+    # Read state, stars and attachments.
+    (re.compile(r"\bunread\b|(?:^| )ש?לא נקרא(?:ו)?(?= |$)"), "unread", lambda m: "is:unread"),
+    (re.compile(r"\bstarred\b|(?:^| )(?:מסומנים |מסומנות )?(?:ב|עם )כוכב(?= |$)"),
+     "starred", lambda m: "is:starred"),
+    (re.compile(r"\b(?:with|having|that have|containing) (?:an? )?(?:attachments?|attached files?)\b"
+                r"|(?:^| )עם (?:קבצים מצורפים|קובץ מצורף|צרופות|צרופה)(?= |$)"),
+     "has", lambda m: "has:attachment"),
+    # Subject.
+    (re.compile(r"\bwith ['\"]([^'\"]+)['\"] in (?:the )?subject\b"),
+     "subject", lambda m: f"subject:{_subject(m.group(1))}"),
+    (re.compile(rf"\b(?:about|regarding) ({_LATIN_WORD})\b"),
+     "subject", lambda m: f"subject:{m.group(1)}"),
+    # Recipient and sender.
+    (re.compile(rf"\b(?:sent )?to ({_ADDRESS})"), "to", lambda m: f"to:{m.group(1)}"),
+    (re.compile(rf"\bfrom ({_ADDRESS}|{_DOMAIN}|(?!{_DATE_WORDS}\b){_LATIN_WORD})\b"),
+     "from", lambda m: _from_clause(m.group(1))),
+    (re.compile(rf"(?:^| )(?:מאת |מ-|מ )({_ADDRESS}|{_DOMAIN}|{_LATIN_WORD})(?= |$)"),
+     "from", lambda m: _from_clause(m.group(1))),
+]
+
+
+def normalize(text: str) -> str:
+    """Lower-case a query, drop sentence punctuation and collapse whitespace."""
+    text = re.sub(r"[?!,;]|\.(?=\s|$)", " ", text.lower())
+    return " ".join(text.split())
+
+
+def translate(text: str) -> str | None:
+    """Translate a query with the rules, or return None if they do not cover it.
+
+    A query is covered only if every word is either consumed by a rule or a
+    stopword, and no clause type is matched twice.
+    """
+    remaining = normalize(text)
+    clauses: dict[str, str] = {}
+
+    for pattern, kind, build in RULES:
+        match = pattern.search(remaining)
+        if match is None:
+            continue
+        clause = build(match)
+        if clause is None or kind in clauses:
+            return None
+        clauses[kind] = clause
+        remaining = f"{remaining[:match.start()]} {remaining[match.end():]}"
+        if pattern.search(remaining):
+            return None
+
+    leftover = [word for word in remaining.split() if word not in STOPWORDS]
+    if leftover or not clauses:
+        return None
+
+    return " ".join(clauses[kind] for kind in CLAUSE_ORDER if kind in clauses)
@@ -0,0 +1,92 @@
+"""Thin command line client for a running agent server.
+
+Only imports the standard library and the table formatter, so a query costs a
+socket round trip instead of loading the Google client libraries:
+
+    echo "unread emails from amazon" | python -m gmail_agent.remote
+"""
+
+import argparse
+import json
+import socket
+import sys
+
+from gmail_agent.display import format_table
+
+DEFAULT_SOCKET_PATH = "gmail_agent.sock"
+
+
+class ServerError(RuntimeError):
+    """Raised when the agent server reports a failed request."""
+
+
+def query_server(
+    user_query: str,
+    socket_path: str = DEFAULT_SOCKET_PATH,
+    max_results: int = 50,
+    timeout: float | None = 120.0,
+) -> dict:
+    """Send a query to the agent server and return its response.
+
+    Args:
+        user_query: Natural language search query
+        socket_path: Path of the server's Unix socket
+        max_results: Maximum number of results to retrieve
+        timeout: Seconds to wait for the server, or None to wait indefinitely
+
+    Returns:
+        Response with "gmail_query" and a "messages" list of subject/sender/date dicts
+
+    Raises:
+        ServerError: If the server could not answer the query
+        OSError: If the server is not reachable
+    """
+    request = json.dumps({"query": user_query, "max_results": max_results}, ensure_ascii=False)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(request.encode() + b"\n")
+        with sock.makefile("rb") as stream:
+            line = stream.readline()
+
+    if not line:
+        raise ServerError("The server closed the connection without answering")
+
+    response = json.loads(line)
+    if "error" in response:
+        raise ServerError(response["error"])
+    return response
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Read a query from stdin or the prompt and print the server's results."""
+    parser = argparse.ArgumentParser(
+        prog="gmail_agent.remote",
+        description="Search Gmail through a running agent server (gmail_agent.main --serve).",
+    )
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="server socket path")
+    parser.add_argument("--max-results", type=int, default=50, help="maximum results to show")
+    args = parser.parse_args(argv)
+
+    if not sys.stdin.isatty():
+        user_query = sys.stdin.read().strip()
+    else:
+        user_query = input("Enter your search query: ").strip()
+
+    if not user_query:
+        print("Error: No query provided.")
+        sys.exit(1)
+
+    try:
+        response = query_server(user_query, socket_path=args.socket, max_results=args.max_results)
+    except (OSError, ServerError) as error:
+        print(f"Error: {error}")
+        sys.exit(1)
+
+    print(f"Gmail search query: {response['gmail_query']}\n")
+    print(format_table([m["subject"], m["sender"], m["date"]] for m in response["messages"]))
+
+
+if __name__ == "__main__":
+    main()
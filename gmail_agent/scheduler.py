@@ -0,0 +1,222 @@
+"""Quota-aware rate limiting and retries for Gmail API requests."""
+
+import random
+import re
+import threading
+import time
+from typing import Callable, Iterable
+
+from googleapiclient.errors import HttpError
+
+from gmail_agent.metrics import NULL_METRICS, Metrics
+
+# Gmail quota units charged per call, keyed by method as in "users.<method>".
+QUOTA_UNITS = {
+    "messages.list": 5,
+    "messages.get": 5,
+    "threads.list": 10,
+    "threads.get": 10,
+    "history.list": 2,
+    "getProfile": 1,
+}
+DEFAULT_QUOTA_UNITS = 5
+
+# Gmail's per-user limit is 250 quota units per second, as a moving average.
+USER_UNITS_PER_SECOND = 250.0
+
+# Status codes Gmail uses for rate limiting and transient backend failures.
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Gmail sometimes reports rate limiting as a 403 with one of these reasons.
+RATE_LIMIT_REASON = re.compile(rb"(?i)\b(user)?ratelimitexceeded\b")
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Return True if the error means the caller is sending requests too fast."""
+    if not isinstance(error, HttpError):
+        return False
+    status = error.resp.status
+    return status == 429 or (status == 403 and bool(RATE_LIMIT_REASON.search(error.content or b"")))
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Return True for rate limits, 5xx responses and dropped connections."""
+    if isinstance(error, HttpError):
+        return error.resp.status in RETRYABLE_STATUSES or is_rate_limited(error)
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+def method_name(request) -> str:
+    """Return the Gmail method of a request, e.g. "messages.get", from its ``methodId``."""
+    method_id = getattr(request, "methodId", None)
+    if not isinstance(method_id, str):
+        return ""
+    return method_id.removeprefix("gmail.").removeprefix("users.")
+
+
+class TokenBucket:
+    """Token bucket whose refill rate adapts to rate limiting.
+
+    Tokens are quota units. The bucket starts full and refills at ``rate``
+    units per second up to ``capacity``. ``slow_down()`` halves the rate
+    (at most once per ``cooldown`` seconds, so a burst of 429s from many
+    threads counts once) and ``speed_up()`` adds back a twentieth of the
+    maximum rate, so throughput settles just under the quota actually granted.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        min_rate: float | None = None,
+        cooldown: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self.capacity = capacity if capacity is not None else rate
+        self.cooldown = cooldown
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._last_slow_down = float("-inf")
+        self._lock = threading.Lock()
+
+    def acquire(self, units: float) -> float:
+        """Take ``units`` tokens, waiting for them if needed.
+
+        A request larger than the bucket waits for a full bucket and leaves
+        it in debt, so long-run throughput still matches the rate.
+
+        Returns:
+            Seconds spent waiting
+        """
+        needed = min(units, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= needed:
+                    self.tokens -= units
+                    return waited
+                delay = (needed - self.tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+    def slow_down(self) -> None:
+        """Halve the refill rate after a rate-limit response."""
+        with self._lock:
+            now = self._clock()
+            if now - self._last_slow_down < self.cooldown:
+                return
+            self._refill()
+            self._last_slow_down = now
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def speed_up(self) -> None:
+        """Raise the refill rate back towards its maximum after a success."""
+        if self.rate < self.max_rate:
+            with self._lock:
+                self._refill()
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class RequestScheduler:
+    """Admits Gmail requests within one user's quota and retries the ones that fail.
+
+    Every call is charged its quota units against a shared TokenBucket before
+    it is sent, so the list call, the page prefetcher and every fetch worker
+    together stay under the per-user limit. Rate limits, 5xx responses and
+    dropped connections are retried after a "full jitter" exponential
+    backoff: a random delay between zero and ``backoff_base * 2**attempt``
+    (capped at ``backoff_max``), which keeps threads from retrying in step.
+    """
+
+    def __init__(
+        self,
+        units_per_second: float | None = USER_UNITS_PER_SECOND,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 32.0,
+        bucket: TokenBucket | None = None,
+        metrics: Metrics | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+        jitter: Callable[[], float] = random.random,
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            units_per_second: Quota units allowed per second, or None to only retry
+            max_retries: Retries for a call that keeps failing with a retryable error
+            backoff_base: Upper bound of the first retry delay in seconds, doubled on each retry
+            backoff_max: Upper bound of any retry delay
+            bucket: Token bucket to share, e.g. with another scheduler for the same user
+            metrics: Records "throttle" and "backoff" waits, "retries" and "rate_limited"
+            sleep: Sleep function, replaceable in tests
+            jitter: Returns a float in [0, 1) scaling each backoff delay
+        """
+        if bucket is None and units_per_second is not None:
+            bucket = TokenBucket(units_per_second, sleep=sleep)
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        self._sleep = sleep
+        self._jitter = jitter
+
+    def acquire(self, requests: Iterable) -> None:
+        """Wait until the quota allows sending ``requests``, e.g. the calls in one batch."""
+        if self.bucket is None:
+            return
+        units = sum(QUOTA_UNITS.get(method_name(request), DEFAULT_QUOTA_UNITS) for request in requests)
+        with self.metrics.stage("throttle"):
+            self.bucket.acquire(units)
+
+    def execute(self, request) -> dict:
+        """Send a request within the quota, retrying retryable failures.
+
+        Raises:
+            Exception: The last error, if it is not retryable or retries run out
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire([request])
+            try:
+                response = request.execute()
+            except Exception as error:
+                if not is_retryable(error) or attempt == self.max_retries:
+                    raise
+                self.record_failure(error)
+                self.backoff(attempt)
+            else:
+                self.record_success()
+                return response
+
+    def record_failure(self, error: BaseException) -> None:
+        """Count a retried failure and slow down if it was a rate limit."""
+        self.metrics.increment("retries")
+        if is_rate_limited(error):
+            self.metrics.increment("rate_limited")
+            if self.bucket is not None:
+                self.bucket.slow_down()
+
+    def record_success(self) -> None:
+        if self.bucket is not None:
+            self.bucket.speed_up()
+
+    def backoff(self, attempt: int) -> None:
+        """Sleep a random delay of up to ``backoff_base * 2**attempt`` seconds."""
+        delay = self._jitter() * min(self.backoff_max, self.backoff_base * 2**attempt)
+        if delay > 0:
+            with self.metrics.stage("backoff"):
+                self._sleep(delay)
@@ -0,0 +1,187 @@
+"""Resident agent server that keeps the Gmail service, parser and caches warm.
+
+Started with ``python -m gmail_agent.main --serve``, it authenticates, builds
+the discovery-based Gmail service and configures Gemini once, then answers
+queries from ``gmail_agent.remote`` over a Unix socket. The service's HTTP
+connection is reused across queries, and the access token is refreshed in
+the background before it expires, so no query waits on a refresh.
+
+Each request and response is a single line of JSON:
+
+    {"query": "unread emails from amazon", "max_results": 50}
+    {"gmail_query": "from:amazon.com is:unread", "messages": [{"subject": ...}]}
+
+A failed request gets ``{"error": "..."}`` instead.
+"""
+
+import json
+import os
+import socketserver
+import stat
+import threading
+from dataclasses import asdict
+
+from gmail_agent.auth import get_credential_provider, get_gmail_service
+from gmail_agent.gmail_client import EmailMessage, create_client
+from gmail_agent.nlp_parser import GmailQueryParser
+from gmail_agent.remote import DEFAULT_SOCKET_PATH
+from gmail_agent.sync import MailboxMirror, MailboxSync
+from gmail_agent.translation_cache import TranslationCache
+
+# Upper bound on a request line, so a misbehaving client cannot exhaust memory.
+MAX_REQUEST_BYTES = 64 * 1024
+
+
+class AgentSession:
+    """Warm state shared by every query a server answers.
+
+    Gmail service objects are not thread-safe, so queries are answered one
+    at a time; concurrent fetches within a query still use per-thread services.
+    Since queries never overlap, the client's coalescer helps them only
+    through its short memo of recently fetched messages.
+    """
+
+    def __init__(
+        self,
+        token_file: str = "token.enc",
+        fetch_mode: str = "batch",
+        max_workers: int = 8,
+        cache_file: str | None = None,
+        cache_label_ttl: float | None = None,
+        mirror_file: str | None = None,
+        translation_cache_file: str | None = None,
+        fast_path: bool = True,
+    ):
+        """Authenticate and build the service, parser and caches.
+
+        Args:
+            token_file: Path to encrypted token file
+            fetch_mode: Metadata fetch strategy: "serial", "batch" or "concurrent"
+            max_workers: Worker threads used by the concurrent fetch mode
+            cache_file: Path to the on-disk message metadata cache, or None to disable it
+            cache_label_ttl: Seconds after which cached labels are refetched, or None
+                to keep cached entries until they are evicted
+            mirror_file: Path to a local INBOX mirror, synced before each query,
+                or None to disable it
+            translation_cache_file: Path to the query translation cache, or None to disable it
+            fast_path: Translate simple queries with local rules instead of Gemini
+        """
+        self.credentials = get_credential_provider(token_file)
+        self.credentials.start()
+        self.service = get_gmail_service(token_file=token_file)
+
+        translation_cache = TranslationCache(translation_cache_file) if translation_cache_file else None
+        self.parser = GmailQueryParser(cache=translation_cache, fast_path=fast_path)
+
+        self.mirror = MailboxMirror(mirror_file) if mirror_file else None
+        self.sync = MailboxSync(self.service, self.mirror) if self.mirror else None
+
+        self.client = create_client(
+            self.service,
+            token_file,
+            fetch_mode=fetch_mode,
+            max_workers=max_workers,
+            cache_file=cache_file,
+            cache_label_ttl=cache_label_ttl,
+            mirror=self.mirror,
+        )
+        self._lock = threading.Lock()
+
+    def search(self, user_query: str, max_results: int = 50) -> tuple[str, list[EmailMessage]]:
+        """Translate and run a query.
+
+        Args:
+            user_query: Natural language search query
+            max_results: Maximum number of results to retrieve
+
+        Returns:
+            The Gmail query used and the matching messages
+        """
+        with self._lock:
+            gmail_query = self.parser.parse(user_query)
+            if self.sync is not None:
+                self.sync.sync()
+            return gmail_query, self.client.search_messages(gmail_query, max_results=max_results)
+
+    def close(self) -> None:
+        """Stop token refreshes and release the client's worker threads and the mirror database."""
+        self.credentials.stop()
+        self.client.close()
+        if self.mirror is not None:
+            self.mirror.close()
+
+
+class AgentRequestHandler(socketserver.StreamRequestHandler):
+    """Answers one JSON request per connection."""
+
+    def handle(self) -> None:
+        line = self.rfile.readline(MAX_REQUEST_BYTES)
+        try:
+            request = json.loads(line)
+            user_query = request["query"]
+            max_results = int(request.get("max_results", 50))
+            gmail_query, messages = self.server.session.search(user_query, max_results=max_results)
+            response = {
+                "gmail_query": gmail_query,
+                "messages": [asdict(message) for message in messages],
+            }
+        except Exception as error:
+            response = {"error": f"{type(error).__name__}: {error}"}
+
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+
+
+def _remove_stale_socket(path: str) -> None:
+    """Delete a socket left behind by an earlier server.
+
+    Raises:
+        FileExistsError: If something other than a socket exists at ``path``
+    """
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and is not a socket; refusing to replace it")
+    os.unlink(path)
+
+
+class AgentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server handing requests to a shared AgentSession."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, session: AgentSession):
+        self.session = session
+        _remove_stale_socket(socket_path)
+        # The socket gives access to the mailbox, so only its owner may connect.
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, AgentRequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def serve(session: AgentSession, socket_path: str = DEFAULT_SOCKET_PATH) -> None:
+    """Serve queries on a Unix socket until interrupted.
+
+    Args:
+        session: Warm agent state used to answer queries
+        socket_path: Filesystem path of the socket; a stale socket is replaced
+
+    Raises:
+        FileExistsError: If ``socket_path`` exists and is not a socket
+    """
+    with AgentServer(socket_path, session) as server:
+        print(f"Gmail agent listening on {socket_path}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            session.close()
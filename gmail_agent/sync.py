@@ -0,0 +1,333 @@
+"""Incremental local mirror of mailbox metadata using the Gmail History API."""
+
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
+
+from googleapiclient.errors import HttpError
+
+from gmail_agent.cache import connect_private
+from gmail_agent.gmail_client import GmailClient
+
+HISTORY_TYPES = ["messageAdded", "messageDeleted", "labelAdded", "labelRemoved"]
+
+# Headers stored for every mirrored message; To is kept for local to: queries.
+MIRROR_HEADERS = ("To",)
+
+
+@dataclass
+class SyncResult:
+    """Summary of one sync run."""
+
+    full_import: bool
+    added: int = 0
+    deleted: int = 0
+    relabeled: int = 0
+    pending: int = 0
+
+
+class MailboxMirror:
+    """SQLite store of ``messages.get`` metadata for every message under one label.
+
+    Besides the messages, the mirror records the Gmail ``historyId`` it is
+    consistent with, the header set it was built with, when it was last synced,
+    and the IDs of messages it should hold but could not fetch yet.
+    """
+
+    def __init__(self, path: str = "mailbox_mirror.db", clock: Callable[[], float] = time.time):
+        self.path = path
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._conn = connect_private(path)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS messages (
+                id TEXT PRIMARY KEY,
+                labels TEXT NOT NULL,
+                internal_date INTEGER NOT NULL,
+                response TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    @property
+    def history_id(self) -> str | None:
+        """The Gmail history ID the mirror is up to date with, if it was ever synced."""
+        return self._get_state("history_id")
+
+    @property
+    def header_set(self) -> tuple[str, ...]:
+        """Headers stored for each mirrored message."""
+        value = self._get_state("header_set")
+        return tuple(value.split(",")) if value else ()
+
+    @property
+    def synced_at(self) -> float | None:
+        """Time of the last successful sync, or None if never synced."""
+        value = self._get_state("synced_at")
+        return float(value) if value is not None else None
+
+    @property
+    def pending_ids(self) -> tuple[str, ...]:
+        """Messages under the label whose metadata could not be fetched yet.
+
+        While any are pending the mirror is incomplete, so it must not answer
+        queries on its own.
+        """
+        value = self._get_state("pending_ids")
+        return tuple(json.loads(value)) if value else ()
+
+    def mark_synced(
+        self, history_id: str, header_set: Iterable[str], pending_ids: Iterable[str] = ()
+    ) -> None:
+        """Record that the mirror reflects the mailbox as of ``history_id``.
+
+        Args:
+            history_id: History ID the mirror is consistent with
+            header_set: Headers stored for each message
+            pending_ids: Messages still missing from the mirror, retried on the next sync
+        """
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+                [
+                    ("history_id", str(history_id)),
+                    ("header_set", ",".join(header_set)),
+                    ("synced_at", repr(self.clock())),
+                    ("pending_ids", json.dumps(list(pending_ids))),
+                ],
+            )
+            self._conn.commit()
+
+    def upsert(self, responses: Iterable[dict]) -> int:
+        """Insert or replace mirrored messages. Returns the number stored."""
+        rows = [
+            (
+                response["id"],
+                json.dumps(response.get("labelIds", [])),
+                int(response.get("internalDate", 0)),
+                json.dumps(response),
+            )
+            for response in responses
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO messages (id, labels, internal_date, response) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def delete(self, message_ids: Iterable[str]) -> int:
+        """Remove messages from the mirror. Returns the number removed."""
+        with self._lock:
+            cursor = self._conn.executemany(
+                "DELETE FROM messages WHERE id = ?", [(mid,) for mid in message_ids]
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def update_labels(self, message_id: str, added=(), removed=()) -> bool:
+        """Apply a label change to a mirrored message. Returns False if it is not mirrored."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM messages WHERE id = ?", (message_id,)
+            ).fetchone()
+            if row is None:
+                return False
+
+            response = json.loads(row[0])
+            labels = [label for label in response.get("labelIds", []) if label not in removed]
+            labels.extend(label for label in added if label not in labels)
+            response["labelIds"] = labels
+            self._conn.execute(
+                "UPDATE messages SET labels = ?, response = ? WHERE id = ?",
+                (json.dumps(labels), json.dumps(response), message_id),
+            )
+            self._conn.commit()
+        return True
+
+    def get_many(self, message_ids: list[str]) -> dict[str, dict]:
+        """Return mirrored responses for the given IDs, for those present."""
+        found: dict[str, dict] = {}
+        with self._lock:
+            for start in range(0, len(message_ids), 500):
+                chunk = message_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT id, response FROM messages WHERE id IN ({placeholders})", chunk
+                )
+                found.update((message_id, json.loads(response)) for message_id, response in rows)
+        return found
+
+    def iter_responses(self) -> Iterator[dict]:
+        """Yield every mirrored response, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT response FROM messages ORDER BY internal_date DESC"
+            ).fetchall()
+        for (response,) in rows:
+            yield json.loads(response)
+
+    def clear(self) -> None:
+        """Remove all messages and sync state."""
+        with self._lock:
+            self._conn.execute("DELETE FROM messages")
+            self._conn.execute("DELETE FROM state")
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def _get_state(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+
+class MailboxSync:
+    """Keeps a MailboxMirror in step with Gmail.
+
+    The first sync imports every message under ``label``; later syncs replay
+    ``users().history().list`` from the stored history ID and only fetch
+    metadata for messages that were added to the label. If Gmail no longer
+    has history that far back, the mirror is rebuilt with a full import.
+    Messages whose metadata cannot be fetched are recorded as pending and
+    fetched again by the next sync, since history will not mention them again.
+    """
+
+    def __init__(self, service, mirror: MailboxMirror, client: GmailClient | None = None,
+                 label: str = "INBOX"):
+        self.service = service
+        self.mirror = mirror
+        self.client = client or GmailClient(
+            service, fetch_mode="batch", extra_headers=MIRROR_HEADERS
+        )
+        self.label = label
+
+    def sync(self) -> SyncResult:
+        """Bring the mirror up to date, importing everything on the first run."""
+        if self.mirror.history_id is None or not self._headers_cover_client():
+            return self.full_import()
+
+        try:
+            return self._apply_history(self.mirror.history_id)
+        except HttpError as error:
+            if error.resp.status == 404:
+                return self.full_import()
+            raise
+
+    def full_import(self) -> SyncResult:
+        """Rebuild the mirror from a complete listing of the label."""
+        # Read the history ID first so changes made during the import are
+        # replayed by the next incremental sync rather than lost.
+        profile = self.client.scheduler.execute(self.service.users().getProfile(userId="me"))
+
+        self.mirror.clear()
+        added = 0
+        pending: list[str] = []
+        message_ids: list[str] = []
+        for message_id in self.client.iter_message_ids(label=self.label):
+            message_ids.append(message_id)
+            if len(message_ids) == 500:
+                added += self._import(message_ids, pending)
+                message_ids = []
+        if message_ids:
+            added += self._import(message_ids, pending)
+
+        self.mirror.mark_synced(profile["historyId"], self.client.metadata_headers, pending)
+        return SyncResult(full_import=True, added=added, pending=len(pending))
+
+    def _import(self, message_ids: list[str], pending: list[str]) -> int:
+        """Fetch and store messages, adding those that could not be fetched to ``pending``.
+
+        Returns:
+            Number of messages stored
+        """
+        responses = self.client.fetch_metadata(message_ids)
+        fetched = {response["id"] for response in responses}
+        pending.extend(message_id for message_id in message_ids if message_id not in fetched)
+        return self.mirror.upsert(responses)
+
+    def _apply_history(self, start_history_id: str) -> SyncResult:
+        """Replay history records since ``start_history_id`` onto the mirror."""
+        # Messages a previous sync could not fetch are retried unless history deletes them.
+        to_fetch: dict[str, None] = dict.fromkeys(self.mirror.pending_ids)
+        to_delete: set[str] = set()
+        relabeled = 0
+        latest_history_id = start_history_id
+
+        for page in self._iter_history(start_history_id):
+            latest_history_id = page.get("historyId", latest_history_id)
+            for record in page.get("history", []):
+                for item in record.get("messagesAdded", []):
+                    message = item["message"]
+                    if self.label in message.get("labelIds", []):
+                        to_fetch[message["id"]] = None
+                        to_delete.discard(message["id"])
+
+                for item in record.get("messagesDeleted", []):
+                    to_fetch.pop(item["message"]["id"], None)
+                    to_delete.add(item["message"]["id"])
+
+                for item in record.get("labelsAdded", []):
+                    message_id = item["message"]["id"]
+                    if self.label in item.get("labelIds", []):
+                        to_fetch[message_id] = None
+                        to_delete.discard(message_id)
+                    elif self.mirror.update_labels(message_id, added=item.get("labelIds", [])):
+                        relabeled += 1
+
+                for item in record.get("labelsRemoved", []):
+                    message_id = item["message"]["id"]
+                    if self.label in item.get("labelIds", []):
+                        to_fetch.pop(message_id, None)
+                        to_delete.add(message_id)
+                    elif self.mirror.update_labels(message_id, removed=item.get("labelIds", [])):
+                        relabeled += 1
+
+        deleted = self.mirror.delete(to_delete)
+        pending: list[str] = []
+        added = self._import(list(to_fetch), pending)
+        self.mirror.mark_synced(latest_history_id, self.client.metadata_headers, pending)
+        return SyncResult(
+            full_import=False, added=added, deleted=deleted, relabeled=relabeled, pending=len(pending)
+        )
+
+    def _iter_history(self, start_history_id: str) -> Iterator[dict]:
+        """Yield every page of ``history.list`` starting at ``start_history_id``."""
+        page_token = None
+        while True:
+            kwargs = {"pageToken": page_token} if page_token else {}
+            page = self.client.scheduler.execute(
+                self.service.users()
+                .history()
+                .list(
+                    userId="me",
+                    startHistoryId=start_history_id,
+                    historyTypes=HISTORY_TYPES,
+                    **kwargs,
+                )
+            )
+            yield page
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                return
+
+    def _headers_cover_client(self) -> bool:
+        """Return True if the mirror stores every header the client asks for."""
+        return set(self.client.metadata_headers) <= set(self.mirror.header_set)
@@ -0,0 +1,155 @@
+"""Cache of natural-language to Gmail query translations."""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+# Inputs mentioning these are translated relative to today (e.g. "this month"
+# may become after:YYYY/MM/01), so their entries expire.
+RELATIVE_DATE_PATTERN = re.compile(
+    r"\b(today|yesterday|tomorrow|tonight|last|past|this|next|recent|recently|ago|"
+    r"day|days|week|weeks|month|months|year|years|weekend)\b"
+    r"|היום|אתמול|שבוע|חודש|שנה|האחרון|האחרונה|האחרונים",
+    re.IGNORECASE,
+)
+
+
+class TranslationCache:
+    """Two-tier cache of query translations: an in-memory LRU over a JSON file.
+
+    Keys combine the normalized user query with a hash of the system prompt
+    and the model name, so changing either invalidates old entries. Entries
+    whose input refers to relative dates expire after ``relative_ttl`` seconds.
+
+    ``put`` only updates memory; ``flush`` writes the new entries to the file
+    in one go, merged into whatever the file holds by then, so processes
+    sharing the file keep each other's translations.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        max_entries: int = 256,
+        relative_ttl: float = 86_400.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self.relative_ttl = relative_ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, dict] = OrderedDict()
+        self._disk: dict[str, dict] | None = None
+        self._unsaved: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(user_query: str) -> str:
+        """Normalize a user query so trivially different phrasings share an entry."""
+        return " ".join(user_query.lower().split()).rstrip("?.!")
+
+    @classmethod
+    def make_key(cls, user_query: str, system_prompt: str, model_name: str) -> str:
+        """Build the cache key for a query under a given prompt and model."""
+        prompt_hash = hashlib.sha256(system_prompt.encode()).hexdigest()[:16]
+        return f"{model_name}:{prompt_hash}:{cls.normalize(user_query)}"
+
+    def get(self, key: str) -> str | None:
+        """Return the cached Gmail query for a key, or None on a miss."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                entry = self._load_disk().get(key)
+                if entry is not None:
+                    self._remember(key, entry)
+            else:
+                self._memory.move_to_end(key)
+
+            if entry is None or self._is_expired(entry):
+                if entry is not None:
+                    self._memory.pop(key, None)
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return entry["query"]
+
+    def put(self, key: str, gmail_query: str, user_query: str) -> None:
+        """Store a translation, giving it a TTL if the input is date-relative.
+
+        The file tier is only written by ``flush``.
+        """
+        expires = None
+        if RELATIVE_DATE_PATTERN.search(user_query):
+            expires = self.clock() + self.relative_ttl
+        entry = {"query": gmail_query, "expires": expires}
+
+        with self._lock:
+            self._remember(key, entry)
+            if self.path is not None:
+                self._load_disk()[key] = entry
+                self._unsaved[key] = entry
+
+    def flush(self) -> None:
+        """Write entries stored since the last flush to the file, if any."""
+        with self._lock:
+            if self._unsaved:
+                self._save_disk()
+
+    def stats(self) -> dict[str, int]:
+        """Return hit and miss counters."""
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _remember(self, key: str, entry: dict) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _is_expired(self, entry: dict) -> bool:
+        return entry["expires"] is not None and self.clock() >= entry["expires"]
+
+    def _load_disk(self) -> dict[str, dict]:
+        if self._disk is None:
+            self._disk = self._read_file()
+        return self._disk
+
+    def _read_file(self) -> dict[str, dict]:
+        if self.path is None or not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _save_disk(self) -> None:
+        """Merge unsaved entries into the current file and replace it atomically.
+
+        The file is read again first, so entries another process wrote since
+        this one loaded it are kept. Expired entries are dropped. If the write
+        fails, the entries stay unsaved for the next flush.
+        """
+        merged = {**self._read_file(), **self._unsaved}
+        entries = {k: v for k, v in merged.items() if not self._is_expired(v)}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self._disk = entries
+        self._unsaved = {}
@@ -0,0 +1,145 @@
+"""Tests for multi-account support."""
+
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+
+from gmail_agent.accounts import AccountPool, AccountRegistry
+from gmail_agent.gmail_client import EmailMessage
+
+
+@pytest.fixture
+def registry(tmp_path):
+    """Create a registry with two accounts."""
+    for name in ("work", "home"):
+        (tmp_path / f"{name}.enc").write_bytes(b"token")
+    return AccountRegistry(str(tmp_path))
+
+
+def make_message(subject, date):
+    return EmailMessage(subject, "sender@example.com", date)
+
+
+class TestAccountRegistry:
+    """Test cases for AccountRegistry class."""
+
+    def test_names_lists_token_files(self, registry):
+        """Test every <name>.enc file is an account."""
+        assert registry.names() == ["home", "work"]
+
+    def test_missing_directory_has_no_accounts(self, tmp_path):
+        """Test a registry directory that does not exist yet is empty."""
+        assert AccountRegistry(str(tmp_path / "missing")).names() == []
+
+    @pytest.mark.parametrize("name", ["", "..", "../other", "a/b"])
+    def test_invalid_names_are_rejected(self, registry, name):
+        """Test account names cannot point outside the directory."""
+        with pytest.raises(ValueError, match="Invalid account name"):
+            registry.token_file(name)
+
+    def test_remove_deletes_token(self, registry):
+        """Test removing an account deletes its token file."""
+        registry.remove("work")
+
+        assert registry.names() == ["home"]
+
+    def test_add_authorizes_account(self, tmp_path):
+        """Test adding an account loads credentials for its token file."""
+        registry = AccountRegistry(str(tmp_path / "accounts"))
+        with patch("gmail_agent.accounts.get_credential_provider") as mock_provider:
+            registry.add("work")
+
+        mock_provider.assert_called_once_with(str(tmp_path / "accounts" / "work.enc"))
+        mock_provider.return_value.get.assert_called_once()
+
+
+class TestAccountPool:
+    """Test cases for AccountPool class."""
+
+    def test_clients_are_created_once_per_account(self, registry):
+        """Test the pool keeps one ready client per account."""
+        with patch("gmail_agent.accounts.get_gmail_service") as mock_service:
+            with patch("gmail_agent.accounts.create_client") as MockClient:
+                MockClient.side_effect = lambda *args, **kwargs: Mock()
+                pool = AccountPool(registry)
+
+                assert pool.client("work") is pool.client("work")
+                assert pool.client("work") is not pool.client("home")
+
+        assert mock_service.call_count == 2
+
+    def test_search_all_merges_newest_first(self, registry):
+        """Test results from every account are merged by date."""
+        results = {
+            "work": [make_message("w1", "Mon, 1 Jan 2024 10:00:00 +0000"),
+                     make_message("w2", "Wed, 3 Jan 2024 10:00:00 +0000")],
+            "home": [make_message("h1", "Tue, 2 Jan 2024 10:00:00 +0000"),
+                     make_message("h2", "not a date")],
+        }
+        pool = AccountPool(registry)
+        with patch.object(pool, "client") as mock_client:
+            mock_client.side_effect = lambda name: Mock(
+                search_messages=Mock(return_value=results[name])
+            )
+            result = pool.search_all("is:unread", max_results=3)
+
+        assert [(m.account, m.message.subject) for m in result.messages] == [
+            ("work", "w2"), ("home", "h1"), ("work", "w1"),
+        ]
+        assert result.errors == {}
+
+    def test_search_all_keeps_equal_ids_from_different_accounts(self, registry):
+        """Test message IDs are not deduplicated across mailboxes."""
+        date = "Mon, 1 Jan 2024 10:00:00 +0000"
+        pool = AccountPool(registry)
+        with patch.object(pool, "client") as mock_client:
+            mock_client.side_effect = lambda name: Mock(search_messages=Mock(return_value=[
+                EmailMessage(name, "sender@example.com", date, message_id="m1")
+            ]))
+            result = pool.search_all("is:unread")
+
+        assert sorted(m.account for m in result.messages) == ["home", "work"]
+
+    def test_accounts_are_searched_concurrently(self, registry):
+        """Test every account's search runs at the same time."""
+        barrier = threading.Barrier(2, timeout=2)
+
+        def search_messages(query, max_results):
+            barrier.wait()
+            return []
+
+        pool = AccountPool(registry)
+        with patch.object(pool, "client", return_value=Mock(search_messages=search_messages)):
+            result = pool.search_all("is:unread")
+
+        assert result.errors == {}
+
+    def test_unknown_accounts_are_reported_without_authorizing(self, registry):
+        """Test a mistyped account name never reaches the OAuth flow."""
+        pool = AccountPool(registry)
+        with patch("gmail_agent.accounts.get_gmail_service") as mock_service:
+            with patch("gmail_agent.accounts.create_client") as MockClient:
+                MockClient.return_value.search_messages.return_value = []
+                result = pool.search_all("is:unread", accounts=["work", "wrok"])
+
+        mock_service.assert_called_once()
+        assert list(result.errors) == ["wrok"]
+        assert "not registered" in result.errors["wrok"]
+        with pytest.raises(ValueError, match="not registered"):
+            pool.client("wrok")
+
+    def test_failing_account_is_reported(self, registry):
+        """Test one account failing does not hide the others' results."""
+        def client(name):
+            if name == "work":
+                raise ValueError("token revoked")
+            return Mock(search_messages=Mock(return_value=[make_message("h", "")]))
+
+        pool = AccountPool(registry)
+        with patch.object(pool, "client", side_effect=client):
+            result = pool.search_all("is:unread", accounts=["work", "home"])
+
+        assert result.errors == {"work": "token revoked"}
+        assert [m.account for m in result.messages] == ["home"]
+
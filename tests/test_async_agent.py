@@ -0,0 +1,172 @@
+"""Tests for async agent module."""
+
+import asyncio
+import threading
+import time
+from io import StringIO
+from unittest.mock import Mock, patch
+
+import pytest
+
+from gmail_agent.async_agent import (
+    AsyncGmailClient,
+    AsyncGmailQueryParser,
+    run_agent_async,
+)
+from gmail_agent.gmail_client import GmailClient
+from gmail_agent.nlp_parser import Translation
+
+
+def make_message(message_id):
+    """Build a messages.get metadata response."""
+    return {
+        "id": message_id,
+        "payload": {
+            "headers": [
+                {"name": "Subject", "value": f"Subject {message_id}"},
+                {"name": "From", "value": "sender@example.com"},
+                {"name": "Date", "value": "Mon, 1 Jan 2024 10:00:00 +0000"},
+            ]
+        },
+    }
+
+
+class InFlightCounter:
+    """Tracks the peak number of concurrent get calls across threads."""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.current = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def make_service(self):
+        service = Mock()
+
+        def get(userId, id, **kwargs):
+            request = Mock()
+
+            def execute():
+                with self.lock:
+                    self.current += 1
+                    self.peak = max(self.peak, self.current)
+                time.sleep(self.delay)
+                with self.lock:
+                    self.current -= 1
+                return make_message(id)
+
+            request.execute.side_effect = execute
+            return request
+
+        service.users().messages().get.side_effect = get
+        return service
+
+
+def make_list_service(count):
+    """Create a service whose list call returns ``count`` message IDs."""
+    service = Mock()
+    service.users().messages().list().execute.return_value = {
+        "messages": [{"id": f"msg{i}"} for i in range(count)]
+    }
+    return service
+
+
+class TestAsyncGmailQueryParser:
+    """Test cases for AsyncGmailQueryParser class."""
+
+    def test_parse_delegates_to_sync_parser(self):
+        """Test the async parser returns the wrapped parser's translation."""
+        sync_parser = Mock()
+        sync_parser.translate.return_value = Translation("is:unread", "rules")
+
+        result = asyncio.run(AsyncGmailQueryParser(sync_parser).parse("unread"))
+
+        assert result == "is:unread"
+        sync_parser.translate.assert_called_once_with("unread")
+
+
+class TestAsyncGmailClient:
+    """Test cases for AsyncGmailClient class."""
+
+    def test_requires_service_factory(self):
+        """Test a client without per-thread services is rejected."""
+        with pytest.raises(ValueError, match="service_factory"):
+            AsyncGmailClient(GmailClient(Mock()))
+
+    def test_iter_messages_yields_every_message(self):
+        """Test all listed messages are yielded as they complete."""
+        counter = InFlightCounter()
+        client = GmailClient(make_list_service(12), service_factory=counter.make_service)
+
+        async def collect():
+            return [m.subject async for m in AsyncGmailClient(client).iter_messages("q")]
+
+        subjects = asyncio.run(collect())
+
+        assert sorted(subjects) == sorted(f"Subject msg{i}" for i in range(12))
+
+    def test_concurrency_is_bounded(self):
+        """Test no more than ``concurrency`` fetches run at once."""
+        counter = InFlightCounter(delay=0.02)
+        client = GmailClient(make_list_service(20), service_factory=counter.make_service)
+
+        asyncio.run(AsyncGmailClient(client, concurrency=3).search_messages("q"))
+
+        assert 1 < counter.peak <= 3
+
+    def test_search_messages_keeps_list_order(self):
+        """Test the list variant returns messages in list order."""
+        counter = InFlightCounter()
+        client = GmailClient(make_list_service(10), service_factory=counter.make_service)
+
+        results = asyncio.run(AsyncGmailClient(client).search_messages("q"))
+
+        assert [m.subject for m in results] == [f"Subject msg{i}" for i in range(10)]
+
+
+class TestRunAgentAsync:
+    """Test cases for run_agent_async function."""
+
+    def test_credentials_load_overlaps_translation(self):
+        """Test authentication and translation run at the same time."""
+        def slow_credentials():
+            time.sleep(0.2)
+            return Mock()
+
+        def slow_translate(query):
+            time.sleep(0.2)
+            return Translation("is:unread", "model")
+
+        counter = InFlightCounter()
+        list_service = make_list_service(3)
+
+        with patch("gmail_agent.async_agent.get_credential_provider") as mock_provider:
+            mock_provider.return_value.get.side_effect = slow_credentials
+            with patch("gmail_agent.async_agent.GmailQueryParser") as MockParser:
+                with patch("gmail_agent.async_agent.build_gmail_service") as mock_build:
+                    MockParser.return_value.translate.side_effect = slow_translate
+                    services = iter([list_service])
+                    mock_build.side_effect = lambda creds: next(services, None) or counter.make_service()
+
+                    with patch("sys.stdout", new=StringIO()) as fake_out:
+                        started = time.perf_counter()
+                        asyncio.run(run_agent_async("unread emails"))
+                        elapsed = time.perf_counter() - started
+
+        output = fake_out.getvalue()
+        assert elapsed < 0.35
+        assert "Gmail search query: is:unread" in output
+        assert all(f"Subject msg{i}" in output for i in range(3))
+
+    def test_reports_no_results(self):
+        """Test an empty result set prints the usual message."""
+        with patch("gmail_agent.async_agent.get_credential_provider"):
+            with patch("gmail_agent.async_agent.GmailQueryParser") as MockParser:
+                with patch("gmail_agent.async_agent.build_gmail_service") as mock_build:
+                    MockParser.return_value.translate.return_value = Translation("x", "model")
+                    mock_build.return_value = make_list_service(0)
+
+                    with patch("sys.stdout", new=StringIO()) as fake_out:
+                        asyncio.run(run_agent_async("nothing"))
+
+        assert "No results found." in fake_out.getvalue()
@@ -1,13 +1,37 @@
 """Tests for authentication module."""
 
+import json
 import os
 import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
 from unittest.mock import Mock, patch
 
 import pytest
 
-from gmail_agent.auth import TokenManager, get_gmail_service
+from google.auth.credentials import AnonymousCredentials
+
+from gmail_agent import auth
+from gmail_agent.auth import (
+    CredentialProvider,
+    TokenManager,
+    build_gmail_service,
+    clear_service_cache,
+    get_gmail_service,
+    gmail_service_factory,
+    load_discovery_document,
+)
+
+
+@pytest.fixture(autouse=True)
+def isolated_service_cache(tmp_path):
+    """Give each test an empty in-process cache and its own discovery cache directory."""
+    clear_service_cache()
+    with patch.object(auth, "DISCOVERY_CACHE_DIR", tmp_path / "discovery"):
+        yield tmp_path / "discovery"
+    clear_service_cache()
 
 
 class TestTokenManager:
@@ -85,6 +109,146 @@ class TestTokenManager:
             token = manager.load_token()
             assert token is None
 
+    def test_fernet_is_built_once(self, temp_token_file, encryption_key):
+        """Test the cipher is created once per manager, not per call."""
+        with patch.dict(os.environ, {"GMAIL_AGENT_KEY": encryption_key}):
+            with patch("gmail_agent.auth.Fernet") as MockFernet:
+                manager = TokenManager(temp_token_file)
+                manager._encrypt_token({"token": "a"})
+                manager._encrypt_token({"token": "b"})
+
+                MockFernet.assert_called_once()
+
+    def test_save_token_leaves_no_temporary_files(self, tmp_path, encryption_key):
+        """Test the token is written through a temporary file that replaces it."""
+        token_file = tmp_path / "token.enc"
+        with patch.dict(os.environ, {"GMAIL_AGENT_KEY": encryption_key}):
+            manager = TokenManager(str(token_file))
+            manager.save_token({"token": "first"})
+            manager.save_token({"token": "second"})
+
+            assert manager.load_token() == {"token": "second"}
+            assert [p.name for p in tmp_path.iterdir()] == ["token.enc"]
+
+
+NOW = datetime(2024, 1, 1, 12, 0, 0)
+
+
+class FakeCredentials:
+    """Credentials whose refresh issues a new token valid for an hour."""
+
+    def __init__(self, expiry, rotate=True, release=None):
+        self.expiry = expiry
+        self.token = "token-0"
+        self.rotate = rotate
+        self.release = release
+        self.refreshes = 0
+
+    def refresh(self, request):
+        if self.release is not None:
+            self.release.wait(5)
+        self.refreshes += 1
+        if self.rotate:
+            self.token = f"token-{self.refreshes}"
+        self.expiry = NOW + timedelta(hours=1)
+
+    def to_json(self):
+        return json.dumps({"token": self.token})
+
+
+class TestCredentialProvider:
+    """Test cases for CredentialProvider class."""
+
+    def make_provider(self, **kwargs):
+        return CredentialProvider("token.enc", now=lambda: NOW, **kwargs)
+
+    def test_credentials_are_loaded_once(self):
+        """Test the token file is decrypted only on the first get()."""
+        creds = FakeCredentials(NOW + timedelta(hours=1))
+        with patch("gmail_agent.auth.load_credentials", return_value=creds) as mock_load:
+            provider = self.make_provider()
+            assert provider.get() is provider.get()
+
+        mock_load.assert_called_once_with("token.enc")
+        assert creds.refreshes == 0
+
+    def test_expired_token_is_refreshed_and_saved(self):
+        """Test an expired token is refreshed before returning and written back."""
+        creds = FakeCredentials(NOW - timedelta(minutes=1))
+        with patch("gmail_agent.auth.load_credentials", return_value=creds):
+            with patch("gmail_agent.auth.TokenManager") as MockTokenManager:
+                self.make_provider().get()
+
+        assert creds.refreshes == 1
+        MockTokenManager.return_value.save_token.assert_called_once_with({"token": "token-1"})
+
+    def test_token_near_expiry_is_refreshed_in_background(self):
+        """Test get() returns the still-valid token while a refresh runs."""
+        release = threading.Event()
+        creds = FakeCredentials(NOW + timedelta(minutes=2), release=release)
+        with patch("gmail_agent.auth.load_credentials", return_value=creds):
+            with patch("gmail_agent.auth.TokenManager") as MockTokenManager:
+                provider = self.make_provider()
+
+                assert provider.get().token == "token-0"
+                assert creds.refreshes == 0
+
+                release.set()
+                for _ in range(100):
+                    if MockTokenManager.return_value.save_token.called:
+                        break
+                    threading.Event().wait(0.01)
+
+        assert creds.refreshes == 1
+        MockTokenManager.return_value.save_token.assert_called_once()
+
+    def test_get_does_not_wait_for_a_running_refresh(self):
+        """Test callers keep getting the valid token while a slow refresh is in flight."""
+        release = threading.Event()
+        creds = FakeCredentials(NOW + timedelta(minutes=2), release=release)
+        with patch("gmail_agent.auth.load_credentials", return_value=creds):
+            with patch("gmail_agent.auth.TokenManager"):
+                provider = self.make_provider()
+                provider.get()
+
+                started = time.perf_counter()
+                assert provider.get().token == "token-0"
+                elapsed = time.perf_counter() - started
+                release.set()
+                for _ in range(100):
+                    if creds.refreshes:
+                        break
+                    threading.Event().wait(0.01)
+
+        assert elapsed < 0.5
+        assert creds.refreshes == 1
+
+    def test_unchanged_token_is_not_written(self):
+        """Test the token file is left alone when a refresh returns the same token."""
+        creds = FakeCredentials(NOW - timedelta(minutes=1), rotate=False)
+        with patch("gmail_agent.auth.load_credentials", return_value=creds):
+            with patch("gmail_agent.auth.TokenManager") as MockTokenManager:
+                self.make_provider().get()
+
+        assert creds.refreshes == 1
+        MockTokenManager.return_value.save_token.assert_not_called()
+
+    def test_start_refreshes_ahead_of_expiry(self):
+        """Test the refresh thread renews the token without any caller."""
+        creds = FakeCredentials(NOW + timedelta(minutes=10))
+        with patch("gmail_agent.auth.load_credentials", return_value=creds):
+            with patch("gmail_agent.auth.TokenManager"):
+                provider = self.make_provider(refresh_margin=600.0)
+                provider.start()
+                for _ in range(100):
+                    if creds.refreshes:
+                        break
+                    threading.Event().wait(0.01)
+                provider.stop()
+
+        assert creds.refreshes == 1
+        assert provider.seconds_until_expiry() == 3600
+
 
 class TestGetGmailService:
     """Test cases for get_gmail_service function."""
@@ -107,7 +271,8 @@ class TestGetGmailService:
 
         with patch.dict(os.environ, {"GMAIL_AGENT_KEY": encryption_key}):
             with patch("gmail_agent.auth.TokenManager") as MockTokenManager:
-                with patch("gmail_agent.auth.build") as mock_build:
+                with patch("gmail_agent.auth.build_from_document") as mock_build, \
+                        patch("gmail_agent.auth.load_discovery_document", return_value={}):
                     mock_manager = MockTokenManager.return_value
                     mock_manager.load_token.return_value = {
                         "token": "access_token",
@@ -139,3 +304,71 @@ class TestGetGmailService:
 
                 with pytest.raises(ValueError, match="GOOGLE_CLIENT_ID"):
                     get_gmail_service(str(token_file))
+
+    def test_gmail_service_factory_builds_new_service_per_call(self, mock_credentials):
+        """Test the factory loads credentials once and builds a service per call."""
+        with patch("gmail_agent.auth.load_credentials", return_value=mock_credentials) as mock_load:
+            with patch("gmail_agent.auth.load_discovery_document", return_value={}), \
+                    patch("gmail_agent.auth.build_from_document",
+                          side_effect=lambda *a, **kw: Mock()) as mock_build:
+                factory = gmail_service_factory("token.enc")
+                first, second = factory(), factory()
+
+                assert first is not second
+                mock_load.assert_called_once_with("token.enc")
+                assert mock_build.call_count == 2
+                assert mock_build.call_args[1]["credentials"] is mock_credentials
+
+    def test_get_gmail_service_reuses_service_in_process(self, mock_credentials):
+        """Test repeated calls for one token file build the service once."""
+        with patch("gmail_agent.auth.load_credentials", return_value=mock_credentials) as mock_load:
+            with patch("gmail_agent.auth.build_gmail_service", side_effect=lambda creds: Mock()):
+                first = get_gmail_service("token.enc")
+                second = get_gmail_service("token.enc")
+
+        assert first is second
+        mock_load.assert_called_once()
+
+
+class TestDiscoveryDocument:
+    """Test cases for the discovery document cache."""
+
+    def test_bundled_document_is_written_to_cache(self, isolated_service_cache):
+        """Test the first load stores the document on disk."""
+        document = load_discovery_document()
+
+        assert document["name"] == "gmail"
+        assert (isolated_service_cache / "gmail.v1.json").exists()
+
+    def test_document_is_parsed_once_per_process(self):
+        """Test later loads return the same parsed document."""
+        assert load_discovery_document() is load_discovery_document()
+
+    def test_cached_file_is_used_without_bundled_copy(self, isolated_service_cache):
+        """Test a document already on disk is loaded from the cache."""
+        load_discovery_document()
+        clear_service_cache()
+
+        with patch("gmail_agent.auth.get_static_doc") as mock_static:
+            document = load_discovery_document()
+
+        mock_static.assert_not_called()
+        assert document["version"] == "v1"
+
+    def test_missing_document_falls_back_to_network_discovery(self):
+        """Test service construction discovers the API when no local copy exists."""
+        with patch("gmail_agent.auth.get_static_doc", return_value=None):
+            with patch("gmail_agent.auth.build") as mock_build:
+                build_gmail_service(AnonymousCredentials())
+
+        assert mock_build.call_args.kwargs["static_discovery"] is False
+
+    def test_building_services_leaves_document_unchanged(self):
+        """Test services built from the shared document do not modify it."""
+        document = load_discovery_document()
+        snapshot = json.loads(json.dumps(document))
+
+        service = build_gmail_service(AnonymousCredentials())
+        service.users().messages().get(userId="me", id="abc", format="metadata")
+
+        assert document == snapshot
@@ -0,0 +1,119 @@
+"""Tests for batch mode."""
+
+from unittest.mock import Mock
+
+import pytest
+
+from gmail_agent.batch import BatchQuery, BatchResult, read_batch_queries, search_batch
+from gmail_agent.gmail_client import EmailMessage
+from gmail_agent.metrics import Metrics
+
+
+class TestReadBatchQueries:
+    """Test cases for read_batch_queries function."""
+
+    def test_reads_plain_and_json_lines(self):
+        """Test plain lines are numbered and JSON lines keep their own ID and limit."""
+        lines = [
+            "unread emails\n",
+            "\n",
+            "# nightly searches\n",
+            '{"id": "invoices", "query": "invoices from finance", "max_results": 5}\n',
+            '{"query": "starred"}\n',
+        ]
+
+        assert read_batch_queries(lines) == [
+            BatchQuery("1", "unread emails"),
+            BatchQuery("invoices", "invoices from finance", 5),
+            BatchQuery("5", "starred"),
+        ]
+
+    @pytest.mark.parametrize("line, message", [
+        ("{not json", "invalid JSON"),
+        ('{"id": "x"}', "query"),
+        ('{"query": "a", "max_results": -1}', "max_results"),
+    ])
+    def test_malformed_json_lines_are_rejected(self, line, message):
+        """Test a bad JSON line names its line number."""
+        with pytest.raises(ValueError, match=f"Line 2: .*{message}"):
+            read_batch_queries(["unread emails", line])
+
+
+class TestSearchBatch:
+    """Test cases for search_batch function."""
+
+    @pytest.fixture
+    def client(self):
+        """Create a client stub listing fixed IDs for each Gmail query."""
+        pages = {"is:unread": ["m1", "m2", "m3"], "is:starred": ["m2", "m4"]}
+        client = Mock(metrics=Metrics())
+        client.search_locally.return_value = None
+        client.list_message_ids.side_effect = lambda query, limit: pages[query][:limit]
+        client.fetch_metadata.side_effect = lambda ids: [{"id": message_id} for message_id in ids]
+        client.to_email_message.side_effect = lambda msg: EmailMessage("", "", "", message_id=msg["id"])
+        return client
+
+    def make_results(self, *items):
+        return [
+            BatchResult(BatchQuery(str(number), "text", limit), gmail_query)
+            for number, (gmail_query, limit) in enumerate(items, start=1)
+        ]
+
+    def message_ids(self, result):
+        return [msg.message_id for msg in result.messages]
+
+    def test_identical_gmail_queries_are_listed_once(self, client):
+        """Test duplicates share one list call made with the largest limit."""
+        results = self.make_results(("is:unread", 1), ("is:unread", 3))
+
+        search_batch(client, results)
+
+        client.list_message_ids.assert_called_once_with("is:unread", 3)
+        assert self.message_ids(results[0]) == ["m1"]
+        assert self.message_ids(results[1]) == ["m1", "m2", "m3"]
+
+    def test_messages_found_by_several_queries_are_fetched_once(self, client):
+        """Test every distinct ID is fetched in one pass across queries."""
+        results = self.make_results(("is:unread", None), ("is:starred", None))
+
+        search_batch(client, results)
+
+        client.fetch_metadata.assert_called_once_with(["m1", "m2", "m3", "m4"])
+        assert self.message_ids(results[1]) == ["m2", "m4"]
+        assert client.metrics.counters["batch.shared_messages"] == 1
+
+    def test_failed_listing_only_fails_its_queries(self, client):
+        """Test an error listing one query leaves the others searched."""
+        client.list_message_ids.side_effect = [["m1"], RuntimeError("quota exceeded")]
+        results = self.make_results(("is:unread", None), ("is:starred", None))
+
+        search_batch(client, results)
+
+        assert self.message_ids(results[0]) == ["m1"]
+        assert results[0].error is None
+        assert results[1].error == "quota exceeded"
+
+    def test_failed_fetch_fails_only_the_queries_that_needed_it(self, client):
+        """Test an error fetching metadata is reported per query instead of raised."""
+        client.search_locally.side_effect = lambda query, limit: (
+            [{"id": "m9"}] if query == "is:starred" else None
+        )
+        client.fetch_metadata.side_effect = RuntimeError("401 invalid credentials")
+        results = self.make_results(("is:unread", None), ("is:starred", None))
+
+        search_batch(client, results)
+
+        assert results[0].error == "401 invalid credentials"
+        assert results[1].error is None
+        assert self.message_ids(results[1]) == ["m9"]
+
+    def test_mirror_answers_skip_the_api(self, client):
+        """Test queries the mirror answers are neither listed nor fetched."""
+        client.search_locally.return_value = [{"id": "m9"}]
+        results = self.make_results(("is:unread", None))
+
+        search_batch(client, results)
+
+        client.list_message_ids.assert_not_called()
+        client.fetch_metadata.assert_not_called()
+        assert self.message_ids(results[0]) == ["m9"]
@@ -0,0 +1,121 @@
+"""Tests for message metadata cache module."""
+
+import stat
+
+import pytest
+
+from gmail_agent.cache import MessageCache
+
+
+def make_response(message_id, labels=("INBOX",)):
+    """Build a trimmed messages.get response."""
+    return {
+        "id": message_id,
+        "labelIds": list(labels),
+        "payload": {"headers": [{"name": "Subject", "value": f"Subject {message_id}"}]},
+    }
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMessageCache:
+    """Test cases for MessageCache class."""
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    @pytest.fixture
+    def cache(self, tmp_path, clock):
+        cache = MessageCache(str(tmp_path / "cache.db"), clock=clock)
+        yield cache
+        cache.close()
+
+    def test_get_many_returns_only_hits(self, cache):
+        """Test lookups return stored responses and omit unknown IDs."""
+        cache.put_many([make_response("a"), make_response("b")])
+
+        hits = cache.get_many(["a", "b", "c"])
+
+        assert hits == {"a": make_response("a"), "b": make_response("b")}
+
+    def test_entries_persist_across_instances(self, tmp_path, clock):
+        """Test the cache survives reopening the database file."""
+        path = str(tmp_path / "cache.db")
+        first = MessageCache(path, clock=clock)
+        first.put_many([make_response("a")])
+        first.close()
+
+        second = MessageCache(path, clock=clock)
+        assert second.get_many(["a"]) == {"a": make_response("a")}
+        second.close()
+
+    def test_different_header_set_is_a_miss(self, cache):
+        """Test entries fetched with other headers are not reused."""
+        cache.put_many([make_response("a")], header_set="Subject,From,Date")
+
+        assert cache.get_many(["a"], header_set="Subject,From,Date,To") == {}
+        assert "a" in cache.get_many(["a"], header_set="Subject,From,Date")
+
+    def test_label_ttl_expires_entries(self, tmp_path, clock):
+        """Test entries older than the label TTL are treated as misses."""
+        cache = MessageCache(str(tmp_path / "cache.db"), label_ttl=60, clock=clock)
+        cache.put_many([make_response("a")])
+
+        clock.now += 30
+        assert "a" in cache.get_many(["a"])
+
+        clock.now += 31
+        assert cache.get_many(["a"]) == {}
+        cache.close()
+
+    def test_entries_do_not_expire_without_label_ttl(self, cache, clock):
+        """Test repeated queries days apart are still served from the cache by default."""
+        cache.put_many([make_response("a")])
+
+        clock.now += 7 * 86_400
+
+        assert "a" in cache.get_many(["a"])
+
+    def test_database_is_private(self, tmp_path):
+        """Test the cache file, which holds subjects and senders, is readable by its owner only."""
+        path = tmp_path / "cache.db"
+        MessageCache(str(path)).close()
+
+        assert stat.S_IMODE(path.stat().st_mode) == 0o600
+
+    def test_evicts_least_recently_used_entries(self, tmp_path, clock):
+        """Test the cache stays within max_entries by dropping the LRU entries."""
+        cache = MessageCache(str(tmp_path / "cache.db"), max_entries=2, clock=clock)
+        cache.put_many([make_response("a")])
+        clock.now += 1
+        cache.put_many([make_response("b")])
+        clock.now += 1
+        cache.get_many(["a"])
+        clock.now += 1
+        cache.put_many([make_response("c")])
+
+        assert len(cache) == 2
+        assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+        cache.close()
+
+    def test_clear_removes_all_entries(self, cache):
+        """Test clear empties the cache."""
+        cache.put_many([make_response("a")])
+
+        cache.clear()
+
+        assert len(cache) == 0
+
+    def test_invalid_max_entries_raises(self, tmp_path):
+        """Test a non-positive capacity is rejected."""
+        with pytest.raises(ValueError, match="max_entries"):
+            MessageCache(str(tmp_path / "cache.db"), max_entries=0)
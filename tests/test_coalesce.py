@@ -0,0 +1,119 @@
+"""Tests for the fetch coalescer module."""
+
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+from gmail_agent.coalesce import FetchCoalescer
+from gmail_agent.metrics import Metrics
+
+
+class FakeClock:
+    """Clock advanced by hand."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def loader():
+    """Create a load function answering every ID."""
+    return Mock(side_effect=lambda ids: [{"id": message_id} for message_id in ids])
+
+
+class TestFetchCoalescer:
+    """Test cases for FetchCoalescer class."""
+
+    def test_responses_are_reused_within_the_window(self):
+        """Test a second request for the same IDs loads only the new ones."""
+        clock = FakeClock()
+        coalescer = FetchCoalescer(ttl=30, clock=clock)
+        load = loader()
+
+        coalescer.fetch_many(["m1", "m2"], load)
+        found = coalescer.fetch_many(["m2", "m3"], load)
+
+        assert list(found) == ["m2", "m3"]
+        assert load.call_args_list[1].args == (["m3"],)
+
+    def test_expired_responses_are_loaded_again(self):
+        """Test responses older than the window are not reused."""
+        clock = FakeClock()
+        coalescer = FetchCoalescer(ttl=30, clock=clock)
+        load = loader()
+
+        coalescer.fetch_many(["m1"], load)
+        clock.now = 31
+        coalescer.fetch_many(["m1"], load)
+
+        assert load.call_count == 2
+
+    def test_concurrent_callers_share_one_load(self):
+        """Test a caller asking for an ID being loaded waits for that load."""
+        coalescer = FetchCoalescer()
+        started, release = threading.Event(), threading.Event()
+        metrics = Metrics()
+
+        def slow_load(ids):
+            started.set()
+            release.wait(5)
+            return [{"id": message_id} for message_id in ids]
+
+        load = Mock(side_effect=slow_load)
+        owner = threading.Thread(target=coalescer.fetch_many, args=(["m1", "m2"], load))
+        owner.start()
+        started.wait(5)
+
+        results = []
+        joiner = threading.Thread(
+            target=lambda: results.append(coalescer.fetch_many(["m2"], load, metrics=metrics))
+        )
+        joiner.start()
+        release.set()
+        owner.join(5)
+        joiner.join(5)
+
+        load.assert_called_once_with(["m1", "m2"])
+        assert results == [{"m2": {"id": "m2"}}]
+        assert metrics.counters["coalesce.joined"] + metrics.counters["coalesce.memo_hits"] == 1
+
+    def test_namespaces_are_kept_apart(self):
+        """Test responses fetched with other headers are not reused."""
+        coalescer = FetchCoalescer()
+        load = loader()
+
+        coalescer.fetch_many(["m1"], load, namespace="Subject,From,Date")
+        coalescer.fetch_many(["m1"], load, namespace="Subject,From,Date,To")
+
+        assert load.call_count == 2
+
+    def test_failed_load_is_raised_and_not_remembered(self):
+        """Test the loader's error reaches the caller and the IDs can be loaded later."""
+        coalescer = FetchCoalescer()
+        load = Mock(side_effect=[RuntimeError("quota exceeded"), [{"id": "m1"}]])
+
+        with pytest.raises(RuntimeError):
+            coalescer.fetch_many(["m1"], load)
+
+        assert coalescer.fetch_many(["m1"], load) == {"m1": {"id": "m1"}}
+
+    def test_oldest_responses_are_dropped_beyond_max_entries(self):
+        """Test the memo stays within its size bound."""
+        coalescer = FetchCoalescer(max_entries=2)
+
+        coalescer.fetch_many(["m1", "m2", "m3"], loader())
+
+        assert len(coalescer) == 2
+
+    def test_zero_ttl_remembers_nothing(self):
+        """Test ttl=0 only shares in-flight loads."""
+        coalescer = FetchCoalescer(ttl=0)
+        load = loader()
+
+        coalescer.fetch_many(["m1"], load)
+        coalescer.fetch_many(["m1"], load)
+
+        assert load.call_count == 2
@@ -5,8 +5,18 @@ from unittest.mock import patch
 
 import pytest
 
-from gmail_agent.display import format_messages, display_results
-from gmail_agent.gmail_client import EmailMessage
+from gmail_agent.accounts import AccountMessage
+from gmail_agent.display import (
+    StreamingTableRenderer,
+    display_results,
+    display_threads,
+    format_account_messages,
+    format_messages,
+    format_row,
+    format_rule,
+    format_threads,
+)
+from gmail_agent.gmail_client import EmailMessage, EmailThread
 
 
 class TestFormatMessages:
@@ -71,6 +81,139 @@ class TestFormatMessages:
 
         assert "+" in result or "|" in result or "-" in result
 
+    def test_format_accepts_generator(self):
+        """Test formatting consumes a stream of messages."""
+        messages = (EmailMessage(f"Subject {i}", "test@example.com", "Date") for i in range(3))
+
+        result = format_messages(messages)
+
+        assert "Subject 0" in result
+        assert "Subject 2" in result
+
+    def test_format_empty_generator(self):
+        """Test an empty stream is reported as no results."""
+        assert format_messages(iter([])) == "No results found."
+
+
+class TestFormatAccountMessages:
+    """Test cases for format_account_messages function."""
+
+    def test_account_column_is_shown(self):
+        """Test each row names the account it came from."""
+        output = format_account_messages(
+            [AccountMessage("work", EmailMessage("Hello", "a@example.com", "Mon"))]
+        )
+
+        assert "Account" in output
+        assert "work" in output
+
+
+class TestFormatThreads:
+    """Test cases for thread rows."""
+
+    @staticmethod
+    def thread():
+        return EmailThread(
+            thread_id="t1",
+            subject="Release planning",
+            sender="Bob <bob@example.com>",
+            date="Tue, 2 Jan 2024",
+            participants=("Alice <alice@example.com>", "carol@example.com"),
+            message_count=12,
+        )
+
+    def test_thread_row_shows_names_latest_date_and_count(self):
+        """Test participants are shown by name and the message count has its own column."""
+        output = format_threads([self.thread()])
+
+        assert "Participants" in output
+        assert "Alice, carol@example.com" in output
+        assert "alice@example.com" not in output
+        assert "Tue, 2 Jan 2024" in output
+        assert "12" in output
+
+    def test_streamed_threads_use_thread_columns(self):
+        """Test a thread stream is rendered with the thread headers."""
+        with patch("sys.stdout", new=StringIO()) as fake_out:
+            display_threads(iter([self.thread()]))
+
+        assert "Messages" in fake_out.getvalue()
+        assert "Release planning" in fake_out.getvalue()
+
+
+class TestFormatRow:
+    """Test cases for fixed-width row formatting."""
+
+    def test_row_matches_rule_width(self):
+        """Test rows and grid lines line up."""
+        row = format_row(["Subject", "sender@example.com", "Date"], widths=(10, 10, 5))
+
+        assert len(row) == len(format_rule(widths=(10, 10, 5)))
+
+    def test_long_values_are_truncated(self):
+        """Test values wider than their column are cut with an ellipsis."""
+        row = format_row(["A very long subject line", "x", "y"], widths=(10, 3, 3))
+
+        assert "A very lo…" in row
+
+    def test_newlines_are_collapsed(self):
+        """Test multi-line header values stay on one row."""
+        assert "\n" not in format_row(["Folded\n subject", "x", "y"])
+
+
+class TestStreamingTableRenderer:
+    """Test cases for StreamingTableRenderer class."""
+
+    @staticmethod
+    def messages(count):
+        return (EmailMessage(f"Subject {i}", f"sender{i}@example.com", "Mon") for i in range(count))
+
+    def test_rows_print_before_input_is_exhausted(self):
+        """Test fixed-width rows are written as each message arrives."""
+        out = StringIO()
+        renderer = StreamingTableRenderer(out=out, widths=(10, 10, 5))
+
+        renderer.add(EmailMessage("First", "a@example.com", "Mon"))
+
+        assert "First" in out.getvalue()
+
+    def test_widths_are_sampled_and_capped(self):
+        """Test sampled widths fit the sample but never exceed the maximum."""
+        out = StringIO()
+        rows = [EmailMessage("Hi", "x" * 100, "Mon")]
+
+        StreamingTableRenderer(out=out, max_widths=(50, 20, 31)).render(rows)
+
+        row = out.getvalue().splitlines()[3]
+        assert row == format_row(["Hi", "x" * 100, "Mon"], widths=(7, 20, 4))
+
+    def test_only_the_sample_is_buffered(self):
+        """Test rows after the sample are written straight through."""
+        out = StringIO()
+        renderer = StreamingTableRenderer(out=out, sample_size=2)
+        for message in self.messages(3):
+            renderer.add(message)
+
+        assert renderer.rows_written == 3
+        assert renderer._sample == []
+
+    def test_flushes_in_chunks(self):
+        """Test output is flushed once per chunk of rows and at the end."""
+        out = StringIO()
+        with patch.object(out, "flush") as mock_flush:
+            StreamingTableRenderer(out=out, widths=(10, 10, 5), chunk_size=2).render(
+                self.messages(5)
+            )
+
+        assert mock_flush.call_count == 3
+
+    def test_empty_stream(self):
+        """Test an empty stream prints the usual message."""
+        out = StringIO()
+
+        assert StreamingTableRenderer(out=out).render(iter([])) == 0
+        assert out.getvalue() == "No results found.\n"
+
 
 class TestDisplayResults:
     """Test cases for display_results function."""
@@ -109,3 +252,11 @@ class TestDisplayResults:
             assert "Subject 2" in output
             assert "sender1@example.com" in output
             assert "sender2@example.com" in output
+
+    def test_display_results_streams_iterators(self):
+        """Test a non-list iterable is rendered without buffering it."""
+        with patch("gmail_agent.display.StreamingTableRenderer") as MockRenderer:
+            stream = iter([])
+            display_results(stream)
+
+        MockRenderer.return_value.render.assert_called_once_with(stream)
@@ -3,8 +3,13 @@
 from unittest.mock import Mock, patch
 
 import pytest
+from googleapiclient.errors import HttpError
 
-from gmail_agent.gmail_client import GmailClient, EmailMessage
+from gmail_agent.cache import MessageCache
+from gmail_agent.coalesce import FetchCoalescer
+from gmail_agent.metrics import Metrics
+from gmail_agent.scheduler import RequestScheduler
+from gmail_agent.gmail_client import GmailClient, EmailMessage, EmailThread
 
 
 class TestGmailClient:
@@ -80,16 +85,19 @@ class TestGmailClient:
 
         mock_service.users().messages().list().execute.return_value = mock_list_response
 
-        mock_service.users().messages().get().execute.return_value = {
-            "id": "msg1",
-            "payload": {
-                "headers": [
-                    {"name": "From", "value": "sender@example.com"},
-                    {"name": "Subject", "value": "Test"},
-                    {"name": "Date", "value": "Mon, 1 Jan 2024 10:00:00 +0000"},
-                ]
-            },
-        }
+        def get(userId, id, **kwargs):
+            return Mock(execute=Mock(return_value={
+                "id": id,
+                "payload": {
+                    "headers": [
+                        {"name": "From", "value": "sender@example.com"},
+                        {"name": "Subject", "value": "Test"},
+                        {"name": "Date", "value": "Mon, 1 Jan 2024 10:00:00 +0000"},
+                    ]
+                },
+            }))
+
+        mock_service.users().messages().get.side_effect = get
 
         results = client.search_messages("is:unread", max_results=3)
 
@@ -104,24 +112,99 @@ class TestGmailClient:
         call_args = mock_service.users().messages().list.call_args
         assert call_args[1]["labelIds"] == ["INBOX"]
 
-    def test_get_header_value_returns_correct_value(self, client):
-        """Test helper method extracts correct header value."""
-        headers = [
-            {"name": "From", "value": "sender@example.com"},
-            {"name": "Subject", "value": "Test Subject"},
-            {"name": "Date", "value": "Mon, 1 Jan 2024 10:00:00 +0000"},
+    def test_search_messages_requests_only_needed_headers(self, client, mock_service):
+        """Test get asks for the displayed headers and trims both responses."""
+        mock_service.users().messages().list().execute.return_value = {
+            "messages": [{"id": "msg1"}]
+        }
+        mock_service.users().messages().get().execute.return_value = {
+            "id": "msg1",
+            "payload": {"headers": []},
+        }
+
+        client.search_messages("is:unread")
+
+        get_kwargs = mock_service.users().messages().get.call_args[1]
+        assert get_kwargs["metadataHeaders"] == ["Subject", "From", "Date"]
+        assert "payload/headers" in get_kwargs["fields"]
+        list_kwargs = mock_service.users().messages().list.call_args[1]
+        assert list_kwargs["fields"] == "messages/id,nextPageToken"
+
+    def test_search_messages_returns_configured_extra_headers(self, mock_service):
+        """Test extra headers are requested and exposed on each message."""
+        client = GmailClient(mock_service, extra_headers=["To", "List-Id", "Subject"])
+        mock_service.users().messages().list().execute.return_value = {
+            "messages": [{"id": "msg1"}]
+        }
+        mock_service.users().messages().get().execute.return_value = {
+            "id": "msg1",
+            "payload": {
+                "headers": [
+                    {"name": "Subject", "value": "Digest"},
+                    {"name": "to", "value": "me@example.com"},
+                ]
+            },
+        }
+
+        results = client.search_messages("is:unread")
+
+        get_kwargs = mock_service.users().messages().get.call_args[1]
+        assert get_kwargs["metadataHeaders"] == ["Subject", "From", "Date", "To", "List-Id"]
+        assert results[0].subject == "Digest"
+        assert results[0].sender == ""
+        assert results[0].extra_headers == {
+            "To": "me@example.com",
+            "List-Id": "",
+            "Subject": "Digest",
+        }
+
+    def test_messages_have_no_extra_headers_by_default(self, client):
+        """Test no per-message header mapping is built unless extra headers were requested."""
+        msg = client.to_email_message({"id": "msg1", "payload": {"headers": []}})
+
+        assert msg.extra_headers is None
+
+    def test_failed_get_keeps_the_other_results(self, mock_service):
+        """Test one failing call in serial mode no longer empties the result."""
+        mock_service.users().messages().list().execute.return_value = {
+            "messages": [{"id": "msg1"}, {"id": "msg2"}]
+        }
+        mock_service.users().messages().get().execute.side_effect = [
+            {"id": "msg1", "payload": {"headers": [{"name": "Subject", "value": "Kept"}]}},
+            HttpError(Mock(status=404), b"not found"),
         ]
+        client = GmailClient(mock_service, scheduler=RequestScheduler(units_per_second=None))
+
+        results = client.search_messages("is:unread")
+
+        assert [msg.subject for msg in results] == ["Kept"]
+
+    def test_search_keeps_pages_fetched_before_a_failure(self):
+        """Test a list call failing for good on page two keeps page one."""
+        service = TestGmailClientPagination.make_paged_service(700)
+        list_ = service.users().messages().list.side_effect
+
+        def failing_list(**kwargs):
+            if kwargs.get("pageToken"):
+                raise HttpError(Mock(status=400), b"bad request")
+            return list_(**kwargs)
+
+        service.users().messages().list.side_effect = failing_list
+        client = GmailClient(service, scheduler=RequestScheduler(units_per_second=None))
 
-        assert client._get_header_value(headers, "From") == "sender@example.com"
-        assert client._get_header_value(headers, "Subject") == "Test Subject"
-        assert client._get_header_value(headers, "Date") == "Mon, 1 Jan 2024 10:00:00 +0000"
+        results = client.search_messages("is:unread", max_results=600)
 
-    def test_get_header_value_returns_empty_string_if_not_found(self, client):
-        """Test helper method returns empty string for missing headers."""
-        headers = [{"name": "From", "value": "sender@example.com"}]
+        assert len(results) == 500
 
-        assert client._get_header_value(headers, "Subject") == ""
-        assert client._get_header_value(headers, "NonExistent") == ""
+    def test_headers_to_dict_keeps_first_occurrence(self, client):
+        """Test header indexing is case-insensitive and keeps the first value."""
+        headers = [
+            {"name": "Received", "value": "first"},
+            {"name": "received", "value": "second"},
+            {"name": "Subject", "value": "Hello"},
+        ]
+
+        assert client._headers_to_dict(headers) == {"received": "first", "subject": "Hello"}
 
 
 class TestEmailMessage:
@@ -147,3 +230,526 @@ class TestEmailMessage:
 
         assert msg1 == msg2
         assert msg1 != msg3
+
+    def test_email_message_has_no_instance_dict(self):
+        """Test messages are slotted."""
+        assert not hasattr(EmailMessage("Subject", "sender", "Date"), "__dict__")
+
+    def test_timestamp_is_parsed_from_date_header(self):
+        """Test the Date header is parsed once into a UTC epoch timestamp."""
+        msg = EmailMessage("Subject", "sender", "Mon, 1 Jan 2024 10:00:00 +0200")
+
+        assert msg.timestamp == 1704096000.0
+
+    def test_naive_dates_are_treated_as_utc(self):
+        """Test dates without a zone are read as UTC."""
+        naive = EmailMessage("a", "s", "Mon, 1 Jan 2024 10:00:00 -0000")
+        zoned = EmailMessage("b", "s", "Mon, 1 Jan 2024 09:00:00 +0000")
+
+        assert naive.timestamp - zoned.timestamp == 3600
+
+    def test_invalid_date_has_no_timestamp(self):
+        """Test an unparseable Date header leaves the timestamp unset."""
+        assert EmailMessage("Subject", "sender", "not a date").timestamp is None
+
+    def test_to_email_message_reads_ids_labels_and_internal_date(self):
+        """Test API metadata fills the ID, thread, labels and timestamp."""
+        client = GmailClient(Mock())
+        msg = client.to_email_message({
+            "id": "m1",
+            "threadId": "t1",
+            "labelIds": ["INBOX", "UNREAD"],
+            "internalDate": "1704103200000",
+            "payload": {"headers": [{"name": "Date", "value": "garbage"}]},
+        })
+
+        assert (msg.message_id, msg.thread_id, msg.label_ids) == ("m1", "t1", ("INBOX", "UNREAD"))
+        assert msg.timestamp == 1704103200.0
+
+
+class FakeBatch:
+    """Stand-in for googleapiclient's BatchHttpRequest."""
+
+    def __init__(self, callback, responses, errors, missing=()):
+        self.callback = callback
+        self.responses = responses
+        self.errors = errors
+        self.missing = missing
+        self.request_ids = []
+
+    def add(self, request, request_id=None):
+        self.request_ids.append(request_id)
+
+    def execute(self):
+        for request_id in self.request_ids:
+            if request_id in self.missing:
+                self.callback(request_id, None, HttpError(Mock(status=404), b"not found"))
+            elif self.errors.get(request_id):
+                self.errors[request_id] -= 1
+                self.callback(request_id, None, Exception("quota exceeded"))
+            else:
+                self.callback(request_id, self.responses[request_id], None)
+
+
+class TestGmailClientBatchFetch:
+    """Test cases for the batched metadata fetch path."""
+
+    @staticmethod
+    def make_message(message_id):
+        return {
+            "id": message_id,
+            "payload": {
+                "headers": [
+                    {"name": "From", "value": f"{message_id}@example.com"},
+                    {"name": "Subject", "value": f"Subject {message_id}"},
+                    {"name": "Date", "value": "Mon, 1 Jan 2024 10:00:00 +0000"},
+                ]
+            },
+        }
+
+    @pytest.fixture
+    def mock_service(self):
+        """Create a mock Gmail service whose batches are served by FakeBatch."""
+        service = Mock()
+        service.batches = []
+        service.errors = {}
+        service.responses = {}
+        service.missing = set()
+
+        def new_batch_http_request(callback):
+            batch = FakeBatch(callback, service.responses, service.errors, service.missing)
+            service.batches.append(batch)
+            return batch
+
+        service.new_batch_http_request.side_effect = new_batch_http_request
+        return service
+
+    def set_mailbox(self, service, message_ids):
+        service.responses.update({mid: self.make_message(mid) for mid in message_ids})
+        service.users().messages().list().execute.return_value = {
+            "messages": [{"id": mid} for mid in message_ids]
+        }
+
+    def test_invalid_fetch_mode_raises(self, mock_service):
+        """Test unknown fetch modes are rejected."""
+        with pytest.raises(ValueError, match="fetch_mode"):
+            GmailClient(mock_service, fetch_mode="telepathy")
+
+    def test_invalid_batch_size_raises(self, mock_service):
+        """Test batch sizes above the Gmail limit are rejected."""
+        with pytest.raises(ValueError, match="batch_size"):
+            GmailClient(mock_service, fetch_mode="batch", batch_size=101)
+
+    def test_batch_fetch_chunks_requests(self, mock_service):
+        """Test get calls are split into batches of at most batch_size."""
+        ids = [f"msg{i}" for i in range(7)]
+        self.set_mailbox(mock_service, ids)
+        client = GmailClient(mock_service, fetch_mode="batch", batch_size=3)
+
+        results = client.search_messages("is:unread")
+
+        assert [len(batch.request_ids) for batch in mock_service.batches] == [3, 3, 1]
+        assert [msg.subject for msg in results] == [f"Subject {mid}" for mid in ids]
+        mock_service.users().messages().get().execute.assert_not_called()
+
+    def test_batch_fetch_retries_failed_items_once(self, mock_service):
+        """Test items that fail inside a batch are retried and keep list order."""
+        ids = ["msg0", "msg1", "msg2"]
+        self.set_mailbox(mock_service, ids)
+        mock_service.errors["msg1"] = 1
+        client = GmailClient(mock_service, fetch_mode="batch", backoff_base=0)
+
+        results = client.search_messages("is:unread")
+
+        assert [batch.request_ids for batch in mock_service.batches] == [ids, ["msg1"]]
+        assert [msg.sender for msg in results] == [f"{mid}@example.com" for mid in ids]
+
+    def test_batch_fetch_drops_items_that_keep_failing(self, mock_service):
+        """Test a persistently failing item does not discard the other results."""
+        ids = ["msg0", "msg1", "msg2"]
+        self.set_mailbox(mock_service, ids)
+        mock_service.errors["msg0"] = 5
+        client = GmailClient(mock_service, fetch_mode="batch", backoff_base=0)
+
+        results = client.search_messages("is:unread")
+
+        assert [msg.subject for msg in results] == ["Subject msg1", "Subject msg2"]
+        assert len(mock_service.batches) == 5
+
+    def test_batch_fetch_does_not_retry_permanent_failures(self, mock_service):
+        """Test a message that no longer exists is dropped without another batch."""
+        ids = ["msg0", "msg1"]
+        self.set_mailbox(mock_service, ids)
+        mock_service.missing.add("msg0")
+        client = GmailClient(mock_service, fetch_mode="batch", backoff_base=0)
+
+        results = client.search_messages("is:unread")
+
+        assert [msg.subject for msg in results] == ["Subject msg1"]
+        assert len(mock_service.batches) == 1
+
+
+class TestGmailClientConcurrentFetch:
+    """Test cases for the concurrent metadata fetch path."""
+
+    @staticmethod
+    def make_worker_service(delays=None, failures=None):
+        """Create a worker service whose get() returns messages keyed by ID."""
+        service = Mock()
+        failures = failures if failures is not None else {}
+
+        def get(userId, id, format, **kwargs):
+            request = Mock()
+
+            def execute():
+                if failures.get(id):
+                    failures[id] -= 1
+                    raise HttpError(Mock(status=429), b"rate limited")
+                return TestGmailClientBatchFetch.make_message(id)
+
+            request.execute.side_effect = execute
+            return request
+
+        service.users().messages().get.side_effect = get
+        return service
+
+    @pytest.fixture
+    def list_service(self):
+        """Create the service used for the list call."""
+        service = Mock()
+        service.users().messages().list().execute.return_value = {
+            "messages": [{"id": f"msg{i}"} for i in range(20)]
+        }
+        return service
+
+    def test_concurrent_mode_requires_service_factory(self, list_service):
+        """Test concurrent mode refuses to share the main service across threads."""
+        with pytest.raises(ValueError, match="service_factory"):
+            GmailClient(list_service, fetch_mode="concurrent")
+
+    def test_concurrent_fetch_preserves_list_order(self, list_service):
+        """Test results come back in the order of the list response."""
+        client = GmailClient(
+            list_service,
+            fetch_mode="concurrent",
+            max_workers=4,
+            service_factory=self.make_worker_service,
+        )
+
+        results = client.search_messages("is:unread")
+        client.close()
+
+        assert [msg.subject for msg in results] == [f"Subject msg{i}" for i in range(20)]
+        list_service.users().messages().get.assert_not_called()
+
+    def test_concurrent_fetch_builds_one_service_per_worker(self, list_service):
+        """Test each worker thread builds and reuses its own service object."""
+        factory = Mock(side_effect=self.make_worker_service)
+        client = GmailClient(
+            list_service, fetch_mode="concurrent", max_workers=3, service_factory=factory
+        )
+
+        client.search_messages("is:unread")
+        client.search_messages("is:unread")
+        client.close()
+
+        assert 1 <= factory.call_count <= 3
+
+    def test_concurrent_fetch_retries_rate_limited_calls(self, list_service):
+        """Test 429 responses are retried with backoff instead of dropped."""
+        failures = {"msg3": 2, "msg7": 1}
+        client = GmailClient(
+            list_service,
+            fetch_mode="concurrent",
+            service_factory=lambda: self.make_worker_service(failures=failures),
+            backoff_base=0,
+        )
+
+        results = client.search_messages("is:unread")
+        client.close()
+
+        assert len(results) == 20
+        assert failures == {"msg3": 0, "msg7": 0}
+
+    def test_concurrent_fetch_drops_messages_after_retries_exhausted(self, list_service):
+        """Test a message that keeps failing is skipped without losing the others."""
+        failures = {"msg5": 10}
+        client = GmailClient(
+            list_service,
+            fetch_mode="concurrent",
+            service_factory=lambda: self.make_worker_service(failures=failures),
+            max_retries=2,
+            backoff_base=0,
+        )
+
+        results = client.search_messages("is:unread")
+        client.close()
+
+        assert len(results) == 19
+        assert "Subject msg5" not in [msg.subject for msg in results]
+
+
+class TestGmailClientPagination:
+    """Test cases for paginated, streaming search."""
+
+    @staticmethod
+    def unthrottled():
+        """A scheduler without the quota limit, so large fake mailboxes page at full speed."""
+        return RequestScheduler(units_per_second=None)
+
+    @staticmethod
+    def make_paged_service(total, page_tokens=True):
+        """Create a service whose list() pages through ``total`` message IDs."""
+        service = Mock()
+        ids = [f"msg{i}" for i in range(total)]
+
+        def list_(userId, q, labelIds, maxResults, pageToken=None, **kwargs):
+            start = int(pageToken or 0)
+            end = start + maxResults
+            page = {"messages": [{"id": mid} for mid in ids[start:end]]}
+            if end < total and page_tokens:
+                page["nextPageToken"] = str(end)
+            request = Mock()
+            request.execute.return_value = page
+            return request
+
+        def get(userId, id, format, **kwargs):
+            request = Mock()
+            request.execute.return_value = TestGmailClientBatchFetch.make_message(id)
+            return request
+
+        service.users().messages().list.side_effect = list_
+        service.users().messages().get.side_effect = get
+        return service
+
+    def test_iter_messages_follows_next_page_token(self):
+        """Test all pages are walked when max_results is not given."""
+        service = self.make_paged_service(250)
+        client = GmailClient(service, scheduler=self.unthrottled())
+
+        results = list(client.iter_messages("is:unread", page_size=100))
+
+        assert len(results) == 250
+        assert results[-1].subject == "Subject msg249"
+        assert service.users().messages().list.call_count == 3
+
+    def test_iter_messages_stops_at_max_results(self):
+        """Test paging stops once max_results messages have been yielded."""
+        service = self.make_paged_service(1000)
+        client = GmailClient(service, scheduler=self.unthrottled())
+
+        results = list(client.iter_messages("is:unread", max_results=150, page_size=100))
+
+        assert len(results) == 150
+        last_call = service.users().messages().list.call_args_list[-1]
+        assert last_call[1]["maxResults"] == 50
+        assert service.users().messages().list.call_count == 2
+
+    def test_iter_messages_is_lazy(self):
+        """Test later pages are not listed until the consumer reaches them."""
+        service = self.make_paged_service(1000)
+        client = GmailClient(service, scheduler=self.unthrottled())
+
+        stream = client.iter_messages("is:unread", page_size=10)
+        first = next(stream)
+        stream.close()
+
+        assert first.subject == "Subject msg0"
+        assert service.users().messages().list.call_count == 1
+
+    def test_iter_messages_prefetches_with_dedicated_service(self):
+        """Test the next page is listed on a separate service from the factory."""
+        service = self.make_paged_service(30)
+        prefetch_service = self.make_paged_service(30)
+        client = GmailClient(service, service_factory=lambda: prefetch_service)
+
+        results = list(client.iter_messages("is:unread", page_size=10))
+
+        assert len(results) == 30
+        assert service.users().messages().list.call_count == 1
+        assert prefetch_service.users().messages().list.call_count == 2
+        prefetch_service.users().messages().get.assert_not_called()
+
+    def test_iter_messages_rejects_oversized_pages(self):
+        """Test page sizes above the Gmail list limit are rejected."""
+        client = GmailClient(Mock())
+
+        with pytest.raises(ValueError, match="page_size"):
+            list(client.iter_messages("is:unread", page_size=501))
+
+    def test_search_messages_spans_pages_for_large_max_results(self):
+        """Test search_messages is no longer capped at a single list page."""
+        service = self.make_paged_service(1200)
+        client = GmailClient(service, scheduler=self.unthrottled())
+
+        results = client.search_messages("is:unread", max_results=700)
+
+        assert len(results) == 700
+        assert service.users().messages().list.call_count == 2
+
+
+class TestGmailClientThreads:
+    """Test cases for thread-level search."""
+
+    @staticmethod
+    def make_thread(thread_id, senders):
+        messages = []
+        for i, sender in enumerate(senders):
+            messages.append({
+                "id": f"{thread_id}-{i}",
+                "threadId": thread_id,
+                "labelIds": ["INBOX"] if i else ["INBOX", "UNREAD"],
+                "internalDate": str(1704103200000 + i * 60000),
+                "payload": {
+                    "headers": [
+                        {"name": "From", "value": sender},
+                        {"name": "Subject", "value": f"{'Re: ' if i else ''}Topic {thread_id}"},
+                        {"name": "Date", "value": f"Mon, 1 Jan 2024 10:0{i}:00 +0000"},
+                    ]
+                },
+            })
+        return {"id": thread_id, "messages": messages}
+
+    @pytest.fixture
+    def service(self):
+        """Create a service listing two threads, one of them a long conversation."""
+        service = Mock()
+        threads = {
+            "t1": self.make_thread("t1", ["a@example.com", "b@example.com", "a@example.com"]),
+            "t2": self.make_thread("t2", ["c@example.com"]),
+        }
+        service.users().threads().list().execute.return_value = {
+            "threads": [{"id": "t1"}, {"id": "t2"}]
+        }
+
+        def get(userId, id, format, **kwargs):
+            request = Mock()
+            request.execute.return_value = threads[id]
+            return request
+
+        service.users().threads().get.side_effect = get
+        return service
+
+    def test_search_threads_returns_one_row_per_thread(self, service):
+        """Test messages are collapsed into one record per conversation."""
+        results = GmailClient(service).search_threads("is:unread")
+
+        assert [thread.thread_id for thread in results] == ["t1", "t2"]
+        first = results[0]
+        assert first.subject == "Topic t1"
+        assert first.message_count == 3
+        assert first.participants == ("a@example.com", "b@example.com")
+        assert first.date == "Mon, 1 Jan 2024 10:02:00 +0000"
+        assert first.timestamp == 1704103320.0
+        assert first.label_ids == ("INBOX", "UNREAD")
+
+    def test_search_threads_uses_thread_calls_only(self, service):
+        """Test one threads.get per thread and no messages.get at all."""
+        GmailClient(service).search_threads("is:unread", max_results=5)
+
+        list_kwargs = service.users().threads().list.call_args[1]
+        assert list_kwargs["labelIds"] == ["INBOX"]
+        assert list_kwargs["maxResults"] == 5
+        assert service.users().threads().get.call_count == 2
+        get_kwargs = service.users().threads().get.call_args[1]
+        assert get_kwargs["format"] == "metadata"
+        service.users().messages().get.assert_not_called()
+
+    def test_search_threads_batches_thread_requests(self, service):
+        """Test batch mode sends the threads.get calls in one batch request."""
+        added = []
+        batch = Mock()
+        batch.add.side_effect = lambda request, request_id: added.append(request_id)
+        service.new_batch_http_request.return_value = batch
+
+        GmailClient(service, fetch_mode="batch").search_threads("is:unread")
+
+        assert added == ["t1", "t2"]
+        batch.execute.assert_called_once()
+
+    def test_empty_thread(self):
+        """Test a thread without messages becomes an empty record."""
+        thread = GmailClient(Mock()).to_email_thread({"id": "t1"})
+
+        assert thread == EmailThread(thread_id="t1", subject="", sender="", date="")
+
+
+class TestGmailClientCache:
+    """Test cases for GmailClient with a metadata cache."""
+
+    def test_only_uncached_messages_are_fetched(self, tmp_path):
+        """Test a repeated search only calls get for IDs it has not seen."""
+        service = TestGmailClientPagination.make_paged_service(5)
+        cache = MessageCache(str(tmp_path / "cache.db"))
+        client = GmailClient(service, cache=cache)
+
+        first = client.search_messages("is:unread", max_results=3)
+        second = client.search_messages("is:unread", max_results=5)
+        cache.close()
+
+        assert [msg.subject for msg in first] == [f"Subject msg{i}" for i in range(3)]
+        assert [msg.subject for msg in second] == [f"Subject msg{i}" for i in range(5)]
+        fetched = [c[1]["id"] for c in service.users().messages().get.call_args_list]
+        assert fetched == ["msg0", "msg1", "msg2", "msg3", "msg4"]
+
+
+class TestGmailClientMetrics:
+    """Test cases for GmailClient instrumentation."""
+
+    def test_search_records_stages_calls_and_bytes(self):
+        """Test a search counts list and get responses and times both stages."""
+        service = TestGmailClientPagination.make_paged_service(5)
+        metrics = Metrics()
+        client = GmailClient(service, metrics=metrics)
+
+        client.search_messages("is:unread", max_results=3)
+
+        data = metrics.as_dict()
+        assert data["counters"]["api.messages.list"] == 1
+        assert data["counters"]["api.messages.get"] == 3
+        assert data["counters"]["bytes_received"] > 0
+        assert {"list", "fetch"} <= set(data["stages"])
+
+    def test_cache_hits_and_misses_are_counted(self, tmp_path):
+        """Test cache lookups are split into hits and misses."""
+        service = TestGmailClientPagination.make_paged_service(5)
+        cache = MessageCache(str(tmp_path / "cache.db"))
+        metrics = Metrics()
+        client = GmailClient(service, cache=cache, metrics=metrics, coalescer=FetchCoalescer(ttl=0))
+
+        client.search_messages("is:unread", max_results=3)
+        client.search_messages("is:unread", max_results=5)
+        cache.close()
+
+        counters = metrics.as_dict()["counters"]
+        assert counters["cache.hits"] == 3
+        assert counters["cache.misses"] == 5
+        assert counters["api.messages.get"] == 5
+
+    def test_overlapping_searches_fetch_each_message_once(self):
+        """Test messages another search just fetched are reused from the coalescer."""
+        service = TestGmailClientPagination.make_paged_service(5)
+        metrics = Metrics()
+        client = GmailClient(service, metrics=metrics)
+
+        client.search_messages("is:unread", max_results=3)
+        results = client.search_messages("is:starred", max_results=5)
+
+        counters = metrics.as_dict()["counters"]
+        assert len(results) == 5
+        assert counters["api.messages.get"] == 5
+        assert counters["coalesce.memo_hits"] == 3
+
+    def test_retries_are_counted(self):
+        """Test backoff retries of rate-limited calls are counted."""
+        metrics = Metrics()
+        client = GmailClient(Mock(), backoff_base=0, metrics=metrics)
+        request = Mock()
+        request.execute.side_effect = [
+            HttpError(Mock(status=429), b"rate limited"),
+            {"id": "msg1"},
+        ]
+
+        client.scheduler.execute(request)
+
+        assert metrics.as_dict()["counters"]["retries"] == 1
@@ -0,0 +1,177 @@
+"""Tests for local query evaluation module."""
+
+import pytest
+
+from gmail_agent.local_query import (
+    And,
+    LocalIndex,
+    LocalQueryEngine,
+    Not,
+    Or,
+    Term,
+    UnsupportedQuery,
+    parse_query,
+)
+
+DAY_MS = 86_400_000
+NOW_MS = 1_704_067_200_000  # 2024-01-01T00:00:00Z
+
+
+def make_response(message_id, sender, subject, days_ago, labels=("INBOX",), to="me@example.com"):
+    """Build a mirrored messages.get response."""
+    return {
+        "id": message_id,
+        "labelIds": list(labels),
+        "internalDate": str(NOW_MS - days_ago * DAY_MS),
+        "payload": {
+            "headers": [
+                {"name": "From", "value": sender},
+                {"name": "Subject", "value": subject},
+                {"name": "To", "value": to},
+            ]
+        },
+    }
+
+
+RESPONSES = [
+    make_response("g1", "Google <no-reply@accounts.google.com>", "Security alert", 1,
+                  labels=("INBOX", "UNREAD")),
+    make_response("a1", "Amazon <shipment@amazon.com>", "Your invoice is ready", 3),
+    make_response("a2", "support@amazon.com", "Invoice reminder", 20,
+                  labels=("INBOX", "STARRED", "UNREAD")),
+    make_response("b1", "Bob Smith <bob@example.org>", "Lunch?", 45, to="team@example.org"),
+]
+
+
+class TestParseQuery:
+    """Test cases for parse_query function."""
+
+    def test_implicit_and(self):
+        """Test space-separated terms are ANDed."""
+        assert parse_query("from:google.com is:unread") == And(
+            (Term("from", "google.com"), Term("is", "unread"))
+        )
+
+    def test_or_negation_and_groups(self):
+        """Test OR, negation and parentheses."""
+        assert parse_query("(from:a OR from:b) -is:read") == And(
+            (Or((Term("from", "a"), Term("from", "b"))), Not(Term("is", "read")))
+        )
+
+    def test_quoted_value(self):
+        """Test quoted values keep their spaces."""
+        assert parse_query('subject:"weekly report"') == Term("subject", "weekly report")
+
+    @pytest.mark.parametrize("query", ["invoice", "label:work", "(from:a", "from:a OR"])
+    def test_unsupported_syntax_raises(self, query):
+        """Test free text, unknown operators and malformed queries are rejected."""
+        with pytest.raises(UnsupportedQuery):
+            parse_query(query)
+
+
+class TestLocalIndex:
+    """Test cases for LocalIndex class."""
+
+    @pytest.fixture
+    def index(self):
+        return LocalIndex(RESPONSES, headers=("Subject", "From", "Date", "To"))
+
+    def search(self, index, query):
+        node = parse_query(query)
+        index.check(node)
+        return index.evaluate(node, NOW_MS)
+
+    @pytest.mark.parametrize(
+        "query, expected",
+        [
+            ("from:google.com", {"g1"}),
+            ("from:amazon.com", {"a1", "a2"}),
+            ("from:support@amazon.com", {"a2"}),
+            ("from:amazon", {"a1", "a2"}),
+            ('from:"bob smith"', {"b1"}),
+            ("to:team@example.org", {"b1"}),
+            ("subject:invoice", {"a1", "a2"}),
+            ('subject:"invoice reminder"', {"a2"}),
+            ("is:unread", {"g1", "a2"}),
+            ("is:read", {"a1", "b1"}),
+            ("is:starred", {"a2"}),
+            ("newer_than:7d", {"g1", "a1"}),
+            ("older_than:1m", {"b1"}),
+            ("after:2023/12/25", {"g1", "a1"}),
+            ("before:2023/12/25", {"a2", "b1"}),
+            ("from:amazon.com is:unread", {"a2"}),
+            ("from:google.com OR subject:lunch", {"g1", "b1"}),
+            ("from:amazon.com -subject:reminder", {"a1"}),
+        ],
+    )
+    def test_queries(self, index, query, expected):
+        """Test supported operators match the expected messages."""
+        assert self.search(index, query) == expected
+
+    def test_attachment_queries_are_unsupported(self, index):
+        """Test has:attachment falls back because metadata cannot answer it."""
+        with pytest.raises(UnsupportedQuery):
+            index.check(parse_query("has:attachment"))
+
+    def test_to_requires_indexed_header(self):
+        """Test to: is unsupported when the To header was not stored."""
+        index = LocalIndex(RESPONSES)
+        with pytest.raises(UnsupportedQuery):
+            index.check(parse_query("to:me@example.com"))
+
+
+class FakeMirror:
+    """In-memory stand-in for MailboxMirror."""
+
+    def __init__(self, responses, synced_at=0.0, history_id="1"):
+        self.responses = responses
+        self.synced_at = synced_at
+        self.history_id = history_id
+        self.header_set = ("Subject", "From", "Date", "To")
+        self.pending_ids = ()
+        self.iterations = 0
+
+    def iter_responses(self):
+        self.iterations += 1
+        return iter(self.responses)
+
+
+class TestLocalQueryEngine:
+    """Test cases for LocalQueryEngine class."""
+
+    def test_search_returns_newest_first_with_limit(self):
+        """Test results are ordered by date and capped at max_results."""
+        engine = LocalQueryEngine(FakeMirror(RESPONSES), clock=lambda: NOW_MS / 1000)
+
+        results = engine.search("from:amazon.com OR from:google.com", max_results=2)
+
+        assert [r["id"] for r in results] == ["g1", "a1"]
+
+    def test_freshness_uses_last_sync_time(self):
+        """Test the engine only reports fresh within max_age of the last sync."""
+        mirror = FakeMirror(RESPONSES, synced_at=1000.0)
+
+        assert LocalQueryEngine(mirror, max_age=60, clock=lambda: 1030.0).is_fresh()
+        assert not LocalQueryEngine(mirror, max_age=60, clock=lambda: 1100.0).is_fresh()
+        mirror.synced_at = None
+        assert not LocalQueryEngine(mirror, clock=lambda: 1000.0).is_fresh()
+
+    def test_mirror_with_pending_messages_is_not_fresh(self):
+        """Test a mirror missing messages it failed to fetch never answers queries."""
+        mirror = FakeMirror(RESPONSES, synced_at=1000.0)
+        mirror.pending_ids = ("m9",)
+
+        assert not LocalQueryEngine(mirror, max_age=60, clock=lambda: 1000.0).is_fresh()
+
+    def test_index_rebuilt_only_when_history_changes(self):
+        """Test the index is cached until the mirror's history ID moves."""
+        mirror = FakeMirror(RESPONSES)
+        engine = LocalQueryEngine(mirror, clock=lambda: NOW_MS / 1000)
+
+        engine.search("is:unread")
+        engine.search("is:starred")
+        assert mirror.iterations == 1
+
+        mirror.history_id = "2"
+        engine.search("is:unread")
+        assert mirror.iterations == 2
@@ -1,12 +1,24 @@
 """Tests for main orchestration module."""
 
+import json
+import subprocess
 import sys
 from io import StringIO
 from unittest.mock import Mock, patch
 
 import pytest
 
-from gmail_agent.main import get_user_query, run_agent
+from gmail_agent.batch import BatchQuery
+from gmail_agent.gmail_client import EmailMessage
+from gmail_agent.main import (
+    _build_client,
+    get_user_query,
+    main,
+    run_agent,
+    run_batch_agent,
+    run_multi_account_agent,
+)
+from gmail_agent.nlp_parser import Translation
 
 
 class TestGetUserQuery:
@@ -58,10 +70,10 @@ class TestRunAgent:
         mock_components["parser"].parse.return_value = gmail_query
         mock_components["client"].search_messages.return_value = []
 
-        with patch("gmail_agent.main.get_gmail_service") as mock_get_service:
-            with patch("gmail_agent.main.GmailQueryParser") as MockParser:
-                with patch("gmail_agent.main.GmailClient") as MockClient:
-                    with patch("gmail_agent.main.display_results") as mock_display:
+        with patch("gmail_agent.auth.get_gmail_service") as mock_get_service:
+            with patch("gmail_agent.nlp_parser.GmailQueryParser") as MockParser:
+                with patch("gmail_agent.gmail_client.GmailClient") as MockClient:
+                    with patch("gmail_agent.display.display_results") as mock_display:
                         mock_get_service.return_value = mock_components["service"]
                         MockParser.return_value = mock_components["parser"]
                         MockClient.return_value = mock_components["client"]
@@ -76,10 +88,10 @@ class TestRunAgent:
 
     def test_run_agent_creates_gmail_service(self, mock_components):
         """Test agent creates Gmail service with correct parameters."""
-        with patch("gmail_agent.main.get_gmail_service") as mock_get_service:
-            with patch("gmail_agent.main.GmailQueryParser"):
-                with patch("gmail_agent.main.GmailClient"):
-                    with patch("gmail_agent.main.display_results"):
+        with patch("gmail_agent.auth.get_gmail_service") as mock_get_service:
+            with patch("gmail_agent.nlp_parser.GmailQueryParser"):
+                with patch("gmail_agent.gmail_client.GmailClient"):
+                    with patch("gmail_agent.display.display_results"):
                         mock_get_service.return_value = mock_components["service"]
 
                         run_agent("test query")
@@ -98,10 +110,10 @@ class TestRunAgent:
         mock_components["parser"].parse.return_value = "is:unread"
         mock_components["client"].search_messages.return_value = test_messages
 
-        with patch("gmail_agent.main.get_gmail_service") as mock_get_service:
-            with patch("gmail_agent.main.GmailQueryParser") as MockParser:
-                with patch("gmail_agent.main.GmailClient") as MockClient:
-                    with patch("gmail_agent.main.display_results") as mock_display:
+        with patch("gmail_agent.auth.get_gmail_service") as mock_get_service:
+            with patch("gmail_agent.nlp_parser.GmailQueryParser") as MockParser:
+                with patch("gmail_agent.gmail_client.GmailClient") as MockClient:
+                    with patch("gmail_agent.display.display_results") as mock_display:
                         mock_get_service.return_value = mock_components["service"]
                         MockParser.return_value = mock_components["parser"]
                         MockClient.return_value = mock_components["client"]
@@ -112,13 +124,320 @@ class TestRunAgent:
 
     def test_run_agent_with_custom_token_file(self, mock_components):
         """Test agent accepts custom token file path."""
-        with patch("gmail_agent.main.get_gmail_service") as mock_get_service:
-            with patch("gmail_agent.main.GmailQueryParser"):
-                with patch("gmail_agent.main.GmailClient"):
-                    with patch("gmail_agent.main.display_results"):
+        with patch("gmail_agent.auth.get_gmail_service") as mock_get_service:
+            with patch("gmail_agent.nlp_parser.GmailQueryParser"):
+                with patch("gmail_agent.gmail_client.GmailClient"):
+                    with patch("gmail_agent.display.display_results"):
                         mock_get_service.return_value = mock_components["service"]
 
                         run_agent("test query", token_file="custom_token.enc")
 
                         call_args = mock_get_service.call_args
                         assert call_args[1]["token_file"] == "custom_token.enc"
+
+    def test_run_agent_streams_results_to_display(self, mock_components):
+        """Test stream mode hands the paginated iterator straight to display."""
+        stream = iter([])
+        mock_components["parser"].parse.return_value = "is:unread"
+        mock_components["client"].iter_messages.return_value = stream
+
+        with patch("gmail_agent.auth.get_gmail_service"):
+            with patch("gmail_agent.nlp_parser.GmailQueryParser") as MockParser:
+                with patch("gmail_agent.gmail_client.GmailClient") as MockClient:
+                    with patch("gmail_agent.display.display_results") as mock_display:
+                        MockParser.return_value = mock_components["parser"]
+                        MockClient.return_value = mock_components["client"]
+
+                        run_agent("test query", max_results=5000, stream=True)
+
+                        mock_components["client"].iter_messages.assert_called_once_with(
+                            "is:unread", max_results=5000
+                        )
+                        mock_components["client"].search_messages.assert_not_called()
+                        mock_display.assert_called_once_with(stream)
+
+    def test_run_agent_writes_machine_readable_output(self, mock_components):
+        """Test non-table formats stream to the writer and keep stdout clean."""
+        stream = iter([])
+        mock_components["parser"].parse.return_value = "is:unread"
+        mock_components["client"].iter_messages.return_value = stream
+
+        with patch("gmail_agent.auth.get_gmail_service"):
+            with patch("gmail_agent.nlp_parser.GmailQueryParser") as MockParser:
+                with patch("gmail_agent.gmail_client.GmailClient") as MockClient:
+                    with patch("gmail_agent.main.write_messages") as mock_write:
+                        with patch("sys.stdout", new=StringIO()) as fake_out:
+                            MockParser.return_value = mock_components["parser"]
+                            MockClient.return_value = mock_components["client"]
+
+                            run_agent("test query", output_format="jsonl", output_file="out.jsonl")
+
+        mock_write.assert_called_once_with(stream, "jsonl", "out.jsonl")
+        assert fake_out.getvalue() == ""
+
+    def test_run_agent_shows_threads(self, mock_components):
+        """Test thread mode searches conversations and shows them one row each."""
+        threads = [Mock()]
+        mock_components["parser"].parse.return_value = "is:unread"
+        mock_components["client"].search_threads.return_value = threads
+
+        with patch("gmail_agent.auth.get_gmail_service"):
+            with patch("gmail_agent.nlp_parser.GmailQueryParser") as MockParser:
+                with patch("gmail_agent.gmail_client.GmailClient") as MockClient:
+                    with patch("gmail_agent.display.display_threads") as mock_display:
+                        MockParser.return_value = mock_components["parser"]
+                        MockClient.return_value = mock_components["client"]
+
+                        run_agent("test query", max_results=20, threads=True)
+
+        mock_components["client"].search_threads.assert_called_once_with("is:unread", max_results=20)
+        mock_components["client"].search_messages.assert_not_called()
+        mock_display.assert_called_once_with(threads)
+
+    def test_run_agent_syncs_mirror_before_searching(self, mock_components, tmp_path):
+        """Test a mirror file is synced and handed to the client."""
+        with patch("gmail_agent.auth.get_gmail_service"):
+            with patch("gmail_agent.nlp_parser.GmailQueryParser"):
+                with patch("gmail_agent.gmail_client.GmailClient") as MockClient:
+                    with patch("gmail_agent.sync.MailboxSync") as MockSync:
+                        with patch("gmail_agent.display.display_results"):
+                            run_agent("test query", mirror_file=str(tmp_path / "mirror.db"))
+
+                            MockSync.return_value.sync.assert_called_once()
+                            assert MockClient.call_args[1]["mirror"] is not None
+
+    @pytest.mark.parametrize("fetch_mode", ["serial", "batch", "concurrent"])
+    def test_client_gets_a_service_factory_in_every_fetch_mode(self, fetch_mode):
+        """Test the page prefetcher has a service of its own whatever the fetch mode."""
+        with patch("gmail_agent.gmail_client.gmail_service_factory") as mock_factory:
+            with patch("gmail_agent.gmail_client.GmailClient") as MockClient:
+                _build_client(Mock(), "token.enc", fetch_mode, 8, None, None, None, Mock())
+
+        mock_factory.assert_called_once_with(token_file="token.enc")
+        assert MockClient.call_args[1]["service_factory"] is mock_factory.return_value
+
+
+class TestRunMultiAccountAgent:
+    """Test cases for run_multi_account_agent function."""
+
+    def test_query_is_translated_once_for_all_accounts(self):
+        """Test Gemini is asked once and the pool searches every account."""
+        with patch("gmail_agent.accounts.AccountRegistry") as MockRegistry:
+            with patch("gmail_agent.accounts.AccountPool") as MockPool:
+                with patch("gmail_agent.nlp_parser.GmailQueryParser") as MockParser:
+                    MockRegistry.return_value.names.return_value = ["work", "home"]
+                    MockParser.return_value.parse.return_value = "is:unread"
+                    MockPool.return_value.search_all.return_value = Mock(messages=[], errors={})
+
+                    with patch("sys.stdout", new=StringIO()) as fake_out:
+                        run_multi_account_agent("unread emails", accounts_dir="accounts")
+
+        MockParser.return_value.parse.assert_called_once_with("unread emails")
+        MockPool.return_value.search_all.assert_called_once_with(
+            "is:unread", max_results=50, accounts=None
+        )
+        MockPool.return_value.close.assert_called_once()
+        assert "No results found." in fake_out.getvalue()
+
+    def test_no_accounts_registered(self, tmp_path):
+        """Test an empty registry explains how to add an account."""
+        with patch("gmail_agent.nlp_parser.GmailQueryParser") as MockParser:
+            with patch("sys.stdout", new=StringIO()) as fake_out:
+                run_multi_account_agent("unread", accounts_dir=str(tmp_path))
+
+        MockParser.assert_not_called()
+        assert "--add-account" in fake_out.getvalue()
+
+
+class TestRunBatchAgent:
+    """Test cases for run_batch_agent function."""
+
+    @pytest.fixture
+    def queries(self):
+        return [BatchQuery("1", "unread emails"), BatchQuery("invoices", "invoices")]
+
+    def run(self, queries, **kwargs):
+        """Run a batch with a stub client finding one shared message for every query."""
+        with patch("gmail_agent.auth.get_gmail_service") as mock_get_service:
+            with patch("gmail_agent.nlp_parser.GmailQueryParser") as MockParser:
+                with patch("gmail_agent.gmail_client.GmailClient") as MockClient:
+                    MockParser.return_value.translate_many.return_value = [
+                        Translation("is:unread", "rules"), Translation("subject:invoice", "model"),
+                    ]
+                    client = MockClient.return_value
+                    client.search_locally.return_value = None
+                    client.list_message_ids.return_value = ["m1"]
+                    client.fetch_metadata.return_value = [{"id": "m1"}]
+                    client.to_email_message.return_value = EmailMessage(
+                        "Hello", "a@example.com", "", message_id="m1"
+                    )
+                    failures = run_batch_agent(queries, **kwargs)
+
+        mock_get_service.assert_called_once()
+        MockParser.return_value.translate_many.assert_called_once_with(["unread emails", "invoices"])
+        client.fetch_metadata.assert_called_once_with(["m1"])
+        client.close.assert_called_once()
+        return failures
+
+    def test_tables_are_printed_per_query(self, queries):
+        """Test each query gets a header, its Gmail query and its table."""
+        with patch("sys.stdout", new=StringIO()) as fake_out:
+            assert self.run(queries) == 0
+
+        output = fake_out.getvalue()
+        assert "=== [1] unread emails ===" in output
+        assert "=== [invoices] invoices ===" in output
+        assert "Gmail search query: subject:invoice" in output
+        assert output.count("Hello") == 2
+
+    def test_machine_output_is_tagged_with_query_ids(self, queries):
+        """Test JSON Lines rows carry the ID of the query that found them."""
+        with patch("sys.stdout", new=StringIO()) as fake_out:
+            with patch("sys.stderr", new=StringIO()) as fake_err:
+                self.run(queries, output_format="jsonl")
+
+        rows = [json.loads(line) for line in fake_out.getvalue().splitlines()]
+        assert [row["query_id"] for row in rows] == ["1", "invoices"]
+        assert "[invoices] Gmail search query: subject:invoice (1 found)" in fake_err.getvalue()
+
+
+class TestMain:
+    """Test cases for the command line entry point."""
+
+    def test_main_passes_options_to_run_agent(self):
+        """Test command line options reach run_agent."""
+        with patch("gmail_agent.main.get_user_query", return_value="unread mail"):
+            with patch("gmail_agent.main.run_agent") as mock_run:
+                main(["--max-results", "10", "--fetch-mode", "concurrent", "--no-cache"])
+
+                mock_run.assert_called_once()
+                args, kwargs = mock_run.call_args
+                assert args == ("unread mail",)
+                assert kwargs["max_results"] == 10
+                assert kwargs["fetch_mode"] == "concurrent"
+                assert kwargs["cache_file"] is None
+                assert kwargs["cache_label_ttl"] is None
+
+    def test_cache_label_ttl_is_opt_in(self):
+        """Test --cache-label-ttl reaches run_agent."""
+        with patch("gmail_agent.main.get_user_query", return_value="unread mail"):
+            with patch("gmail_agent.main.run_agent") as mock_run:
+                main(["--cache-label-ttl", "600"])
+
+        assert mock_run.call_args[1]["cache_label_ttl"] == 600
+
+    def test_output_without_machine_format_is_rejected(self):
+        """Test --output needs a machine-readable format."""
+        with patch("sys.stderr", new=StringIO()):
+            with pytest.raises(SystemExit):
+                main(["--output", "results.csv"])
+
+    def test_threads_with_machine_format_is_rejected(self):
+        """Test --threads is limited to table output."""
+        with patch("sys.stderr", new=StringIO()):
+            with pytest.raises(SystemExit):
+                main(["--threads", "--output-format", "csv"])
+
+    def test_profile_prints_report_and_calls_hook(self):
+        """Test --profile writes the breakdown to stderr and the hook gets the metrics."""
+        hook = Mock()
+        with patch("gmail_agent.main.get_user_query", return_value="unread mail"):
+            with patch("gmail_agent.main.run_agent") as mock_run:
+                with patch("gmail_agent.metrics.load_exporter", return_value=hook):
+                    with patch("sys.stderr", new=StringIO()) as fake_err:
+                        main(["--profile", "json", "--metrics-hook", "backend:push"])
+
+        metrics = mock_run.call_args[1]["metrics"]
+        assert json.loads(fake_err.getvalue()) == metrics.as_dict()
+        hook.assert_called_once_with(metrics.as_dict())
+
+    @pytest.mark.parametrize("argv", [
+        ["--mirror-file", "mirror.db", "--async"],
+        ["--mirror-file", "mirror.db", "--accounts-dir", "accounts"],
+        ["--cache-file", "cache.db", "--accounts-dir", "accounts"],
+    ])
+    def test_options_the_mode_would_ignore_are_rejected(self, argv):
+        """Test --mirror-file and --cache-file are refused where they would be dropped."""
+        with patch("sys.stderr", new=StringIO()):
+            with pytest.raises(SystemExit):
+                main(argv)
+
+    def test_profile_is_rejected_for_multi_account_search(self):
+        """Test --profile only applies to the single-account search."""
+        with patch("sys.stderr", new=StringIO()):
+            with pytest.raises(SystemExit):
+                main(["--profile", "--accounts-dir", "accounts"])
+
+    def test_batch_reads_queries_from_stdin(self):
+        """Test --batch passes every stdin line to run_batch_agent and exits 1 on failures."""
+        stdin = StringIO("unread emails\nstarred\n")
+        with patch("sys.stdin", new=stdin):
+            with patch("gmail_agent.main.run_batch_agent", return_value=1) as mock_run:
+                with pytest.raises(SystemExit) as exit_info:
+                    main(["--batch", "--output-format", "csv"])
+
+        queries = mock_run.call_args[0][0]
+        assert [query.text for query in queries] == ["unread emails", "starred"]
+        assert mock_run.call_args[1]["output_format"] == "csv"
+        assert exit_info.value.code == 1
+
+    def test_batch_rejects_malformed_input(self):
+        """Test a bad JSON line is reported without searching."""
+        with patch("sys.stdin", new=StringIO('{"id": 1}\n')):
+            with patch("gmail_agent.main.run_batch_agent") as mock_run:
+                with patch("sys.stdout", new=StringIO()) as fake_out:
+                    with pytest.raises(SystemExit):
+                        main(["--batch"])
+
+        mock_run.assert_not_called()
+        assert "Line 1" in fake_out.getvalue()
+
+    def test_batch_with_threads_is_rejected(self):
+        """Test --batch only runs message searches."""
+        with patch("sys.stderr", new=StringIO()):
+            with pytest.raises(SystemExit):
+                main(["--batch", "--threads"])
+
+    def test_main_exits_without_query(self):
+        """Test an empty query exits with an error."""
+        with patch("gmail_agent.main.get_user_query", return_value=""):
+            with patch("sys.stdout", new=StringIO()) as fake_out:
+                with pytest.raises(SystemExit):
+                    main([])
+
+                assert "No query provided" in fake_out.getvalue()
+
+    def test_main_serve_starts_server_without_reading_query(self):
+        """Test --serve builds a session and serves on the given socket."""
+        with patch("gmail_agent.main.get_user_query") as mock_query:
+            with patch("gmail_agent.server.AgentSession") as MockSession:
+                with patch("gmail_agent.server.serve") as mock_serve:
+                    main(["--serve", "--socket", "/tmp/agent.sock", "--no-cache"])
+
+        mock_query.assert_not_called()
+        assert MockSession.call_args.kwargs["cache_file"] is None
+        mock_serve.assert_called_once_with(MockSession.return_value, socket_path="/tmp/agent.sock")
+
+
+class TestStartup:
+    """Test cases for the cost of starting the CLI."""
+
+    def test_import_does_not_load_google_libraries(self):
+        """Test importing the entry point defers the heavy dependencies."""
+        code = (
+            "import sys, gmail_agent.main\n"
+            "heavy = ['google.generativeai.client', 'googleapiclient.discovery',\n"
+            "         'google.oauth2.credentials', 'tabulate']\n"
+            "print(','.join(name for name in heavy if name in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+
+        assert result.stdout.strip() == ""
+
+    def test_fetch_modes_match_client(self):
+        """Test the CLI's copy of the fetch modes matches GmailClient."""
+        from gmail_agent import gmail_client, main as main_module
+
+        assert main_module.FETCH_MODES == gmail_client.FETCH_MODES
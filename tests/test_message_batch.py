@@ -0,0 +1,71 @@
+"""Tests for the columnar message batch."""
+
+from gmail_agent.gmail_client import EmailMessage
+from gmail_agent.message_batch import MessageBatch
+
+
+def make_message(message_id, timestamp=None, subject=None):
+    return EmailMessage(
+        subject=subject or f"Subject {message_id}",
+        sender="a@example.com",
+        date="",
+        message_id=message_id,
+        thread_id=f"t-{message_id}",
+        label_ids=("INBOX",),
+        timestamp=timestamp,
+    )
+
+
+class TestMessageBatch:
+    """Tests for MessageBatch."""
+
+    def test_round_trips_messages(self):
+        """Test that messages come back unchanged, including missing timestamps."""
+        messages = [make_message("1", 100.0), make_message("2")]
+
+        batch = MessageBatch.from_messages(iter(messages))
+
+        assert len(batch) == 2
+        assert list(batch) == messages
+        assert batch[1].timestamp is None
+
+    def test_sorted_by_time_puts_undated_last(self):
+        """Test newest-first and oldest-first ordering with an undated row."""
+        batch = MessageBatch.from_messages([
+            make_message("old", 100.0), make_message("none"), make_message("new", 300.0),
+        ])
+
+        assert batch.sorted_by_time().message_id == ["new", "old", "none"]
+        assert batch.sorted_by_time(newest_first=False).message_id == ["old", "new", "none"]
+
+    def test_deduplicated_keeps_first_and_rows_without_id(self):
+        """Test that the first row per ID survives and empty IDs are never merged."""
+        batch = MessageBatch.from_messages([
+            make_message("1", subject="first"),
+            make_message(""),
+            make_message("1", subject="second"),
+            make_message(""),
+        ])
+
+        result = batch.deduplicated()
+
+        assert result.message_id == ["1", "", ""]
+        assert result.subject[0] == "first"
+
+    def test_merge_deduplicates_sorts_and_limits(self):
+        """Test merging overlapping batches into one newest-first batch."""
+        first = MessageBatch.from_messages([make_message("1", 100.0), make_message("2", 200.0)])
+        second = MessageBatch.from_messages([make_message("2", 200.0), make_message("3", 300.0)])
+
+        merged = MessageBatch.merge([first, second], limit=2)
+
+        assert merged.message_id == ["3", "2"]
+        assert list(merged.timestamp) == [300.0, 200.0]
+
+    def test_head_and_take(self):
+        """Test row selection."""
+        batch = MessageBatch.from_messages([make_message(str(i), float(i)) for i in range(5)])
+
+        assert batch.head(2).message_id == ["0", "1"]
+        assert batch.head(10).message_id == ["0", "1", "2", "3", "4"]
+        assert batch.take([4, 0]).thread_id == ["t-4", "t-0"]
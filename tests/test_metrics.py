@@ -0,0 +1,94 @@
+"""Tests for the metrics module."""
+
+import json
+from unittest.mock import Mock
+
+import pytest
+
+from gmail_agent.metrics import NULL_METRICS, Metrics, load_exporter
+
+
+class TestMetrics:
+    """Test cases for Metrics class."""
+
+    def test_stages_accumulate_time_and_count(self):
+        """Test a stage entered twice is reported once with both entries."""
+        metrics = Metrics()
+        with metrics.stage("fetch"):
+            pass
+        with metrics.stage("fetch"):
+            pass
+
+        stage = metrics.as_dict()["stages"]["fetch"]
+        assert stage["count"] == 2
+        assert stage["seconds"] >= 0
+
+    def test_stages_keep_the_order_they_were_entered(self):
+        """Test an outer stage is listed before the stages nested in it."""
+        metrics = Metrics()
+        with metrics.stage("search"):
+            with metrics.stage("list"):
+                pass
+
+        assert list(metrics.as_dict()["stages"]) == ["search", "list"]
+
+    def test_record_responses_counts_calls_and_bytes(self):
+        """Test responses are counted per method with their compact JSON size."""
+        metrics = Metrics()
+        response = {"id": "m1"}
+
+        metrics.record_responses("messages.get", [response, response])
+
+        counters = metrics.as_dict()["counters"]
+        assert counters["api.messages.get"] == 2
+        assert counters["bytes_received"] == 2 * len(json.dumps(response, separators=(",", ":")))
+
+    def test_export_sends_snapshot_to_every_exporter(self):
+        """Test exporters receive the same data as as_dict()."""
+        first, second = Mock(), Mock()
+        metrics = Metrics(exporters=[first])
+        metrics.add_exporter(second)
+        metrics.increment("retries", 3)
+
+        metrics.export()
+
+        first.assert_called_once_with(metrics.as_dict())
+        second.assert_called_once_with(metrics.as_dict())
+
+    def test_format_report_lists_stages_and_counters(self):
+        """Test the text report names every stage and counter."""
+        metrics = Metrics()
+        with metrics.stage("translate"):
+            pass
+        metrics.increment("cache.hits", 4)
+
+        report = metrics.format_report()
+
+        assert "translate" in report
+        assert "cache.hits" in report
+
+    def test_null_metrics_record_nothing(self):
+        """Test the disabled metrics ignore every call."""
+        with NULL_METRICS.stage("fetch"):
+            NULL_METRICS.increment("retries")
+            NULL_METRICS.record_responses("messages.get", [{"id": "m1"}])
+
+        assert NULL_METRICS.as_dict() == {"stages": {}, "counters": {}}
+
+
+class TestLoadExporter:
+    """Test cases for load_exporter function."""
+
+    def test_loads_module_function(self):
+        """Test a module:function spec resolves to the function."""
+        assert load_exporter("json:dumps") is json.dumps
+
+    def test_rejects_malformed_spec(self):
+        """Test a spec without a function name is rejected."""
+        with pytest.raises(ValueError, match="package.module:function"):
+            load_exporter("json")
+
+    def test_rejects_non_callable(self):
+        """Test a spec naming something that cannot be called is rejected."""
+        with pytest.raises(ValueError, match="not a callable"):
+            load_exporter("json:__name__")
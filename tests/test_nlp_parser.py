@@ -1,10 +1,14 @@
 """Tests for NLP parser module."""
 
+import subprocess
+import sys
 from unittest.mock import Mock, patch
 
 import pytest
 
-from gmail_agent.nlp_parser import GmailQueryParser
+from gmail_agent.metrics import Metrics
+from gmail_agent.nlp_parser import GmailQueryParser, Translation
+from gmail_agent.translation_cache import TranslationCache
 
 
 class TestGmailQueryParser:
@@ -13,7 +17,7 @@ class TestGmailQueryParser:
     @pytest.fixture
     def parser(self):
         """Create a parser instance with mocked Gemini model."""
-        with patch("gmail_agent.nlp_parser.genai.GenerativeModel") as mock_model_class:
+        with patch("google.generativeai.GenerativeModel") as mock_model_class:
             mock_model = Mock()
             mock_model_class.return_value = mock_model
             parser = GmailQueryParser(api_key="test_api_key")
@@ -21,12 +25,14 @@ class TestGmailQueryParser:
             return parser
 
     def test_parser_initialization(self):
-        """Test parser initializes with API key."""
-        with patch("gmail_agent.nlp_parser.genai.configure") as mock_configure:
-            with patch("gmail_agent.nlp_parser.genai.GenerativeModel"):
+        """Test parser configures Gemini with its API key on first model use."""
+        with patch("google.generativeai.configure") as mock_configure:
+            with patch("google.generativeai.GenerativeModel"):
                 parser = GmailQueryParser(api_key="test_key")
+                mock_configure.assert_not_called()
+
+                assert parser.model is parser.model
                 mock_configure.assert_called_once_with(api_key="test_key")
-                assert parser is not None
 
     def test_parse_simple_unread_query(self, parser):
         """Test parsing simple unread emails query."""
@@ -95,9 +101,9 @@ class TestGmailQueryParser:
     def test_parse_from_env_api_key(self):
         """Test parser can initialize from environment variable."""
         with patch.dict("os.environ", {"GOOGLE_API_KEY": "env_key"}):
-            with patch("gmail_agent.nlp_parser.genai.configure") as mock_configure:
-                with patch("gmail_agent.nlp_parser.genai.GenerativeModel"):
-                    parser = GmailQueryParser()
+            with patch("google.generativeai.configure") as mock_configure:
+                with patch("google.generativeai.GenerativeModel"):
+                    GmailQueryParser().model
                     mock_configure.assert_called_once_with(api_key="env_key")
 
     def test_parse_raises_error_without_api_key(self):
@@ -105,3 +111,221 @@ class TestGmailQueryParser:
         with patch.dict("os.environ", {}, clear=True):
             with pytest.raises(ValueError, match="GOOGLE_API_KEY"):
                 GmailQueryParser()
+
+
+class TestGmailQueryParserCache:
+    """Test cases for GmailQueryParser with a translation cache."""
+
+    @pytest.fixture
+    def parser(self):
+        """Create a cached parser with a mocked Gemini model."""
+        with patch("google.generativeai.GenerativeModel"):
+            parser = GmailQueryParser(api_key="test_api_key", cache=TranslationCache())
+        parser.model = Mock()
+        parser.model.generate_content.return_value = Mock(text="from:google.com is:unread")
+        return parser
+
+    def test_repeated_query_calls_model_once(self, parser):
+        """Test a repeated query is served from the cache."""
+        first = parser.parse("show me unread emails from Google")
+        second = parser.parse("Show me unread emails from Google ")
+
+        assert first == second == "from:google.com is:unread"
+        parser.model.generate_content.assert_called_once()
+        assert parser.cache.stats() == {"hits": 1, "misses": 1}
+
+    def test_empty_translation_is_not_cached(self, parser):
+        """Test empty model output is retried rather than cached."""
+        parser.model.generate_content.return_value = Mock(text="")
+
+        parser.parse("gibberish")
+        parser.parse("gibberish")
+
+        assert parser.model.generate_content.call_count == 2
+
+    def test_model_name_is_configurable(self):
+        """Test the Gemini model name is passed through."""
+        with patch("google.generativeai.configure"):
+            with patch("google.generativeai.GenerativeModel") as MockModel:
+                parser = GmailQueryParser(api_key="key", model_name="gemini-test")
+                parser.model
+
+                MockModel.assert_called_once_with("gemini-test")
+                assert parser.model_name == "gemini-test"
+
+
+class TestGmailQueryParserFastPath:
+    """Test cases for the rule-based fast path."""
+
+    @pytest.fixture
+    def parser(self):
+        """Create a parser with the fast path enabled and a mocked model."""
+        with patch("google.generativeai.GenerativeModel"):
+            parser = GmailQueryParser(api_key="test_api_key", fast_path=True)
+        parser.model = Mock()
+        parser.model.generate_content.return_value = Mock(text="from:john is:unread")
+        return parser
+
+    def test_simple_query_skips_model(self, parser):
+        """Test queries covered by the rules never call Gemini."""
+        translation = parser.translate("show me unread emails from Google")
+
+        assert translation == Translation("from:google.com is:unread", "rules")
+        parser.model.generate_content.assert_not_called()
+
+    def test_uncovered_query_uses_model(self, parser):
+        """Test queries the rules cannot cover fall back to Gemini."""
+        translation = parser.translate("unread emails from John Smith")
+
+        assert translation == Translation("from:john is:unread", "model")
+        parser.model.generate_content.assert_called_once()
+
+    def test_cache_hits_are_reported(self, parser):
+        """Test a cached translation reports the cache as its source."""
+        parser.cache = TranslationCache()
+
+        parser.translate("unread emails from John Smith")
+        translation = parser.translate("unread emails from John Smith")
+
+        assert translation.source == "cache"
+        parser.model.generate_content.assert_called_once()
+
+    def test_metrics_count_translation_sources_and_model_calls(self, parser):
+        """Test each translation is counted by source and model calls are timed."""
+        parser.metrics = Metrics()
+
+        parser.translate("show me unread emails from Google")
+        parser.translate("unread emails from John Smith")
+
+        data = parser.metrics.as_dict()
+        assert data["counters"] == {
+            "api.model": 1, "translations.model": 1, "translations.rules": 1,
+        }
+        assert data["stages"]["model"]["count"] == 1
+
+    def test_fast_path_is_off_by_default(self):
+        """Test the parser only uses the rules when asked to."""
+        with patch("google.generativeai.GenerativeModel"):
+            parser = GmailQueryParser(api_key="test_api_key")
+        parser.model = Mock()
+        parser.model.generate_content.return_value = Mock(text="is:unread")
+
+        assert parser.translate("show me unread messages").source == "model"
+
+
+class TestGmailQueryParserBatch:
+    """Test cases for translating many queries per model call."""
+
+    @pytest.fixture
+    def parser(self):
+        """Create a parser whose mocked model answers numbered prompts."""
+        with patch("google.generativeai.GenerativeModel"):
+            parser = GmailQueryParser(api_key="test_api_key")
+        parser.model = Mock()
+        parser.model.generate_content.side_effect = self.answer_all
+        return parser
+
+    @staticmethod
+    def numbered_inputs(prompt):
+        """Extract (number, query) pairs from a batched prompt."""
+        inputs = prompt.split("Inputs:\n", 1)[1].split("\nOutputs:", 1)[0]
+        return [line.split(": ", 1) for line in inputs.splitlines()]
+
+    @classmethod
+    def answer_all(cls, prompt):
+        """Answer each numbered input with subject:<query>."""
+        lines = [f"{n}: subject:{q.replace(' ', '_')}" for n, q in cls.numbered_inputs(prompt)]
+        return Mock(text="\n".join(lines))
+
+    def test_parse_many_packs_queries_into_chunks(self, parser):
+        """Test N queries cost about N/chunk_size model calls."""
+        queries = [f"query {i}" for i in range(45)]
+
+        results = parser.parse_many(queries, chunk_size=20)
+
+        assert results == [f"subject:query_{i}" for i in range(45)]
+        assert parser.model.generate_content.call_count == 3
+
+    def test_parse_many_reuses_system_prompt(self, parser):
+        """Test the batched prompt includes the single-query examples."""
+        parser.parse_many(["a", "b"])
+
+        prompt = parser.model.generate_content.call_args[0][0]
+        assert prompt.startswith(GmailQueryParser.SYSTEM_PROMPT)
+
+    def test_parse_many_deduplicates_inputs(self, parser):
+        """Test identical inputs are sent to the model once."""
+        results = parser.parse_many(["a", "b", "a"])
+
+        assert results == ["subject:a", "subject:b", "subject:a"]
+        assert len(self.numbered_inputs(parser.model.generate_content.call_args[0][0])) == 2
+
+    def test_parse_many_retries_only_missing_items(self, parser):
+        """Test inputs missing from a reply are retried on their own."""
+        replies = [
+            Mock(text="1: subject:a\n3: subject:c\n3: subject:dupe"),
+            Mock(text="1: subject:b\n2: subject:c"),
+        ]
+        parser.model.generate_content.side_effect = replies
+
+        results = parser.parse_many(["a", "b", "c"])
+
+        assert results == ["subject:a", "subject:b", "subject:c"]
+        retry_prompt = parser.model.generate_content.call_args_list[1][0][0]
+        assert self.numbered_inputs(retry_prompt) == [["1", "b"], ["2", "c"]]
+
+    def test_parse_many_falls_back_to_single_calls(self, parser):
+        """Test inputs that keep failing in batches are translated individually."""
+        parser.model.generate_content.side_effect = [
+            Mock(text="1: subject:a"),
+            Mock(text="garbage"),
+            Mock(text="subject:b"),
+        ]
+
+        results = parser.parse_many(["a", "b"])
+
+        assert results == ["subject:a", "subject:b"]
+        assert parser.model.generate_content.call_args[0][0].endswith("Input: b\nOutput:")
+
+    def test_translate_many_skips_model_for_local_answers(self, parser):
+        """Test rule and cache hits are not sent to the model."""
+        parser.fast_path = True
+        parser.cache = TranslationCache()
+        parser.parse_many(["custom request"])
+        parser.model.generate_content.reset_mock()
+
+        translations = parser.translate_many(["show me unread messages", "custom request"])
+
+        assert [t.source for t in translations] == ["rules", "cache"]
+        parser.model.generate_content.assert_not_called()
+
+    def test_translate_many_writes_the_cache_file_once(self, parser, tmp_path):
+        """Test a batch of new translations is flushed to disk in one write."""
+        parser.cache = TranslationCache(str(tmp_path / "translations.json"))
+
+        with patch.object(parser.cache, "flush", wraps=parser.cache.flush) as flush:
+            parser.parse_many([f"query {i}" for i in range(45)])
+
+        flush.assert_called_once()
+        assert TranslationCache(str(tmp_path / "translations.json")).get(
+            parser._cache_key("query 44")
+        ) == "subject:query_44"
+
+
+class TestLazyModel:
+    """Test cases for deferred loading of the Gemini client."""
+
+    def test_rule_answered_query_does_not_import_gemini(self):
+        """Test queries the rules answer never load google.generativeai."""
+        code = (
+            "import sys\n"
+            "from gmail_agent.nlp_parser import GmailQueryParser\n"
+            "parser = GmailQueryParser(api_key='key', fast_path=True)\n"
+            "print(parser.parse('show me unread emails'))\n"
+            "print('google.generativeai' in sys.modules)"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+
+        assert result.stdout.split() == ["is:unread", "False"]
@@ -0,0 +1,126 @@
+"""Tests for machine-readable output writers."""
+
+import csv
+import json
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+
+from gmail_agent.gmail_client import EmailMessage
+from gmail_agent.output import write_csv, write_jsonl, write_messages, write_parquet
+
+
+@pytest.fixture
+def messages():
+    """Messages with characters that need escaping."""
+    return [
+        EmailMessage('Quote " and, comma', "Name <a@example.com>", "Mon, 1 Jan 2024",
+                     message_id="m1", thread_id="t1", label_ids=("INBOX", "UNREAD"),
+                     timestamp=1704067200.0),
+        EmailMessage("שלום\nworld", "b@example.com", "Tue, 2 Jan 2024"),
+    ]
+
+
+class TestWriteJsonl:
+    """Test cases for write_jsonl function."""
+
+    def test_each_line_is_a_json_object(self, messages):
+        """Test lines round-trip through json.loads."""
+        out = StringIO()
+
+        assert write_jsonl(iter(messages), out) == 2
+
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert rows[0] == {
+            "subject": 'Quote " and, comma',
+            "sender": "Name <a@example.com>",
+            "date": "Mon, 1 Jan 2024",
+            "id": "m1",
+            "thread_id": "t1",
+            "labels": ["INBOX", "UNREAD"],
+            "timestamp": 1704067200.0,
+        }
+        assert rows[1]["subject"] == "שלום\nworld"
+        assert rows[1]["timestamp"] is None
+
+    def test_tagged_rows_lead_with_query_id(self, messages):
+        """Test (query ID, message) pairs get a leading "query_id" key."""
+        out = StringIO()
+
+        write_jsonl([("nightly", messages[0])], out, tagged=True)
+
+        row = json.loads(out.getvalue())
+        assert list(row)[:2] == ["query_id", "subject"]
+        assert row["query_id"] == "nightly"
+
+
+class TestWriteCsv:
+    """Test cases for write_csv function."""
+
+    def test_header_and_quoted_rows(self, messages):
+        """Test values with commas, quotes and newlines survive."""
+        out = StringIO()
+
+        assert write_csv(messages, out) == 2
+
+        rows = list(csv.reader(StringIO(out.getvalue())))
+        assert rows[0] == ["subject", "sender", "date", "id", "thread_id", "labels", "timestamp"]
+        assert rows[1] == ['Quote " and, comma', "Name <a@example.com>", "Mon, 1 Jan 2024",
+                           "m1", "t1", "INBOX;UNREAD", "1704067200.0"]
+        assert rows[2][0] == "שלום\nworld"
+
+    def test_tagged_rows_add_query_id_column(self, messages):
+        """Test tagged output adds a leading query_id column."""
+        out = StringIO()
+
+        write_csv([("1", messages[0]), ("2", messages[1])], out, tagged=True)
+
+        rows = list(csv.reader(StringIO(out.getvalue())))
+        assert rows[0][:2] == ["query_id", "subject"]
+        assert [row[0] for row in rows[1:]] == ["1", "2"]
+
+
+class TestWriteParquet:
+    """Test cases for write_parquet function."""
+
+    def test_row_groups_round_trip(self, messages, tmp_path):
+        """Test messages are written in row groups and read back intact."""
+        pq = pytest.importorskip("pyarrow.parquet")
+        path = tmp_path / "out.parquet"
+
+        assert write_parquet(messages * 3, str(path), row_group_size=4) == 6
+
+        parquet_file = pq.ParquetFile(path)
+        assert parquet_file.metadata.num_row_groups == 2
+        assert parquet_file.read().column("sender").to_pylist()[1] == "b@example.com"
+
+    def test_missing_pyarrow_explains_how_to_install(self, messages, tmp_path):
+        """Test a clear error is raised without the optional dependency."""
+        with patch.dict("sys.modules", {"pyarrow": None, "pyarrow.parquet": None}):
+            with pytest.raises(ImportError, match=r"\[arrow\]"):
+                write_parquet(messages, str(tmp_path / "out.parquet"))
+
+
+class TestWriteMessages:
+    """Test cases for write_messages function."""
+
+    def test_writes_to_stdout_by_default(self, messages):
+        """Test output goes to stdout without a path."""
+        with patch("sys.stdout", new=StringIO()) as fake_out:
+            write_messages(messages, "jsonl")
+
+        assert len(fake_out.getvalue().splitlines()) == 2
+
+    def test_writes_to_file(self, messages, tmp_path):
+        """Test output goes to the given file."""
+        path = tmp_path / "out.csv"
+
+        write_messages(messages, "csv", str(path))
+
+        assert path.read_text(encoding="utf-8").startswith("subject,sender,date,")
+
+    def test_unknown_format(self, messages):
+        """Test an unknown format is rejected."""
+        with pytest.raises(ValueError, match="xml"):
+            write_messages(messages, "xml")
@@ -0,0 +1,72 @@
+"""Tests for rule-based query translation module."""
+
+import pytest
+
+from gmail_agent.query_rules import translate
+
+
+class TestTranslate:
+    """Test cases for the translate function."""
+
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            ("show me unread emails from Google", "from:google.com is:unread"),
+            ("messages from Amazon last week", "from:amazon.com newer_than:7d"),
+            (
+                "unread emails with attachments from support@company.com",
+                "from:support@company.com is:unread has:attachment",
+            ),
+            ("emails about invoice from last month", "subject:invoice newer_than:30d"),
+            ("show me unread messages", "is:unread"),
+            ("messages from last week", "newer_than:7d"),
+            ("emails from github.com", "from:github.com"),
+            ("emails with 'weekly report' in the subject", 'subject:"weekly report"'),
+            ("starred mail from the last 3 weeks", "is:starred newer_than:21d"),
+            ("emails older than 2 months", "older_than:60d"),
+            ("emails sent to bob@example.org today", "to:bob@example.org newer_than:1d"),
+        ],
+    )
+    def test_english_patterns(self, text, expected):
+        """Test common English requests translate without the model."""
+        assert translate(text) == expected
+
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            ("מיילים שלא נקראו מ-google", "from:google.com is:unread"),
+            ("הודעות מ-amazon מהשבוע האחרון", "from:amazon.com newer_than:7d"),
+            ("הודעות עם קבצים מצורפים מהחודש האחרון", "has:attachment newer_than:30d"),
+        ],
+    )
+    def test_hebrew_patterns(self, text, expected):
+        """Test common Hebrew requests translate without the model."""
+        assert translate(text) == expected
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "emails from John Smith",
+            "emails with attached PDF file(s) from the past week",
+            "emails from google or amazon",
+            "emails from google from amazon",
+            "show me",
+            "",
+        ],
+    )
+    def test_uncovered_queries_return_none(self, text):
+        """Test anything the rules cannot fully account for is left to the model."""
+        assert translate(text) is None
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "emails from John",
+            "unread emails from mom",
+            "messages from Sarah last week",
+            "הודעות מ-yossi",
+        ],
+    )
+    def test_person_names_are_left_to_the_model(self, text):
+        """Test a single-word sender that is not a known brand is not turned into a domain."""
+        assert translate(text) is None
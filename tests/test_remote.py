@@ -0,0 +1,40 @@
+"""Tests for the thin agent server client."""
+
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+
+from gmail_agent.remote import ServerError, main
+
+
+class TestRemoteMain:
+    """Test cases for the remote command line entry point."""
+
+    def test_prints_server_results(self):
+        """Test the query and results table are printed."""
+        response = {
+            "gmail_query": "is:unread",
+            "messages": [{"subject": "Hello", "sender": "a@example.com", "date": "Mon"}],
+        }
+        with patch("sys.stdin.isatty", return_value=False):
+            with patch("sys.stdin.read", return_value="unread emails\n"):
+                with patch("gmail_agent.remote.query_server", return_value=response) as mock_query:
+                    with patch("sys.stdout", new=StringIO()) as fake_out:
+                        main(["--socket", "agent.sock", "--max-results", "5"])
+
+        mock_query.assert_called_once_with("unread emails", socket_path="agent.sock", max_results=5)
+        output = fake_out.getvalue()
+        assert "Gmail search query: is:unread" in output
+        assert "Hello" in output
+
+    def test_server_errors_exit_nonzero(self):
+        """Test a server failure is reported and exits with an error."""
+        with patch("sys.stdin.isatty", return_value=False):
+            with patch("sys.stdin.read", return_value="unread emails\n"):
+                with patch("gmail_agent.remote.query_server", side_effect=ServerError("boom")):
+                    with patch("sys.stdout", new=StringIO()) as fake_out:
+                        with pytest.raises(SystemExit):
+                            main([])
+
+        assert "Error: boom" in fake_out.getvalue()
@@ -0,0 +1,179 @@
+"""Tests for the request scheduler module."""
+
+from unittest.mock import Mock
+
+import pytest
+from googleapiclient.errors import HttpError
+
+from gmail_agent.metrics import Metrics
+from gmail_agent.scheduler import RequestScheduler, TokenBucket, is_rate_limited, is_retryable
+
+
+class FakeClock:
+    """Clock whose sleep advances time instantly."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def http_error(status, content=b"error"):
+    return HttpError(Mock(status=status), content)
+
+
+def make_request(method_id="gmail.users.messages.get", results=()):
+    request = Mock(methodId=method_id)
+    request.execute.side_effect = list(results)
+    return request
+
+
+class TestTokenBucket:
+    """Test cases for TokenBucket class."""
+
+    def test_waits_for_tokens_once_the_burst_is_spent(self):
+        """Test calls beyond the capacity wait for the refill."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=100, clock=clock, sleep=clock.sleep)
+
+        assert bucket.acquire(100) == 0
+        assert bucket.acquire(50) == pytest.approx(0.5)
+
+    def test_oversized_request_leaves_bucket_in_debt(self):
+        """Test a request above the capacity waits for a full bucket, then for its debt."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=100, clock=clock, sleep=clock.sleep)
+        bucket.acquire(100)
+
+        assert bucket.acquire(300) == pytest.approx(1.0)
+        assert bucket.acquire(100) == pytest.approx(3.0)
+
+    def test_slow_down_halves_rate_once_per_cooldown(self):
+        """Test a burst of rate limits only halves the rate once."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=100, clock=clock, sleep=clock.sleep, cooldown=1.0)
+
+        bucket.slow_down()
+        bucket.slow_down()
+        assert bucket.rate == 50
+
+        clock.now += 1.0
+        bucket.slow_down()
+        assert bucket.rate == 25
+
+    def test_rate_never_drops_below_minimum(self):
+        """Test repeated slow-downs stop at the minimum rate."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=100, min_rate=30, clock=clock, sleep=clock.sleep, cooldown=0)
+
+        for _ in range(5):
+            bucket.slow_down()
+
+        assert bucket.rate == 30
+
+    def test_speed_up_recovers_to_maximum(self):
+        """Test successes restore the rate in steps without overshooting."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=100, clock=clock, sleep=clock.sleep)
+        bucket.slow_down()
+
+        bucket.speed_up()
+        assert bucket.rate == 55
+        for _ in range(20):
+            bucket.speed_up()
+        assert bucket.rate == 100
+
+
+class TestErrorClassification:
+    """Test cases for is_rate_limited and is_retryable."""
+
+    def test_rate_limits_and_server_errors_are_retryable(self):
+        """Test 429, 5xx and dropped connections are retried."""
+        assert is_retryable(http_error(429))
+        assert is_retryable(http_error(503))
+        assert is_retryable(ConnectionResetError())
+
+    def test_403_is_retryable_only_for_rate_limit_reasons(self):
+        """Test a rate-limit 403 is retried but a permission 403 is not."""
+        limited = http_error(403, b'{"error": {"errors": [{"reason": "userRateLimitExceeded"}]}}')
+
+        assert is_rate_limited(limited)
+        assert is_retryable(limited)
+        assert not is_retryable(http_error(403, b"insufficientPermissions"))
+
+    def test_client_errors_are_not_retryable(self):
+        """Test errors that will not go away are not retried."""
+        assert not is_retryable(http_error(404))
+        assert not is_retryable(ValueError("bad"))
+
+
+class TestRequestScheduler:
+    """Test cases for RequestScheduler class."""
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    def make_scheduler(self, clock, **kwargs):
+        bucket = TokenBucket(rate=250, clock=clock, sleep=clock.sleep)
+        return RequestScheduler(bucket=bucket, sleep=clock.sleep, jitter=lambda: 0.5, **kwargs)
+
+    def test_retries_with_jittered_exponential_backoff(self, clock):
+        """Test each retry waits a jittered share of a doubling delay."""
+        scheduler = self.make_scheduler(clock, backoff_base=1.0)
+        request = make_request(results=[http_error(503), http_error(503), {"id": "m1"}])
+
+        assert scheduler.execute(request) == {"id": "m1"}
+        assert clock.sleeps == [0.5, 1.0]
+
+    def test_gives_up_after_max_retries(self, clock):
+        """Test the last error is raised once retries run out."""
+        scheduler = self.make_scheduler(clock, max_retries=2)
+        request = make_request(results=[http_error(429)] * 3)
+
+        with pytest.raises(HttpError):
+            scheduler.execute(request)
+        assert request.execute.call_count == 3
+
+    def test_non_retryable_errors_are_raised_at_once(self, clock):
+        """Test a 404 is not retried."""
+        scheduler = self.make_scheduler(clock)
+        request = make_request(results=[http_error(404)])
+
+        with pytest.raises(HttpError):
+            scheduler.execute(request)
+        assert request.execute.call_count == 1
+
+    def test_rate_limits_slow_the_bucket_down(self, clock):
+        """Test a 429 halves the admitted rate and is counted."""
+        metrics = Metrics()
+        scheduler = self.make_scheduler(clock, metrics=metrics)
+        request = make_request(results=[http_error(429), {"id": "m1"}])
+
+        scheduler.execute(request)
+
+        assert scheduler.bucket.rate == pytest.approx(125 + 250 / 20)
+        assert metrics.as_dict()["counters"] == {"rate_limited": 1, "retries": 1}
+
+    def test_quota_units_depend_on_the_method(self, clock):
+        """Test thread calls cost twice as much quota as message calls."""
+        scheduler = self.make_scheduler(clock)
+
+        scheduler.acquire([make_request("gmail.users.threads.get")] * 25)
+
+        assert scheduler.bucket.tokens == 0
+
+    def test_without_a_rate_nothing_is_throttled(self, clock):
+        """Test units_per_second=None only retries."""
+        scheduler = RequestScheduler(units_per_second=None, sleep=clock.sleep)
+
+        scheduler.acquire([make_request()] * 1000)
+
+        assert scheduler.bucket is None
+        assert clock.sleeps == []
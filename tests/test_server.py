@@ -0,0 +1,120 @@
+"""Tests for the resident agent server."""
+
+import os
+import stat
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+
+from gmail_agent.gmail_client import EmailMessage
+from gmail_agent.remote import ServerError, query_server
+from gmail_agent.server import AgentServer, AgentSession
+
+
+@pytest.fixture
+def running_server(tmp_path):
+    """Start an AgentServer with a mocked session on a temporary socket."""
+    socket_path = str(tmp_path / "agent.sock")
+    session = Mock()
+    server = AgentServer(socket_path, session)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield socket_path, session, server
+    server.shutdown()
+    server.server_close()
+
+
+class TestAgentServer:
+    """Test cases for AgentServer and query_server."""
+
+    def test_round_trip(self, running_server):
+        """Test a query is answered by the session and returned as JSON."""
+        socket_path, session, _ = running_server
+        session.search.return_value = (
+            "is:unread",
+            [EmailMessage("Hello", "a@example.com", "Mon, 1 Jan 2024")],
+        )
+
+        response = query_server("unread emails", socket_path=socket_path, max_results=5)
+
+        session.search.assert_called_once_with("unread emails", max_results=5)
+        assert response["gmail_query"] == "is:unread"
+        assert response["messages"][0]["subject"] == "Hello"
+
+    def test_errors_are_reported_to_client(self, running_server):
+        """Test a failing query raises ServerError on the client side."""
+        socket_path, session, _ = running_server
+        session.search.side_effect = ValueError("GEMINI_API_KEY is not set")
+
+        with pytest.raises(ServerError, match="GEMINI_API_KEY"):
+            query_server("anything", socket_path=socket_path)
+
+    def test_serves_repeated_queries_from_one_session(self, running_server):
+        """Test the same warm session answers every request."""
+        socket_path, session, _ = running_server
+        session.search.return_value = ("in:inbox", [])
+
+        for _ in range(3):
+            query_server("inbox", socket_path=socket_path)
+
+        assert session.search.call_count == 3
+
+    def test_socket_is_private_and_removed_on_close(self, tmp_path):
+        """Test only the owner can connect and the socket file is cleaned up."""
+        socket_path = str(tmp_path / "agent.sock")
+        server = AgentServer(socket_path, Mock())
+
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) & 0o077 == 0
+
+        server.server_close()
+        assert not os.path.exists(socket_path)
+
+    def test_stale_socket_is_replaced(self, tmp_path):
+        """Test a socket left by an earlier server does not stop a new one."""
+        socket_path = str(tmp_path / "agent.sock")
+        AgentServer(socket_path, Mock()).socket.close()
+
+        server = AgentServer(socket_path, Mock())
+
+        assert stat.S_ISSOCK(os.lstat(socket_path).st_mode)
+        server.server_close()
+
+    def test_existing_regular_file_is_not_removed(self, tmp_path):
+        """Test a --socket path pointing at a regular file is refused, not deleted."""
+        socket_path = tmp_path / "notes.txt"
+        socket_path.write_text("keep me")
+
+        with pytest.raises(FileExistsError, match="not a socket"):
+            AgentServer(str(socket_path), Mock())
+
+        assert socket_path.read_text() == "keep me"
+
+    def test_unreachable_server_raises_oserror(self, tmp_path):
+        """Test connecting without a server fails with OSError."""
+        with pytest.raises(OSError):
+            query_server("anything", socket_path=str(tmp_path / "missing.sock"))
+
+
+class TestAgentSession:
+    """Test cases for AgentSession class."""
+
+    def test_setup_happens_once(self):
+        """Test the service and parser are built once and reused per query."""
+        with patch("gmail_agent.server.get_gmail_service") as mock_get_service, \
+                patch("gmail_agent.server.get_credential_provider") as mock_provider:
+            with patch("gmail_agent.server.GmailQueryParser") as MockParser:
+                with patch("gmail_agent.server.create_client") as MockClient:
+                    MockParser.return_value.parse.return_value = "is:unread"
+                    MockClient.return_value.search_messages.return_value = []
+
+                    session = AgentSession()
+                    session.search("unread")
+                    gmail_query, messages = session.search("unread", max_results=10)
+
+        assert gmail_query == "is:unread"
+        assert messages == []
+        mock_get_service.assert_called_once()
+        MockParser.assert_called_once()
+        MockClient.return_value.search_messages.assert_called_with("is:unread", max_results=10)
+        mock_provider.return_value.start.assert_called_once()
@@ -0,0 +1,291 @@
+"""Tests for mailbox sync module."""
+
+from unittest.mock import Mock
+
+import pytest
+from googleapiclient.errors import HttpError
+
+from gmail_agent.gmail_client import GmailClient
+from gmail_agent.local_query import LocalQueryEngine
+from gmail_agent.metrics import Metrics
+from gmail_agent.scheduler import RequestScheduler
+from gmail_agent.sync import MailboxMirror, MailboxSync
+
+
+class FakeGmailService:
+    """Minimal in-memory stand-in for the Gmail service's users() resource."""
+
+    def __init__(self, messages, history_id="100"):
+        self.mailbox = {m["id"]: m for m in messages}
+        self.history_id = history_id
+        self.history_pages = []
+        self.history_error = None
+        self.get_calls = []
+        self.failing_ids = set()
+        self.list_calls = 0
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def getProfile(self, userId):
+        return self._request({"historyId": self.history_id})
+
+    def history(self):
+        resource = Mock()
+
+        def list_(userId, startHistoryId, historyTypes, pageToken=None):
+            if self.history_error is not None:
+                raise self.history_error
+            index = int(pageToken or 0)
+            page = dict(self.history_pages[index])
+            if index + 1 < len(self.history_pages):
+                page["nextPageToken"] = str(index + 1)
+            return self._request(page)
+
+        resource.list.side_effect = list_
+        return resource
+
+    def get(self, userId, id, **kwargs):
+        self.get_calls.append(id)
+        if id in self.failing_ids:
+            request = Mock()
+            request.execute.side_effect = HttpError(Mock(status=500), b"backend error")
+            return request
+        return self._request(self.mailbox[id])
+
+    def list(self, userId, q, labelIds, maxResults, pageToken=None, **kwargs):
+        self.list_calls += 1
+        ids = [mid for mid, m in self.mailbox.items() if labelIds[0] in m["labelIds"]]
+        start = int(pageToken or 0)
+        page = {"messages": [{"id": mid} for mid in ids[start:start + maxResults]]}
+        if start + maxResults < len(ids):
+            page["nextPageToken"] = str(start + maxResults)
+        return self._request(page)
+
+    @staticmethod
+    def _request(response):
+        request = Mock()
+        request.execute.return_value = response
+        return request
+
+
+def make_message(message_id, labels=("INBOX",), internal_date=0):
+    """Build a trimmed messages.get response."""
+    return {
+        "id": message_id,
+        "labelIds": list(labels),
+        "internalDate": str(internal_date),
+        "payload": {
+            "headers": [
+                {"name": "Subject", "value": f"Subject {message_id}"},
+                {"name": "From", "value": "sender@example.com"},
+                {"name": "Date", "value": "Mon, 1 Jan 2024 10:00:00 +0000"},
+                {"name": "To", "value": "me@example.com"},
+            ]
+        },
+    }
+
+
+class TestMailboxSync:
+    """Test cases for MailboxSync class."""
+
+    @pytest.fixture
+    def mirror(self):
+        mirror = MailboxMirror(":memory:")
+        yield mirror
+        mirror.close()
+
+    @pytest.fixture
+    def service(self):
+        return FakeGmailService(
+            [make_message("a", internal_date=1), make_message("b", internal_date=2),
+             make_message("c", labels=("SENT",))]
+        )
+
+    @pytest.fixture
+    def sync(self, service, mirror):
+        client = GmailClient(service, extra_headers=("To",))
+        return MailboxSync(service, mirror, client=client)
+
+    def test_first_sync_imports_label(self, sync, mirror):
+        """Test the first sync imports every INBOX message and stores the history ID."""
+        result = sync.sync()
+
+        assert result.full_import
+        assert result.added == 2
+        assert mirror.history_id == "100"
+        assert [m["id"] for m in mirror.iter_responses()] == ["b", "a"]
+        assert mirror.synced_at is not None
+
+    def test_incremental_sync_applies_history(self, sync, service, mirror):
+        """Test adds, deletes and label changes are applied from history."""
+        sync.sync()
+        service.mailbox["d"] = make_message("d")
+        service.history_pages = [
+            {
+                "history": [
+                    {"messagesAdded": [{"message": {"id": "d", "labelIds": ["INBOX"]}}]},
+                    {"messagesDeleted": [{"message": {"id": "a"}}]},
+                ],
+                "historyId": "105",
+            },
+            {
+                "history": [
+                    {"labelsAdded": [{"message": {"id": "b"}, "labelIds": ["STARRED"]}]},
+                    {"labelsRemoved": [{"message": {"id": "b"}, "labelIds": ["UNREAD"]}]},
+                ],
+                "historyId": "110",
+            },
+        ]
+        service.get_calls.clear()
+
+        result = sync.sync()
+
+        assert not result.full_import
+        assert (result.added, result.deleted, result.relabeled) == (1, 1, 2)
+        assert service.get_calls == ["d"]
+        assert mirror.history_id == "110"
+        assert set(mirror.get_many(["a", "b", "d"])) == {"b", "d"}
+        assert "STARRED" in mirror.get_many(["b"])["b"]["labelIds"]
+
+    def test_messages_that_fail_to_fetch_are_retried_next_sync(self, service, mirror):
+        """Test a failed get leaves the mirror incomplete until a later sync fetches it."""
+        scheduler = RequestScheduler(units_per_second=None, backoff_base=0)
+        client = GmailClient(service, extra_headers=("To",), scheduler=scheduler)
+        sync = MailboxSync(service, mirror, client=client)
+        service.failing_ids = {"b"}
+
+        result = sync.sync()
+
+        assert (result.added, result.pending) == (1, 1)
+        assert mirror.pending_ids == ("b",)
+        assert not LocalQueryEngine(mirror).is_fresh()
+
+        service.failing_ids.clear()
+        service.history_pages = [{"historyId": "101"}]
+        result = sync.sync()
+
+        assert not result.full_import
+        assert (result.added, result.pending) == (1, 0)
+        assert set(mirror.get_many(["a", "b"])) == {"a", "b"}
+        assert LocalQueryEngine(mirror).is_fresh()
+
+    def test_profile_and_history_calls_go_through_the_scheduler(self, service, mirror):
+        """Test rate-limited getProfile and history.list calls are retried."""
+        metrics = Metrics()
+        scheduler = RequestScheduler(units_per_second=None, backoff_base=0, metrics=metrics)
+        sync = MailboxSync(service, mirror, client=GmailClient(service, scheduler=scheduler))
+        profile = Mock()
+        profile.execute.side_effect = [HttpError(Mock(status=429), b"rate limited"),
+                                       {"historyId": "100"}]
+        service.getProfile = Mock(return_value=profile)
+        sync.sync()
+
+        history = Mock()
+        history.execute.side_effect = [HttpError(Mock(status=503), b"unavailable"),
+                                       {"historyId": "101"}]
+        service.history = Mock(return_value=Mock(list=Mock(return_value=history)))
+        result = sync.sync()
+
+        assert not result.full_import
+        assert mirror.history_id == "101"
+        assert metrics.counters["retries"] == 2
+
+    def test_archived_message_leaves_mirror(self, sync, service, mirror):
+        """Test removing the INBOX label deletes the message from the mirror."""
+        sync.sync()
+        service.history_pages = [
+            {
+                "history": [{"labelsRemoved": [{"message": {"id": "a"}, "labelIds": ["INBOX"]}]}],
+                "historyId": "101",
+            }
+        ]
+
+        sync.sync()
+
+        assert mirror.get_many(["a"]) == {}
+
+    def test_expired_history_triggers_full_import(self, sync, service, mirror):
+        """Test a 404 from history.list rebuilds the mirror from scratch."""
+        sync.sync()
+        service.history_error = HttpError(Mock(status=404), b"history expired")
+        service.history_id = "500"
+
+        result = sync.sync()
+
+        assert result.full_import
+        assert mirror.history_id == "500"
+
+    def test_other_history_errors_propagate(self, sync, service):
+        """Test errors other than expired history are raised."""
+        sync.sync()
+        service.history_error = HttpError(Mock(status=500), b"backend error")
+
+        with pytest.raises(HttpError):
+            sync.sync()
+
+
+class TestGmailClientWithMirror:
+    """Test cases for GmailClient searches answered from the mirror."""
+
+    def test_search_reads_metadata_from_mirror(self):
+        """Test a synced mirror replaces per-message get calls for API-matched queries."""
+        service = FakeGmailService([make_message("a"), make_message("b")])
+        mirror = MailboxMirror(":memory:")
+        MailboxSync(service, mirror, client=GmailClient(service, extra_headers=("To",))).sync()
+        service.get_calls.clear()
+
+        client = GmailClient(service, mirror=mirror)
+        results = client.search_messages("has:attachment")
+
+        assert [m.subject for m in results] == ["Subject a", "Subject b"]
+        assert service.get_calls == []
+        mirror.close()
+
+    def test_fresh_mirror_answers_query_without_api_calls(self):
+        """Test queries the local engine understands never reach Gmail."""
+        service = FakeGmailService(
+            [make_message("a", labels=("INBOX", "UNREAD"), internal_date=1),
+             make_message("b", internal_date=2)]
+        )
+        mirror = MailboxMirror(":memory:")
+        MailboxSync(service, mirror, client=GmailClient(service, extra_headers=("To",))).sync()
+        service.get_calls.clear()
+        service.list_calls = 0
+
+        client = GmailClient(service, mirror=mirror)
+        results = client.search_messages("is:unread")
+
+        assert [m.subject for m in results] == ["Subject a"]
+        assert service.list_calls == 0
+        assert service.get_calls == []
+        mirror.close()
+
+    def test_stale_mirror_falls_back_to_api(self):
+        """Test an out-of-date mirror is not used to match queries."""
+        service = FakeGmailService([make_message("a", labels=("INBOX", "UNREAD"))])
+        mirror = MailboxMirror(":memory:")
+        MailboxSync(service, mirror, client=GmailClient(service, extra_headers=("To",))).sync()
+        service.list_calls = 0
+
+        client = GmailClient(service, mirror=mirror, mirror_max_age=-1)
+        client.search_messages("is:unread")
+
+        assert service.list_calls == 1
+        mirror.close()
+
+    def test_mirror_without_requested_headers_is_bypassed(self):
+        """Test the mirror is not used when it lacks a requested header."""
+        service = FakeGmailService([make_message("a")])
+        mirror = MailboxMirror(":memory:")
+        MailboxSync(service, mirror, client=GmailClient(service)).sync()
+        service.get_calls.clear()
+
+        client = GmailClient(service, mirror=mirror, extra_headers=("To",))
+        client.search_messages("is:unread")
+
+        assert service.get_calls == ["a"]
+        mirror.close()
@@ -0,0 +1,146 @@
+"""Tests for translation cache module."""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from gmail_agent.translation_cache import TranslationCache
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTranslationCache:
+    """Test cases for TranslationCache class."""
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    def test_key_normalizes_query(self):
+        """Test case, spacing and trailing punctuation do not change the key."""
+        first = TranslationCache.make_key("Unread  emails from Google?", "prompt", "model")
+        second = TranslationCache.make_key("unread emails from google", "prompt", "model")
+        assert first == second
+
+    def test_key_changes_with_prompt_and_model(self):
+        """Test prompt or model changes produce different keys."""
+        base = TranslationCache.make_key("unread", "prompt", "model")
+        assert base != TranslationCache.make_key("unread", "prompt v2", "model")
+        assert base != TranslationCache.make_key("unread", "prompt", "other-model")
+
+    def test_hit_and_miss_counters(self, clock):
+        """Test lookups update the hit and miss counters."""
+        cache = TranslationCache(clock=clock)
+
+        assert cache.get("k") is None
+        cache.put("k", "is:unread", "unread emails")
+        assert cache.get("k") == "is:unread"
+
+        assert cache.stats() == {"hits": 1, "misses": 1}
+
+    def test_relative_date_entries_expire(self, clock):
+        """Test entries for date-relative inputs expire after the TTL."""
+        cache = TranslationCache(relative_ttl=60, clock=clock)
+        cache.put("rel", "newer_than:7d", "messages from last week")
+        cache.put("abs", "from:google.com", "emails from Google")
+
+        clock.now += 61
+
+        assert cache.get("rel") is None
+        assert cache.get("abs") == "from:google.com"
+
+    def test_hebrew_relative_dates_expire(self, clock):
+        """Test Hebrew relative-date words also get a TTL."""
+        cache = TranslationCache(relative_ttl=60, clock=clock)
+        cache.put("k", "newer_than:7d", "מיילים מהשבוע האחרון")
+
+        clock.now += 61
+
+        assert cache.get("k") is None
+
+    def test_memory_tier_is_lru_bounded(self, clock):
+        """Test the in-memory tier evicts the least recently used entry."""
+        cache = TranslationCache(max_entries=2, clock=clock)
+        cache.put("a", "1", "a")
+        cache.put("b", "2", "b")
+        cache.get("a")
+        cache.put("c", "3", "c")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+
+    def test_file_tier_persists_between_instances(self, tmp_path, clock):
+        """Test entries are written to disk and read back by a new instance."""
+        path = tmp_path / "translations.json"
+        first = TranslationCache(str(path), clock=clock)
+        first.put("k", "is:unread", "unread")
+        first.flush()
+
+        cache = TranslationCache(str(path), clock=clock)
+
+        assert cache.get("k") == "is:unread"
+
+    def test_file_is_only_written_on_flush(self, tmp_path, clock):
+        """Test many puts cost one file write."""
+        path = tmp_path / "translations.json"
+        cache = TranslationCache(str(path), clock=clock)
+        for i in range(200):
+            cache.put(f"k{i}", f"subject:{i}", f"query {i}")
+
+        assert not path.exists()
+        with patch("gmail_agent.translation_cache.os.replace", wraps=os.replace) as replace:
+            cache.flush()
+            cache.flush()
+
+        replace.assert_called_once()
+        assert len(json.loads(path.read_text())) == 200
+
+    def test_flush_keeps_entries_written_by_another_process(self, tmp_path, clock):
+        """Test concurrent writers merge into the file instead of overwriting it."""
+        path = str(tmp_path / "translations.json")
+        first = TranslationCache(path, clock=clock)
+        second = TranslationCache(path, clock=clock)
+        first.get("missing")
+        second.get("missing")
+
+        first.put("a", "from:a.com", "emails from a")
+        first.flush()
+        second.put("b", "from:b.com", "emails from b")
+        second.flush()
+
+        reader = TranslationCache(path, clock=clock)
+        assert reader.get("a") == "from:a.com"
+        assert reader.get("b") == "from:b.com"
+
+    def test_failed_write_leaves_no_temp_file(self, tmp_path, clock):
+        """Test a failed flush cleans up and keeps the entries for the next one."""
+        path = tmp_path / "translations.json"
+        cache = TranslationCache(str(path), clock=clock)
+        cache.put("k", "is:unread", "unread")
+
+        with patch("gmail_agent.translation_cache.os.replace", side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                cache.flush()
+
+        assert list(tmp_path.iterdir()) == []
+        cache.flush()
+        assert TranslationCache(str(path), clock=clock).get("k") == "is:unread"
+
+    def test_corrupt_file_is_ignored(self, tmp_path, clock):
+        """Test an unreadable cache file behaves like an empty cache."""
+        path = tmp_path / "translations.json"
+        path.write_text("{not json")
+
+        cache = TranslationCache(str(path), clock=clock)
+
+        assert cache.get("k") is None